@@ -0,0 +1,138 @@
+"""
+Persistent cache of patient risk analyses.
+
+Entries are content-addressed. The key is a SHA-256 of the normalized
+patient summary, the prompt template version and the model name. If a
+patient's data, the prompt or the model changes, the key changes too.
+Re-running a report on the same patients.csv, in any format or after a
+crash, makes no API calls for patients that are already cached.
+
+Stored in SQLite next to the repo (cache/analyses.db) unless
+ANALYSIS_CACHE_PATH says otherwise.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path(
+    os.environ.get(
+        "ANALYSIS_CACHE_PATH",
+        Path(__file__).resolve().parent.parent.parent.parent / "cache" / "analyses.db"
+    )
+)
+DEFAULT_TTL_DAYS = float(os.environ.get("ANALYSIS_CACHE_TTL_DAYS", "7"))
+
+
+def normalize_summary(summary):
+    """Strip per-line whitespace and blank lines so formatting can't split keys."""
+    return "\n".join(line.strip() for line in summary.strip().splitlines() if line.strip())
+
+
+def cache_key(summary, prompt_version, model):
+    """
+    Content address for one analysis.
+
+    Args:
+        summary: Patient summary text sent to the model
+        prompt_version: Version tag of the prompt template
+        model: Model name
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    payload = json.dumps(
+        {"summary": normalize_summary(summary), "prompt_version": prompt_version, "model": model},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    SQLite-backed analysis cache with TTL and version invalidation.
+
+    Args:
+        path: SQLite file (created if missing)
+        ttl_days: Entries older than this are treated as misses (0 = never expire)
+
+    Example:
+        >>> cache = AnalysisCache()
+        >>> key = cache_key(summary, "risk-v1", "claude-sonnet-4-20250514")
+        >>> cache.get(key) or cache.put(key, analysis, "risk-v1", model)
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_days=DEFAULT_TTL_DAYS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_days * 86400
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                key TEXT PRIMARY KEY,
+                prompt_version TEXT NOT NULL,
+                model TEXT NOT NULL,
+                analysis TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, key):
+        """Return the cached analysis text, or None on a miss or expiry."""
+        entry = self.get_entry(key)
+        return entry['analysis'] if entry else None
+
+    def get_entry(self, key):
+        """
+        Cached analysis with the model that produced it.
+
+        Returns:
+            dict: analysis and model, or None on a miss or expiry
+        """
+        row = self.conn.execute(
+            "SELECT analysis, model, created_at FROM analyses WHERE key = ?", (key,)
+        ).fetchone()
+        if row and (not self.ttl_seconds or time.time() - row[2] < self.ttl_seconds):
+            self.hits += 1
+            return {'analysis': row[0], 'model': row[1]}
+        self.misses += 1
+        return None
+
+    def put(self, key, analysis, prompt_version, model):
+        """Store one analysis. Committed immediately so a crash keeps it."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?)",
+            (key, prompt_version, model, analysis, time.time())
+        )
+        self.conn.commit()
+
+    def purge(self, keep_prompt_version=None):
+        """
+        Delete expired entries and, optionally, every other prompt version.
+
+        Returns:
+            int: Number of rows removed
+        """
+        removed = 0
+        if self.ttl_seconds:
+            removed += self.conn.execute(
+                "DELETE FROM analyses WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,)
+            ).rowcount
+        if keep_prompt_version:
+            removed += self.conn.execute(
+                "DELETE FROM analyses WHERE prompt_version != ?",
+                (keep_prompt_version,)
+            ).rowcount
+        self.conn.commit()
+        return removed
+
+    def close(self):
+        self.conn.close()
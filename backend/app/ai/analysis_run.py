@@ -0,0 +1,178 @@
+"""
+One Claude client, analysis cache and deadline for a whole screening run.
+
+analyze_patients() and analyze_patients_batch() each open a client,
+screen one cohort and close it again. pipeline.screen_stream() screens
+an extract in chunks; calling either per chunk threw away everything
+that should outlive a chunk. That includes the rate limiter's learned
+concurrency, the hedge latency window, the prompt-cache warm-up and the
+single-flight table. The cache was re-opened and purged every time, the
+run deadline restarted, and --batch submitted one Message Batch per
+chunk and waited for each in turn.
+
+An AnalysisRun keeps one event loop and one ClaudeClient open for the
+run. submit() queues a cohort without waiting and result() runs the
+loop until that cohort is done, so chunks submitted together share one
+priority queue. In batch mode, every cohort submitted before a result()
+goes into the same Message Batch.
+
+A run can be given a cancel event (threading.Event), e.g. by an API
+request whose client has gone away. Once it is set, result() stops
+waiting and raises RunCancelled, and close() cancels every call still
+queued or in flight, so nothing more is paid for.
+"""
+import asyncio
+
+from app.ai.analysis_cache import AnalysisCache
+from app.ai.batch_screening import DEFAULT_POLL_INTERVAL_S, analyze_batch
+from app.ai.cascade import describe_cascade
+from app.ai.claude_client import (
+    DEFAULT_CONCURRENCY,
+    DEFAULT_PACK_SIZE,
+    DEFAULT_RUN_DEADLINE_S,
+    PROMPT_VERSION,
+    ClaudeClient,
+)
+
+# How often result() checks the cancel event while waiting
+CANCEL_POLL_S = 0.2
+
+
+class RunCancelled(Exception):
+    """The run's cancel event was set before a cohort finished."""
+
+
+class AnalysisRun:
+    """
+    Blocking front end to one ClaudeClient for the length of a run.
+
+    Args:
+        concurrency: Calls in flight at start (AIMD adapts it)
+        use_cache: Consult and fill the analysis cache
+        pack_size: Patients per interactive request
+        cascade: Optional Cascade (interactive only)
+        metrics: Optional RunMetrics every call is recorded into
+        deadline: Seconds the whole run's Claude calls may take, from the
+            first submit (0 = no limit; interactive only)
+        batch: Use the Message Batches API
+        poll_interval: Seconds between batch status checks
+        cancel: Optional threading.Event; once set, result() raises
+            RunCancelled (a Message Batch already sent runs to the end)
+
+    Example:
+        >>> with AnalysisRun(deadline=600) as run:
+        ...     first = run.submit(chunk_one, priority=scores_one)
+        ...     second = run.submit(chunk_two, priority=scores_two)
+        ...     analyses = run.result(first)
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, use_cache=True,
+                 pack_size=DEFAULT_PACK_SIZE, cascade=None, metrics=None,
+                 deadline=DEFAULT_RUN_DEADLINE_S, batch=False,
+                 poll_interval=DEFAULT_POLL_INTERVAL_S, cancel=None):
+        self.pack_size = pack_size
+        self.cascade = cascade
+        self.batch = batch
+        self.poll_interval = poll_interval
+        self.cancel = cancel
+        self.cache = None
+        if use_cache:
+            self.cache = AnalysisCache()
+            self.cache.purge(keep_prompt_version=PROMPT_VERSION)
+        self.loop = asyncio.new_event_loop()
+        self.claude = ClaudeClient(concurrency=concurrency, cache=self.cache, cascade=cascade,
+                                   metrics=metrics, deadline=0 if batch else deadline)
+        # (patients, future) waiting for the next Message Batch
+        self.batched = []
+
+    @property
+    def queued(self):
+        """Patients waiting for the next Message Batch (batch mode)."""
+        return sum(len(patients) for patients, _ in self.batched)
+
+    def submit(self, patients, progress=None, on_result=None, priority=None):
+        """
+        Queue a cohort without waiting for it.
+
+        Args:
+            patients: List of PatientRecord
+            progress, on_result, priority: As for ClaudeClient.analyze_many()
+                (interactive only; a batch lands all at once)
+
+        Returns:
+            asyncio.Future: Pass to result(); done() says whether it has landed
+        """
+        if self.batch:
+            future = self.loop.create_future()
+            self.batched.append((patients, future))
+            return future
+        return self.loop.create_task(self.claude.analyze_many(
+            patients, progress=progress, on_result=on_result, pack_size=self.pack_size,
+            priority=priority, deadline=0
+        ))
+
+    def result(self, future):
+        """
+        Analyses for a submitted cohort, in its input order; waits if needed.
+
+        Raises:
+            RunCancelled: The cancel event was set first. The cohort's
+                calls are left for close() to cancel.
+        """
+        if self.batch and not future.done():
+            self.send_batch()
+        if self.cancel is None:
+            return self.loop.run_until_complete(future)
+        return self.loop.run_until_complete(self.until_cancelled(future))
+
+    async def until_cancelled(self, future):
+        while not future.done():
+            if self.cancel.is_set():
+                raise RunCancelled("Screening run cancelled")
+            await asyncio.wait([future], timeout=CANCEL_POLL_S)
+        return future.result()
+
+    def send_batch(self):
+        """Screen every queued cohort as one Message Batch."""
+        if self.cancel is not None and self.cancel.is_set():
+            raise RunCancelled("Screening run cancelled")
+        batched, self.batched = self.batched, []
+        patients = [patient for cohort, _ in batched for patient in cohort]
+        analyses = self.loop.run_until_complete(
+            analyze_batch(self.claude, patients, self.poll_interval)
+        )
+        start = 0
+        for cohort, future in batched:
+            future.set_result(analyses[start:start + len(cohort)])
+            start += len(cohort)
+
+    def close(self):
+        claude = self.claude
+        if claude.duplicates and not self.batch:
+            print(f"👯 {claude.duplicates} duplicate patients shared another row's call")
+        if self.pack_size > 1 and not self.batch:
+            print(f"📦 Packed {self.pack_size} patients/request: {claude.usage['requests']} requests, "
+                  f"{claude.requeued} re-queued individually")
+        if self.cascade and self.cascade.patients:
+            print(describe_cascade(self.cascade.summary(claude), self.cascade.fast_model,
+                                   claude.model))
+        try:
+            # Cohorts submitted but never collected (the caller stopped early)
+            abandoned = asyncio.all_tasks(self.loop)
+            if abandoned:
+                for task in abandoned:
+                    task.cancel()
+                self.loop.run_until_complete(asyncio.wait(abandoned))
+            self.loop.run_until_complete(claude.close())
+        finally:
+            self.loop.close()
+            if self.cache:
+                self.cache.close()
+        if self.cache:
+            print(f"♻️  Analysis cache: {self.cache.hits} reused, {self.cache.misses} sent to Claude")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,231 @@
+"""
+Typed, schema-validated risk assessments.
+
+Claude used to answer in free text, and every generator scraped it for
+lines starting with "Risk Level:". A reply with a preamble or a stray
+"High" in the wrong sentence was silently misfiled. Now the model has to
+call the record_risk_assessment tool. Its input is checked against the
+schema by validate_assessment() before anything downstream sees it, and
+the result is rendered to the canonical report text with to_text().
+
+Packed mode asks for several patients at once through
+record_risk_assessments, one entry per patient ref (p1, p2, ...). Entries are validated
+one by one, so a single bad entry costs a single-patient retry, not the
+whole pack.
+"""
+from dataclasses import dataclass
+
+RISK_LEVELS = ("Low", "Medium", "High")
+MAX_FACTOR_CHARS = 80
+MAX_ACTION_CHARS = 120
+
+# Output cap for one tool call: the three capped fields plus JSON framing
+ASSESSMENT_MAX_TOKENS = 150
+
+RISK_TOOL = {
+    "name": "record_risk_assessment",
+    "description": "Record the clinical risk assessment for one patient.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "risk_level": {"type": "string", "enum": list(RISK_LEVELS)},
+            "primary_factor": {
+                "type": "string",
+                "maxLength": MAX_FACTOR_CHARS,
+                "description": "Main driver of the risk level"
+            },
+            "action": {
+                "type": "string",
+                "maxLength": MAX_ACTION_CHARS,
+                "description": "Recommended next step for the care team"
+            },
+            "confidence": {
+                "type": "number",
+                "minimum": 0,
+                "maximum": 1,
+                "description": "How sure you are of the risk level given only these fields (0-1)"
+            }
+        },
+        "required": ["risk_level", "primary_factor", "action", "confidence"],
+        "additionalProperties": False
+    }
+}
+
+# Forces a tool call, so the reply never contains free text to scrape
+RISK_TOOL_CHOICE = {"type": "tool", "name": RISK_TOOL["name"]}
+
+PACKED_RISK_TOOL = {
+    "name": "record_risk_assessments",
+    "description": "Record the clinical risk assessment for every patient in the request.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "assessments": {
+                "type": "array",
+                "description": "One entry per patient, keyed by its ref",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "patient_ref": {"type": "string"},
+                        **RISK_TOOL["input_schema"]["properties"]
+                    },
+                    "required": ["patient_ref", *RISK_TOOL["input_schema"]["required"]],
+                    "additionalProperties": False
+                }
+            }
+        },
+        "required": ["assessments"],
+        "additionalProperties": False
+    }
+}
+PACKED_RISK_TOOL_CHOICE = {"type": "tool", "name": PACKED_RISK_TOOL["name"]}
+
+
+class AssessmentError(ValueError):
+    """Tool input that doesn't match RISK_TOOL's schema."""
+
+
+@dataclass(frozen=True)
+class RiskAssessment:
+    """One validated assessment. confidence drives the model cascade only."""
+    risk_level: str
+    primary_factor: str
+    action: str
+    confidence: float
+
+    def to_text(self):
+        """Canonical 'Risk Level / Primary Factor / Action' report text."""
+        return (
+            f"Risk Level: {self.risk_level}\n"
+            f"Primary Factor: {self.primary_factor}\n"
+            f"Action: {self.action}"
+        )
+
+    def as_dict(self):
+        return {
+            'risk_level': self.risk_level,
+            'primary_factor': self.primary_factor,
+            'action': self.action,
+            'confidence': self.confidence
+        }
+
+
+def validate_assessment(data):
+    """
+    Strictly check tool input against RISK_TOOL's schema.
+
+    Args:
+        data: The tool_use block's input
+
+    Returns:
+        RiskAssessment
+
+    Raises:
+        AssessmentError: Describing every problem found, worded so it can
+            be sent back to the model as-is
+    """
+    if not isinstance(data, dict):
+        raise AssessmentError(f"input must be an object, got {type(data).__name__}")
+
+    problems = []
+    fields = RISK_TOOL["input_schema"]["required"]
+    extra = sorted(set(data) - set(fields))
+    if extra:
+        problems.append(f"unexpected fields: {', '.join(extra)}")
+
+    for name in ("risk_level", "primary_factor", "action"):
+        value = data.get(name)
+        if not isinstance(value, str) or not value.strip():
+            problems.append(f"{name} must be a non-empty string")
+
+    confidence = data.get("confidence")
+    if isinstance(confidence, bool) or not isinstance(confidence, (int, float)) \
+            or not 0 <= confidence <= 1:
+        problems.append("confidence must be a number between 0 and 1")
+
+    if not problems:
+        if data["risk_level"] not in RISK_LEVELS:
+            problems.append(f"risk_level must be one of {', '.join(RISK_LEVELS)}, got {data['risk_level']!r}")
+        if len(data["primary_factor"]) > MAX_FACTOR_CHARS:
+            problems.append(f"primary_factor is {len(data['primary_factor'])} characters (max {MAX_FACTOR_CHARS})")
+        if len(data["action"]) > MAX_ACTION_CHARS:
+            problems.append(f"action is {len(data['action'])} characters (max {MAX_ACTION_CHARS})")
+
+    if problems:
+        raise AssessmentError("; ".join(problems))
+
+    return RiskAssessment(
+        risk_level=data["risk_level"],
+        primary_factor=data["primary_factor"].strip(),
+        action=data["action"].strip(),
+        confidence=float(confidence)
+    )
+
+
+def assessment_from_message(message):
+    """
+    Validate the record_risk_assessment call in a Messages API response.
+
+    Returns:
+        RiskAssessment
+
+    Raises:
+        AssessmentError: No tool call, a truncated one, or invalid input
+    """
+    if message.stop_reason == "max_tokens":
+        raise AssessmentError("reply was cut off before the tool call finished")
+    for block in message.content:
+        if block.type == "tool_use" and block.name == RISK_TOOL["name"]:
+            return validate_assessment(block.input)
+    raise AssessmentError(f"no {RISK_TOOL['name']} tool call in the reply")
+
+
+def packed_assessments_from_message(message, refs):
+    """
+    Valid entries of a record_risk_assessments call, keyed by patient ref.
+
+    Entries for refs that weren't asked about, repeated refs and entries
+    that fail validate_assessment() are dropped. The caller re-queues
+    every requested ref that's missing from the result.
+
+    Args:
+        message: Messages API response
+        refs: The patient refs sent in the request
+
+    Returns:
+        dict: ref -> RiskAssessment
+    """
+    entries = []
+    for block in message.content:
+        if block.type == "tool_use" and block.name == PACKED_RISK_TOOL["name"]:
+            if isinstance(block.input, dict) and isinstance(block.input.get("assessments"), list):
+                entries = block.input["assessments"]
+            break
+
+    wanted = set(refs)
+    seen = set()
+    found = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        ref = str(entry.get("patient_ref", ""))
+        if ref not in wanted or ref in seen:
+            # A ref answered twice is ambiguous, so neither answer is kept
+            found.pop(ref, None)
+            seen.add(ref)
+            continue
+        seen.add(ref)
+        fields = {k: v for k, v in entry.items() if k != "patient_ref"}
+        try:
+            found[ref] = validate_assessment(fields)
+        except AssessmentError:
+            continue
+    return found
+
+
+def tool_use_id(message):
+    """id of the tool_use block in a response, or None."""
+    for block in message.content:
+        if block.type == "tool_use":
+            return block.id
+    return None
@@ -0,0 +1,167 @@
+"""
+Message Batches mode for nightly cohort screening.
+
+Nightly screening doesn't need interactive latency, so this path sends
+the whole cohort as one Message Batch instead of a stream of
+messages.create() calls. Batches run against a separate, much higher
+rate limit at a lower price. Each request's custom_id is its row index,
+so results (which arrive in any order) map straight back to the patient.
+Rows with identical summaries are submitted once and the result is
+copied to the duplicates.
+Replies that fail schema validation get their one corrective retry as an
+interactive call once the batch is in.
+
+Works against the real API or scripts/mock_anthropic_server.py via
+ANTHROPIC_BASE_URL.
+"""
+import asyncio
+import os
+
+import anthropic
+
+from app.ai.analysis_cache import cache_key
+from app.ai.assessment import (
+    ASSESSMENT_MAX_TOKENS,
+    RISK_TOOL,
+    RISK_TOOL_CHOICE,
+    AssessmentError,
+    assessment_from_message,
+)
+from app.ai.claude_client import (
+    PROMPT_VERSION,
+    build_patient_summary,
+    analysis_failed,
+    build_risk_prompt,
+    failed_analysis,
+    risk_system_blocks,
+)
+
+DEFAULT_POLL_INTERVAL_S = float(os.environ.get("CLAUDE_BATCH_POLL_INTERVAL", "30"))
+# Patients a streamed run gathers into one Message Batch before sending it
+# (the API takes up to 100,000 requests per batch)
+DEFAULT_BATCH_MAX_REQUESTS = int(os.environ.get("CLAUDE_BATCH_MAX_REQUESTS", "10000"))
+
+
+def batch_custom_id(index):
+    """custom_id for the patient at row `index` (no PHI leaves in the id)."""
+    return f"row-{index}"
+
+
+async def analyze_batch(claude, patients, poll_interval=DEFAULT_POLL_INTERVAL_S):
+    """
+    Analyze a cohort through the Message Batches API.
+
+    Args:
+        claude: ClaudeClient (its model and cache are used)
+        patients: List of PatientRecord
+        poll_interval: Seconds between status checks
+
+    Returns:
+        list: Analysis texts in the same order as patients
+    """
+    results = [None] * len(patients)
+    pending = {}
+    keys = {}
+    leaders = {}
+    copies = {}
+
+    for index, patient in enumerate(patients):
+        keys[index] = cache_key(build_patient_summary(patient), PROMPT_VERSION, claude.model)
+        if keys[index] in leaders:
+            copies[index] = leaders[keys[index]]
+            continue
+        leaders[keys[index]] = index
+        if claude.cache:
+            results[index] = claude.cache.get(keys[index])
+        if results[index] is not None:
+            claude.metrics.cache_hits += 1
+        else:
+            pending[batch_custom_id(index)] = index
+
+    if copies:
+        claude.duplicates += len(copies)
+        claude.metrics.duplicates += len(copies)
+        print(f"👯 {len(copies)} duplicate patients share another row's result")
+
+    if pending:
+        batch = await claude.client.messages.batches.create(requests=[
+            {
+                "custom_id": custom_id,
+                "params": {
+                    "model": claude.model,
+                    "max_tokens": ASSESSMENT_MAX_TOKENS,
+                    "system": risk_system_blocks(),
+                    "messages": [{"role": "user", "content": build_risk_prompt(patients[index])}],
+                    "tools": [RISK_TOOL],
+                    "tool_choice": RISK_TOOL_CHOICE
+                }
+            }
+            for custom_id, index in pending.items()
+        ])
+        print(f"📦 Submitted batch {batch.id} ({len(pending)} patients)")
+
+        while batch.processing_status != "ended":
+            await asyncio.sleep(poll_interval)
+            batch = await claude.client.messages.batches.retrieve(batch.id)
+            counts = batch.request_counts
+            print(f"   ⏳ {batch.processing_status}: {counts.processing} processing, "
+                  f"{counts.succeeded} succeeded, {counts.errored} errored")
+
+        rejected = []
+        async for entry in await claude.client.messages.batches.results(batch.id):
+            index = pending.get(entry.custom_id)
+            if index is None:
+                continue
+            if entry.result.type == "succeeded":
+                claude.metrics.record_call(claude.model, entry.result.message.usage, batch=True)
+                try:
+                    results[index] = assessment_from_message(entry.result.message).to_text()
+                except AssessmentError as e:
+                    rejected.append((index, entry.result.message, e))
+                    continue
+            else:
+                # errored, canceled or expired
+                results[index] = failed_analysis(entry.result.type)
+
+        if rejected:
+            print(f"   🔁 Retrying {len(rejected)} invalid replies interactively")
+
+        async def retry(index, message, error):
+            try:
+                assessment = await claude.retry_assessment(
+                    build_risk_prompt(patients[index]), message, error
+                )
+                results[index] = assessment.to_text()
+            except (anthropic.APIError, asyncio.TimeoutError, AssessmentError) as e:
+                results[index] = failed_analysis(e)
+
+        await asyncio.gather(*(retry(*item) for item in rejected))
+
+        if claude.cache:
+            for index in pending.values():
+                if results[index] is not None and not analysis_failed(results[index]):
+                    claude.cache.put(keys[index], results[index], PROMPT_VERSION, claude.model)
+
+    for index, leader in copies.items():
+        results[index] = results[leader]
+
+    return [text if text is not None else failed_analysis("missing from batch") for text in results]
+
+
+def analyze_patients_batch(patients, poll_interval=DEFAULT_POLL_INTERVAL_S, use_cache=True,
+                           metrics=None):
+    """
+    Blocking entry point for batch-mode screening scripts.
+
+    Pass a RunMetrics to collect tokens and cost (batch results have no
+    per-call latency).
+
+    Example:
+        >>> analyses = analyze_patients_batch(patients)
+    """
+    # Imported here: analysis_run builds on this module
+    from app.ai.analysis_run import AnalysisRun
+
+    with AnalysisRun(use_cache=use_cache, metrics=metrics, batch=True,
+                     poll_interval=poll_interval) as run:
+        return run.result(run.submit(patients))
@@ -0,0 +1,158 @@
+"""
+Model cascade for risk screening: fast model first, escalate when unsure.
+
+Most patients the rules hand to Claude are routine Medium cases that a
+small model gets right. The cascade screens every patient on the fast
+model (CLAUDE_FAST_MODEL) and only re-runs a patient on the main model
+when the fast answer is:
+
+  - High risk (too important to leave to the small model),
+  - below CASCADE_MIN_CONFIDENCE, or
+  - lower than the rules allow (e.g. Low for a patient the rules refused
+    to call Low), or
+  - not a valid assessment even after its corrective retry.
+
+The report then shows which model decided each patient. Enable with
+CLAUDE_CASCADE=1 or --cascade on the report scripts.
+"""
+import os
+import time
+from collections import Counter
+
+from app.ai.assessment import AssessmentError
+from app.ai.pricing import estimate_cost
+
+FAST_MODEL = os.environ.get("CLAUDE_FAST_MODEL", "claude-3-5-haiku-20241022")
+CASCADE_ENABLED = os.environ.get("CLAUDE_CASCADE", "0") == "1"
+DEFAULT_MIN_CONFIDENCE = float(os.environ.get("CASCADE_MIN_CONFIDENCE", "0.8"))
+
+RISK_RANK = {"Low": 0, "Medium": 1, "High": 2}
+
+
+class Cascade:
+    """
+    Fast-then-escalate policy plus the per-run stats it collects.
+
+    Args:
+        fast_model: Model every patient goes to first
+        min_confidence: Fast answers below this are escalated
+        rule_floor: Optional callable(patient_row) returning the lowest
+            risk level the triage rules allow for that patient, or None
+
+    Example:
+        >>> cascade = Cascade(rule_floor=lambda row: "Medium")
+        >>> async with ClaudeClient(cascade=cascade) as claude:
+        ...     analyses = await claude.analyze_many(patients)
+        >>> cascade.summary(claude)
+    """
+
+    def __init__(self, fast_model=FAST_MODEL, min_confidence=DEFAULT_MIN_CONFIDENCE,
+                 rule_floor=None):
+        self.fast_model = fast_model
+        self.min_confidence = min_confidence
+        self.rule_floor = rule_floor
+        self.patients = 0
+        self.escalations = Counter()
+        self.fast_seconds = 0.0
+        self.strong_seconds = 0.0
+
+    def label(self, strong_model):
+        """Cache-key model tag: cascade answers are cached apart from single-model ones."""
+        return f"cascade:{self.fast_model}>{strong_model}@{self.min_confidence}"
+
+    def escalation_reason(self, patient_row, assessment):
+        """Why a fast-model assessment needs the main model, or None if it stands."""
+        if assessment.risk_level == "High":
+            return "high risk"
+        if assessment.confidence < self.min_confidence:
+            return "low confidence"
+        floor = self.rule_floor(patient_row) if self.rule_floor else None
+        if floor and RISK_RANK[assessment.risk_level] < RISK_RANK[floor]:
+            return "disagrees with rules"
+        return None
+
+    async def escalate(self, claude, patient_row, reason):
+        self.escalations[reason] += 1
+        started = time.perf_counter()
+        assessment = await claude.assess(patient_row)
+        self.strong_seconds += time.perf_counter() - started
+        return assessment, claude.model
+
+    async def review(self, claude, patient_row, assessment, fast_seconds):
+        """
+        Keep or escalate one fast-model assessment.
+
+        Args:
+            claude: ClaudeClient whose .model is the main model
+            patient_row: PatientRecord
+            assessment: The fast model's RiskAssessment
+            fast_seconds: Time spent on the fast call (share of it, if packed)
+
+        Returns:
+            tuple: (RiskAssessment, model that decided it)
+        """
+        self.patients += 1
+        self.fast_seconds += fast_seconds
+        reason = self.escalation_reason(patient_row, assessment)
+        if reason:
+            return await self.escalate(claude, patient_row, reason)
+        return assessment, self.fast_model
+
+    async def assess(self, claude, patient_row):
+        """Screen one patient through the cascade; returns (RiskAssessment, model)."""
+        started = time.perf_counter()
+        try:
+            assessment = await claude.assess(patient_row, model=self.fast_model)
+        except AssessmentError:
+            self.patients += 1
+            self.fast_seconds += time.perf_counter() - started
+            return await self.escalate(claude, patient_row, "invalid fast reply")
+        return await self.review(claude, patient_row, assessment, time.perf_counter() - started)
+
+    def summary(self, claude):
+        """
+        Escalation counts and estimated savings against running every
+        patient on the main model.
+
+        The baseline prices the fast calls' tokens at main-model rates.
+        Latency savings are in call-seconds (summed per-call time, not wall
+        clock) and need at least one escalation to measure the main model.
+
+        Returns:
+            dict: patients, escalated, reasons, cost_usd, baseline_cost_usd,
+            cost_saved_usd, call_seconds, baseline_call_seconds,
+            call_seconds_saved
+        """
+        fast_usage = claude.usage_by_model.get(self.fast_model, {})
+        strong_usage = claude.usage_by_model.get(claude.model, {})
+        cost = estimate_cost(self.fast_model, fast_usage) + estimate_cost(claude.model, strong_usage)
+        baseline_cost = estimate_cost(claude.model, fast_usage)
+
+        escalated = sum(self.escalations.values())
+        call_seconds = self.fast_seconds + self.strong_seconds
+        baseline_seconds = None
+        if escalated:
+            baseline_seconds = self.strong_seconds / escalated * self.patients
+
+        return {
+            'patients': self.patients,
+            'escalated': escalated,
+            'reasons': dict(self.escalations),
+            'cost_usd': cost,
+            'baseline_cost_usd': baseline_cost,
+            'cost_saved_usd': baseline_cost - cost,
+            'call_seconds': call_seconds,
+            'baseline_call_seconds': baseline_seconds,
+            'call_seconds_saved': None if baseline_seconds is None else baseline_seconds - call_seconds
+        }
+
+
+def describe_cascade(summary, fast_model, strong_model):
+    """One-line run summary for the console."""
+    reasons = ", ".join(f"{count} {reason}" for reason, count in summary['reasons'].items()) or "none"
+    line = (f"🪜 Cascade {fast_model} → {strong_model}: {summary['escalated']}/{summary['patients']} "
+            f"escalated ({reasons}); est. ${summary['cost_saved_usd']:.4f} saved "
+            f"(${summary['cost_usd']:.4f} vs ${summary['baseline_cost_usd']:.4f})")
+    if summary['call_seconds_saved'] is not None:
+        line += f", ~{summary['call_seconds_saved']:.1f} call-seconds saved"
+    return line
@@ -1 +1,763 @@
-# Claude API Integration - Week 2
+"""
+Shared async Claude client for patient risk analysis.
+
+The screening scripts and the FastAPI backend all go through this module.
+They no longer build their own anthropic.Anthropic() and call
+messages.create() one patient at a time. Each ClaudeClient owns one
+AsyncAnthropic client on a pooled httpx connection. Analyses run
+concurrently behind a semaphore, and every call has a timeout, so a
+500-patient screen takes about as long as its slowest few calls.
+Risk analyses come back as validated record_risk_assessment tool calls
+(see assessment.py), not free text. The static instructions are a
+cached system prefix, and each request adds only a compact patient
+summary (see patient_summary.py). With pack_size > 1, K patients share
+one request. Any patient the packed reply doesn't cleanly answer is
+re-queued on its own. Given priority scores, the most urgent patients
+are sent first. Calls that run past the recent p95 are hedged with a
+duplicate (see hedging.py), every call has a deadline across its
+retries, and a run can be given an overall deadline. Rows whose
+summaries are identical (re-exports, test patients) share one in-flight
+call and its answer is fanned out to every copy. With a Cascade (see
+cascade.py), patients go to a fast model first and only uncertain or
+high-risk ones reach self.model. Every analyze_many() on one client
+shares its call queue (see scheduler.py), single-flight table and run
+deadline, so a run screened in chunks behaves like one cohort.
+"""
+import asyncio
+import collections
+import json
+import os
+import random
+import time
+
+import anthropic
+
+from app.ai.analysis_cache import cache_key
+from app.ai.assessment import (
+    ASSESSMENT_MAX_TOKENS,
+    RISK_TOOL,
+    RISK_TOOL_CHOICE,
+    PACKED_RISK_TOOL,
+    PACKED_RISK_TOOL_CHOICE,
+    AssessmentError,
+    assessment_from_message,
+    packed_assessments_from_message,
+    tool_use_id,
+)
+from app.ai.hedging import HEDGE_BUDGET, HEDGE_ENABLED, LatencyTracker, first_success
+from app.ai.patient_summary import SUMMARY_VERSION, build_patient_summary
+from app.ai.rate_limiter import RateLimiter, estimate_tokens
+from app.ai.run_metrics import RunMetrics
+from app.ai.scheduler import CallScheduler
+
+DEFAULT_MODEL = os.environ.get("CLAUDE_MODEL", "claude-sonnet-4-20250514")
+DEFAULT_MAX_TOKENS = 300
+
+# Bump whenever the prompt wording changes; it is part of the cache key
+PROMPT_VERSION = f"risk-v6+{SUMMARY_VERSION}"
+DEFAULT_CONCURRENCY = int(os.environ.get("CLAUDE_CONCURRENCY", "8"))
+# Patients per request; 1 = one request per patient. Pick K with
+# scripts/evaluate_packing.py before raising it.
+DEFAULT_PACK_SIZE = int(os.environ.get("CLAUDE_PACK_SIZE", "1"))
+DEFAULT_TIMEOUT_S = float(os.environ.get("CLAUDE_TIMEOUT", "30"))
+DEFAULT_MAX_RETRIES = 4
+# Budget for one call across all its retries, from when it is first sent
+DEFAULT_CALL_DEADLINE_S = float(os.environ.get("CLAUDE_CALL_DEADLINE", "90"))
+# Wall-clock budget for a whole screening run (0 = none). Patients still
+# unscreened when it expires come back as failed_analysis(DEADLINE_REASON).
+DEFAULT_RUN_DEADLINE_S = float(os.environ.get("CLAUDE_RUN_DEADLINE", "0"))
+DEADLINE_REASON = "run deadline"
+
+# Account limits the rate limiter keeps us under
+CLAUDE_RPM = int(os.environ.get("CLAUDE_RPM", "50"))
+CLAUDE_TPM = int(os.environ.get("CLAUDE_TPM", "30000"))
+CLAUDE_MAX_CONCURRENCY = int(os.environ.get("CLAUDE_MAX_CONCURRENCY", "32"))
+
+# 429 = rate limited, 529 = overloaded: both shrink concurrency
+OVERLOAD_STATUS = {429, 529}
+RETRYABLE_STATUS = OVERLOAD_STATUS | {500, 502, 503, 504}
+
+# Static instructions shared by every risk call. Sent as a cached system
+# prefix; nothing patient-specific may go in here. Keep it lean: with the
+# tools it sits below the minimum cacheable prefix (1024 tokens on
+# Sonnet, 2048 on Haiku), so every call pays for it in full. Check
+# changes with scripts/measure_prompt_tokens.py on both models.
+RISK_SYSTEM_PROMPT = """You are a clinical risk assessment assistant.
+
+Analyze each patient independently and record:
+1. Risk Level (Low/Medium/High)
+2. Primary Risk Factor (max 80 characters)
+3. Recommended Action (max 120 characters)
+4. Confidence (0-1): below 0.7 when the signals conflict or sit on a boundary
+
+Weigh the signals together:
+- 3+ crisis calls in 30 days is High; 1-2 with poor adherence or missed visits usually is too.
+- Adherence below 50% is High for psychotic and bipolar disorders, usually Medium otherwise.
+- Several missed visits and no appointment in 90+ days suggest dropping out of care.
+- Substance use disorders and PTSD raise the weight of crisis calls and missed visits.
+
+Use only the fields given. Record packed patients by their ref (p1, p2, ...)."""
+
+
+def risk_system_blocks():
+    """
+    System prompt for risk calls, marked for prompt caching.
+
+    Tools come before the system prompt in the cached prefix, so every
+    risk call with the same tool shares one cache entry. The API only
+    caches prefixes above the model's minimum length and silently
+    ignores cache_control below it.
+    """
+    return [{"type": "text", "text": RISK_SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+
+
+def build_risk_prompt(patient_row):
+    """
+    Build the per-patient part of a risk-assessment request.
+
+    The instructions live in the cached system prompt, so this is just
+    the compact summary. The answer comes back through RISK_TOOL, whose
+    length caps fit the narrowest report layout (PDF), so a single
+    analysis can be rendered in every format.
+
+    Args:
+        patient_row: PatientRecord
+
+    Returns:
+        str: User message text for messages.create()
+    """
+    return f"PATIENT:\n{build_patient_summary(patient_row)}"
+
+
+def packed_ref(position):
+    """Reference for the patient at `position` in a packed request (no PHI)."""
+    return f"p{position + 1}"
+
+
+def build_packed_prompt(patient_rows):
+    """
+    Build the user message for several patients in one request.
+
+    Patients are labelled p1..pK instead of by patient ID. Answers come
+    back through PACKED_RISK_TOOL keyed by those refs.
+
+    Args:
+        patient_rows: List of PatientRecord
+
+    Returns:
+        str: User message text for messages.create()
+    """
+    return "\n\n".join(
+        f"PATIENT {packed_ref(i)}:\n{build_patient_summary(row)}"
+        for i, row in enumerate(patient_rows)
+    )
+
+
+def parse_analysis(analysis):
+    """
+    Split canonical analysis text into its three labelled fields.
+
+    The text is always produced by RiskAssessment.to_text(),
+    rule_analysis() or failed_analysis(), never taken raw from the model.
+
+    Returns:
+        dict: risk_level, primary_factor and action
+    """
+    parsed = {
+        'risk_level': "Unknown",
+        'primary_factor': "Not analyzed",
+        'action': "No action specified"
+    }
+
+    for line in analysis.split('\n'):
+        if line.startswith('Risk Level:'):
+            parsed['risk_level'] = line.replace('Risk Level:', '').strip()
+        elif line.startswith('Primary Factor:'):
+            parsed['primary_factor'] = line.replace('Primary Factor:', '').strip()
+        elif line.startswith('Action:'):
+            parsed['action'] = line.replace('Action:', '').strip()
+
+    return parsed
+
+
+def retry_delay(error, attempt):
+    """Seconds to wait before retrying: retry-after if given, else backoff."""
+    response = getattr(error, 'response', None)
+    if response is not None:
+        retry_after = response.headers.get('retry-after')
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+    return min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def analysis_failed(analysis):
+    """True for replies produced by failed_analysis() (or otherwise unusable)."""
+    return parse_analysis(analysis)['risk_level'] == "Unknown"
+
+
+def deadline_expired(analysis):
+    """True for the failed_analysis() text of a patient the run deadline cut off."""
+    return parse_analysis(analysis)['primary_factor'] == f"Analysis failed ({DEADLINE_REASON})"
+
+
+def failed_analysis(error):
+    """
+    Reply text used when a call fails, so one bad call can't sink a run.
+
+    Args:
+        error: The exception, or a short reason string (e.g. 'expired')
+    """
+    reason = error if isinstance(error, str) else type(error).__name__
+    return (
+        "Risk Level: Unknown\n"
+        f"Primary Factor: Analysis failed ({reason})\n"
+        "Action: Manual clinical review required"
+    )
+
+
+class ClaudeClient:
+    """
+    Async Claude client with a shared connection pool and adaptive rate limiting.
+
+    Args:
+        api_key: Anthropic API key (defaults to ANTHROPIC_API_KEY)
+        model: Model name for every call
+        concurrency: Calls in flight at start; AIMD adapts it from there
+        timeout: Per-attempt timeout in seconds
+        max_retries: Retries per call on 429/529, 5xx and connection errors
+        call_deadline: Seconds one call may take across all its attempts
+        hedge: Send a duplicate for calls running past the recent p95
+        rpm: Requests-per-minute limit for the token bucket
+        tpm: Tokens-per-minute limit for the token bucket
+        cache: Optional AnalysisCache consulted by analyze_many()
+        cascade: Optional Cascade; analyze_many() then screens on its fast
+            model first and escalates to `model` only when it says so
+        base_url: API root (defaults to ANTHROPIC_BASE_URL, then the real
+            API); point it at scripts/mock_anthropic_server.py offline
+        metrics: Optional RunMetrics that every call is recorded into
+        deadline: Seconds every analyze_many() on this client may take
+            together, from the first one (0 = no limit)
+
+    Example:
+        >>> async with ClaudeClient(concurrency=10) as claude:
+        ...     analyses = await claude.analyze_many(patients)
+    """
+
+    def __init__(self, api_key=None, model=DEFAULT_MODEL,
+                 concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT_S,
+                 max_retries=DEFAULT_MAX_RETRIES, rpm=CLAUDE_RPM, tpm=CLAUDE_TPM,
+                 cache=None, cascade=None, base_url=None, metrics=None,
+                 call_deadline=DEFAULT_CALL_DEADLINE_S, hedge=HEDGE_ENABLED,
+                 deadline=0):
+        self.model = model
+        self.cache = cache
+        self.cascade = cascade
+        self.metrics = metrics or RunMetrics()
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.call_deadline = call_deadline
+        self.latency = LatencyTracker() if hedge else None
+        self.hedges = 0
+        self.hedge_wins = 0
+
+        # One keep-alive connection pool shared by every call. Retries are
+        # ours, not the SDK's, so 429/529 can feed the rate limiter.
+        self._http = anthropic.DefaultAsyncHttpxClient()
+        self.client = anthropic.AsyncAnthropic(
+            api_key=api_key or os.environ.get("ANTHROPIC_API_KEY"),
+            base_url=base_url,
+            http_client=self._http,
+            max_retries=0,
+            timeout=timeout
+        )
+        # Running totals across every call this client makes
+        self.usage = {
+            'requests': 0,
+            'input_tokens': 0,
+            'output_tokens': 0,
+            'cache_creation_input_tokens': 0,
+            'cache_read_input_tokens': 0
+        }
+        # The same totals split by model, for cascade cost estimates
+        self.usage_by_model = {}
+        self.requeued = 0
+        # Patients answered by another row's call (identical summaries)
+        self.duplicates = 0
+        # Calls re-sent after a retryable error or connection failure
+        self.retries = 0
+        self.limiter = RateLimiter(
+            rpm=rpm,
+            tpm=tpm,
+            initial_concurrency=concurrency,
+            max_concurrency=max(concurrency, CLAUDE_MAX_CONCURRENCY)
+        )
+        self.scheduler = CallScheduler(workers=self.limiter.concurrency.maximum)
+        # Cache key -> future of the call answering it, across analyze_many() calls
+        self.in_flight = {}
+        self.deadline = deadline
+        self.deadline_at = None
+        # Patients cut off by a deadline
+        self.expired = 0
+
+    async def create(self, messages, max_tokens=DEFAULT_MAX_TOKENS, model=None, **params):
+        """
+        messages.create() with rate limiting and retries.
+
+        Args:
+            messages: Messages API conversation
+            max_tokens: Output cap
+            model: Model for this call (defaults to self.model)
+            **params: Extra request fields (tools, tool_choice, ...)
+
+        Returns:
+            anthropic.types.Message
+        """
+        model = model or self.model
+        reserved_tokens = estimate_tokens(json.dumps(messages) + json.dumps(params)) + max_tokens
+        delay = 0.0
+        started = time.perf_counter()
+        deadline = None
+
+        for attempt in range(self.max_retries + 1):
+            if delay:
+                await asyncio.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+                delay = 0.0
+
+            async with self.limiter.slot(reserved_tokens) as slot:
+                # The deadline starts when the call is first sent, not while queued
+                deadline = deadline or time.monotonic() + self.call_deadline
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.metrics.record_failure(retries=attempt)
+                    raise asyncio.TimeoutError(f"Call deadline of {self.call_deadline:g}s exceeded")
+
+                async def send():
+                    return await self.client.messages.create(
+                        model=model,
+                        max_tokens=max_tokens,
+                        messages=messages,
+                        timeout=min(self.timeout, remaining),
+                        **params
+                    )
+
+                def on_hedge():
+                    # The duplicate is a real request against the account limits
+                    self.hedges += 1
+                    self.limiter.requests.adjust(1)
+                    self.limiter.tokens.adjust(reserved_tokens)
+
+                sent_at = time.perf_counter()
+                try:
+                    hedge_after = self.hedge_threshold()
+                    if hedge_after is None:
+                        message = await send()
+                    else:
+                        message, hedged, hedge_won = await first_success(send, hedge_after, on_hedge)
+                        self.hedge_wins += hedge_won
+                        if hedged:
+                            self.metrics.record_hedge(hedge_won)
+                except anthropic.APIStatusError as e:
+                    if e.status_code not in RETRYABLE_STATUS or attempt == self.max_retries:
+                        self.metrics.record_failure(retries=attempt)
+                        raise
+                    self.retries += 1
+                    if e.status_code in OVERLOAD_STATUS:
+                        # The limiter pause makes every caller wait, not just us
+                        slot.overloaded(retry_delay(e, attempt))
+                    else:
+                        delay = retry_delay(e, attempt)
+                    continue
+                except anthropic.APIConnectionError as e:
+                    if attempt == self.max_retries:
+                        self.metrics.record_failure(retries=attempt)
+                        raise
+                    self.retries += 1
+                    delay = retry_delay(e, attempt)
+                    continue
+
+                slot.settle(message.usage.input_tokens + message.usage.output_tokens)
+                if self.latency:
+                    self.latency.observe(time.perf_counter() - sent_at)
+            model_usage = self.usage_by_model.setdefault(model, dict.fromkeys(self.usage, 0))
+            for totals in (self.usage, model_usage):
+                totals['requests'] += 1
+                totals['input_tokens'] += message.usage.input_tokens
+                totals['output_tokens'] += message.usage.output_tokens
+                totals['cache_creation_input_tokens'] += message.usage.cache_creation_input_tokens or 0
+                totals['cache_read_input_tokens'] += message.usage.cache_read_input_tokens or 0
+            self.metrics.record_call(model, message.usage, time.perf_counter() - started, retries=attempt)
+            return message
+
+    def hedge_threshold(self):
+        """Seconds after which to hedge the next call, or None to send it alone."""
+        if not self.latency or self.hedges >= HEDGE_BUDGET * max(1, self.usage['requests']):
+            return None
+        return self.latency.threshold()
+
+    async def complete(self, prompt, max_tokens=DEFAULT_MAX_TOKENS):
+        """Send one free-text prompt and return the reply text."""
+        message = await self.create([{"role": "user", "content": prompt}], max_tokens)
+        return message.content[0].text
+
+    async def assess(self, patient_row, model=None):
+        """
+        Structured risk assessment for one PatientRecord.
+
+        A reply that fails validation gets exactly one targeted retry:
+        the validation errors are sent back as the tool result.
+
+        Args:
+            patient_row: PatientRecord
+            model: Model for this call (defaults to self.model)
+
+        Returns:
+            RiskAssessment
+
+        Raises:
+            AssessmentError: If the retry is invalid too
+        """
+        prompt = build_risk_prompt(patient_row)
+        message = await self.create(
+            [{"role": "user", "content": prompt}],
+            ASSESSMENT_MAX_TOKENS,
+            model=model,
+            system=risk_system_blocks(),
+            tools=[RISK_TOOL],
+            tool_choice=RISK_TOOL_CHOICE
+        )
+        try:
+            return assessment_from_message(message)
+        except AssessmentError as e:
+            return await self.retry_assessment(prompt, message, e, model=model)
+
+    async def retry_assessment(self, prompt, message, error, model=None):
+        """
+        Single corrective retry after a reply failed validation.
+
+        Args:
+            prompt: The original risk prompt
+            message: The rejected response
+            error: Its AssessmentError
+            model: Model that produced it (defaults to self.model)
+        """
+        correction = (
+            f"Invalid assessment: {error}. "
+            f"Call {RISK_TOOL['name']} again with corrected fields."
+        )
+        previous_id = tool_use_id(message)
+        if previous_id:
+            messages = [
+                {"role": "user", "content": prompt},
+                {"role": "assistant", "content": [
+                    {"type": "tool_use", "id": block.id, "name": block.name, "input": block.input}
+                    for block in message.content if block.type == "tool_use"
+                ]},
+                {"role": "user", "content": [
+                    {"type": "tool_result", "tool_use_id": previous_id,
+                     "is_error": True, "content": correction}
+                ]}
+            ]
+        else:
+            messages = [{"role": "user", "content": f"{prompt}\n{correction}"}]
+
+        retried = await self.create(
+            messages,
+            ASSESSMENT_MAX_TOKENS,
+            model=model,
+            system=risk_system_blocks(),
+            tools=[RISK_TOOL],
+            tool_choice=RISK_TOOL_CHOICE
+        )
+        return assessment_from_message(retried)
+
+    async def assess_packed(self, patient_rows, model=None):
+        """
+        Structured risk assessments for several patients in one request.
+
+        Args:
+            patient_rows: List of PatientRecord
+            model: Model for this call (defaults to self.model)
+
+        Returns:
+            dict: Position in patient_rows -> RiskAssessment, for every
+            patient the reply answered validly. Missing positions are
+            the caller's to re-queue.
+        """
+        refs = [packed_ref(i) for i in range(len(patient_rows))]
+        message = await self.create(
+            [{"role": "user", "content": build_packed_prompt(patient_rows)}],
+            ASSESSMENT_MAX_TOKENS * len(patient_rows),
+            model=model,
+            system=risk_system_blocks(),
+            tools=[PACKED_RISK_TOOL],
+            tool_choice=PACKED_RISK_TOOL_CHOICE
+        )
+        found = packed_assessments_from_message(message, refs)
+        return {i: found[ref] for i, ref in enumerate(refs) if ref in found}
+
+    async def analyze(self, patient_row):
+        """Risk assessment for one PatientRecord, as canonical report text."""
+        assessment = await self.assess(patient_row)
+        return assessment.to_text()
+
+    async def complete_many(self, prompts, max_tokens=DEFAULT_MAX_TOKENS, progress=None):
+        """
+        Send many prompts concurrently.
+
+        Args:
+            prompts: List of prompt strings
+            max_tokens: Output cap per call
+            progress: Optional callback(done, total, index) after each call
+
+        Returns:
+            list: Reply texts in the same order as prompts. A call that
+            fails after retries gets failed_analysis() text instead.
+        """
+        total = len(prompts)
+        done = 0
+
+        async def run(index, prompt):
+            nonlocal done
+            try:
+                text = await self.complete(prompt, max_tokens)
+            except (anthropic.APIError, asyncio.TimeoutError) as e:
+                text = failed_analysis(e)
+            done += 1
+            if progress:
+                progress(done, total, index)
+            return text
+
+        return await asyncio.gather(*(run(i, p) for i, p in enumerate(prompts)))
+
+    async def analyze_many(self, patients, progress=None, on_result=None,
+                           pack_size=DEFAULT_PACK_SIZE, priority=None,
+                           deadline=DEFAULT_RUN_DEADLINE_S):
+        """
+        Analyze a list of PatientRecords concurrently, in input order.
+
+        Rows with the same canonical summary (the cache key) are
+        single-flighted: only the first is sent and its analysis is given
+        to every copy when it lands, including copies in another
+        analyze_many() running on this client. Cached analyses are
+        returned without an API call. Fresh ones are
+        written to the cache as each call finishes, so an interrupted run
+        keeps everything it already paid for. With a cascade, packed and
+        single requests go to the fast model and each answer is reviewed
+        (and possibly re-run on self.model) as it lands.
+
+        Calls go into the client's priority queue (self.scheduler), so
+        the send order is the schedule: with priority scores, the
+        highest-scoring patients go first and their results land first,
+        across every analyze_many() running on this client.
+
+        Args:
+            patients: List of PatientRecord
+            progress: Optional callback(done, total, index) after each patient
+            on_result: Optional callback(index, text, model) as each analysis
+                lands; model is the one that decided it (None if it failed)
+            pack_size: Patients per request (K). Patients a packed reply
+                misses, mislabels or gets wrong are re-sent one by one.
+            priority: Optional score per patient; higher is sent sooner
+                (packs are built from the reordered list)
+            deadline: Seconds this call may take (0/None = no limit), on
+                top of the client's run deadline. In-flight calls are
+                cancelled when either expires and every unfinished patient
+                gets failed_analysis(DEADLINE_REASON).
+        """
+        total = len(patients)
+        done = 0
+        texts = [None] * total
+        keys = [None] * total
+        cascade = self.cascade
+        first_model = cascade.fast_model if cascade else self.model
+        key_model = cascade.label(self.model) if cascade else self.model
+
+        now = time.monotonic()
+        if self.deadline and self.deadline_at is None:
+            self.deadline_at = now + self.deadline
+        ends = [end for end in (self.deadline_at, now + deadline if deadline else None) if end]
+        ends_at = min(ends) if ends else None
+
+        def finish(index, text, model=None, fresh=False):
+            nonlocal done
+            if fresh and self.cache:
+                self.cache.put(keys[index], text, PROMPT_VERSION, model)
+            flight = flights.pop(index, None)
+            if flight:
+                if self.in_flight.get(keys[index]) is flight:
+                    del self.in_flight[keys[index]]
+                flight.set_result((text, model))
+            for copy in [index] + copies.get(index, []):
+                texts[copy] = text
+                if on_result:
+                    on_result(copy, text, model)
+                done += 1
+                if progress:
+                    progress(done, total, copy)
+
+        async def single(index):
+            try:
+                if cascade:
+                    assessment, model = await cascade.assess(self, patients[index])
+                else:
+                    assessment, model = await self.assess(patients[index]), self.model
+                finish(index, assessment.to_text(), model, fresh=True)
+            except (anthropic.APIError, asyncio.TimeoutError, AssessmentError) as e:
+                finish(index, failed_analysis(e))
+
+        async def reviewed(index, assessment, seconds):
+            try:
+                assessment, model = await cascade.review(self, patients[index], assessment, seconds)
+                finish(index, assessment.to_text(), model, fresh=True)
+            except (anthropic.APIError, asyncio.TimeoutError, AssessmentError) as e:
+                finish(index, failed_analysis(e))
+
+        async def packed(indexes):
+            started = time.perf_counter()
+            try:
+                found = await self.assess_packed([patients[i] for i in indexes], model=first_model)
+            except (anthropic.APIError, asyncio.TimeoutError):
+                found = {}
+            share = (time.perf_counter() - started) / len(indexes)
+            missing, escalating = [], []
+            for position, index in enumerate(indexes):
+                if position not in found:
+                    missing.append(index)
+                elif cascade:
+                    escalating.append(reviewed(index, found[position], share))
+                else:
+                    finish(index, found[position].to_text(), self.model, fresh=True)
+            self.requeued += len(missing)
+            await asyncio.gather(*escalating, *(single(i) for i in missing))
+
+        async def follow(index, flight):
+            # shield: giving up on this copy mustn't cancel the other cohort's call
+            text, model = await asyncio.shield(flight)
+            finish(index, text, model)
+
+        # Single-flight: the first row with a given summary leads, the
+        # rest wait for its answer
+        leaders = {}
+        copies = collections.defaultdict(list)
+        for index, patient in enumerate(patients):
+            keys[index] = cache_key(build_patient_summary(patient), PROMPT_VERSION, key_model)
+            if keys[index] in leaders:
+                copies[leaders[keys[index]]].append(index)
+            else:
+                leaders[keys[index]] = index
+        duplicates = total - len(leaders)
+        self.duplicates += duplicates
+        self.metrics.duplicates += duplicates
+
+        pending = []
+        following = []
+        flights = {}
+        for index in leaders.values():
+            cached = self.cache.get_entry(keys[index]) if self.cache else None
+            if cached is not None:
+                self.metrics.cache_hits += 1
+                finish(index, cached['analysis'], cached['model'])
+            elif keys[index] in self.in_flight:
+                # Already being asked by another analyze_many() on this client
+                self.duplicates += 1
+                self.metrics.duplicates += 1
+                following.append(asyncio.ensure_future(follow(index, self.in_flight[keys[index]])))
+            else:
+                flights[index] = self.in_flight[keys[index]] = (
+                    asyncio.get_running_loop().create_future())
+                pending.append(index)
+
+        if priority is not None:
+            # Stable sort: equal scores keep input order
+            pending.sort(key=lambda i: priority[i], reverse=True)
+
+        if pack_size > 1:
+            run, jobs = packed, [pending[start:start + pack_size]
+                                 for start in range(0, len(pending), pack_size)]
+        else:
+            run, jobs = single, [[index] for index in pending]
+
+        def job_priority(job):
+            return priority[job[0]] if priority is not None else 0.0
+
+        submitted = []
+        if jobs and (ends_at is None or ends_at > time.monotonic()):
+            submitted = [
+                self.scheduler.submit(lambda job=job: run(job if pack_size > 1 else job[0]),
+                                      job_priority(job))
+                for job in jobs
+            ]
+        waiting = submitted + following
+        if waiting:
+            timeout = None if ends_at is None else max(0.0, ends_at - time.monotonic())
+            finished, _ = await asyncio.wait(waiting, timeout=timeout)
+            self.scheduler.cancel(submitted)
+            for task in following:
+                task.cancel()
+            for future in finished:
+                if not future.cancelled() and future.exception() is not None:
+                    raise future.exception()
+
+        expired = [index for index in leaders.values() if texts[index] is None]
+        if expired:
+            count = sum(1 + len(copies[i]) for i in expired)
+            if self.expired:
+                print(f"   ⏰ {count} more patients not screened")
+            else:
+                limit = min((value for value in (deadline, self.deadline) if value), default=0)
+                print(f"⏰ Run deadline ({limit:g}s) reached: {count} patients not screened")
+            self.expired += count
+            for index in expired:
+                finish(index, failed_analysis(DEADLINE_REASON))
+        return texts
+
+    async def close(self):
+        await self.scheduler.close()
+        await self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+def analyze_patients(patients, progress=None, concurrency=DEFAULT_CONCURRENCY,
+                     use_cache=True, on_result=None, pack_size=DEFAULT_PACK_SIZE,
+                     cascade=None, priority=None, metrics=None,
+                     deadline=DEFAULT_RUN_DEADLINE_S):
+    """
+    Blocking entry point for the screening scripts.
+
+    Pass a RunMetrics to collect tokens, cost, latency and retries, and
+    a deadline (seconds) to bound the run's finish time.
+
+    Pass a Cascade to screen on its fast model first; its escalation and
+    savings summary is printed at the end of the run.
+
+    Screens one cohort on a client of its own; to screen several on one
+    client, use AnalysisRun (see analysis_run.py).
+
+    Example:
+        >>> analyses = analyze_patients(patients)
+    """
+    # Imported here: analysis_run builds on this module and batch_screening
+    from app.ai.analysis_run import AnalysisRun
+
+    with AnalysisRun(concurrency=concurrency, use_cache=use_cache, pack_size=pack_size,
+                     cascade=cascade, metrics=metrics, deadline=deadline) as run:
+        return run.result(run.submit(patients, progress=progress, on_result=on_result,
+                                     priority=priority))
+
+
+def complete_prompts(prompts, max_tokens=DEFAULT_MAX_TOKENS, progress=None,
+                     concurrency=DEFAULT_CONCURRENCY):
+    """Blocking entry point for scripts that send free-text prompts."""
+    async def run():
+        async with ClaudeClient(concurrency=concurrency) as claude:
+            return await claude.complete_many(prompts, max_tokens, progress=progress)
+
+    return asyncio.run(run())
@@ -0,0 +1,92 @@
+"""
+Hedged requests for tail latency.
+
+Most risk calls finish in a second or two, but a few hang for much
+longer, and a run can't finish until its slowest call does. When a call
+is still running past the recent p95 latency, ClaudeClient sends an
+identical duplicate, takes whichever answer arrives first and cancels
+the other. Only the slowest ~5% of calls are duplicated, so the extra
+cost is small, and HEDGE_BUDGET caps it when the whole API slows down.
+
+Disable with CLAUDE_HEDGE=0.
+"""
+import asyncio
+import os
+from collections import deque
+
+HEDGE_ENABLED = os.environ.get("CLAUDE_HEDGE", "1") != "0"
+HEDGE_PERCENTILE = float(os.environ.get("CLAUDE_HEDGE_PERCENTILE", "0.95"))
+# No hedging until this many latencies are known, so the first calls
+# (including the prompt-cache warm-up) aren't duplicated on a guess
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 200
+# At most this share of calls may be hedged
+HEDGE_BUDGET = 0.1
+
+
+class LatencyTracker:
+    """
+    Rolling window of call latencies that sets the hedge threshold.
+
+    Args:
+        percentile: Hedge calls running longer than this share of recent calls
+        window: Latencies kept
+        min_samples: Latencies needed before threshold() returns a value
+    """
+
+    def __init__(self, percentile=HEDGE_PERCENTILE, window=HEDGE_WINDOW,
+                 min_samples=HEDGE_MIN_SAMPLES):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.samples = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.samples.append(seconds)
+
+    def threshold(self):
+        """Seconds after which to hedge, or None while there is too little data."""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+
+
+async def first_success(send, hedge_after, on_hedge=None):
+    """
+    Run send(); if it is still going after hedge_after seconds, race a duplicate.
+
+    The first successful result wins and the other call is cancelled.
+    If both fail, the first error is raised.
+
+    Args:
+        send: Zero-argument coroutine function making the call
+        hedge_after: Seconds before sending the duplicate
+        on_hedge: Optional callback() when the duplicate is sent
+
+    Returns:
+        tuple: (result, hedged, hedge_won)
+    """
+    primary = asyncio.ensure_future(send())
+    tasks = [primary]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if done:
+            return primary.result(), False, False
+
+        if on_hedge:
+            on_hedge()
+        hedge = asyncio.ensure_future(send())
+        tasks.append(hedge)
+        running, errors = set(tasks), []
+        while running:
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            # Look at every finished task so no exception goes unretrieved
+            winners = [task for task in done if task.exception() is None]
+            errors += [task.exception() for task in done if task.exception() is not None]
+            if winners:
+                return winners[0].result(), True, winners[0] is hedge
+        raise errors[0]
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,72 @@
+"""
+Compact, PHI-minimized patient encoding for risk prompts.
+
+The risk model only needs the clinical signals. Name, case manager and
+patient ID don't change the assessment, so they never leave the
+building. The exact last-appointment date is reduced to a recency band.
+What remains is a few short key: value lines, roughly a third of the
+tokens of the old labelled block.
+
+Bump SUMMARY_VERSION whenever the encoding changes. It is folded into
+PROMPT_VERSION, so cached analyses and delta fingerprints from an older
+encoding are never reused.
+"""
+from datetime import date, datetime
+
+SUMMARY_VERSION = "compact-v1"
+
+# (upper bound in days, label) for the last-appointment recency band
+RECENCY_BANDS = [
+    (30, "within 30 days"),
+    (90, "31-90 days ago"),
+]
+RECENCY_OLDEST = "over 90 days ago"
+
+
+def appointment_recency(last_appointment, today=None):
+    """
+    Recency band for a last_appointment value (YYYY-MM-DD).
+
+    Bands instead of a day count keep the summary, and so the cache key,
+    stable from one day to the next.
+
+    Returns:
+        str: Band label, or 'unknown' if the date can't be parsed
+    """
+    try:
+        seen = datetime.strptime(str(last_appointment).strip(), "%Y-%m-%d").date()
+    except ValueError:
+        return "unknown"
+    days = ((today or date.today()) - seen).days
+    for limit, label in RECENCY_BANDS:
+        if days <= limit:
+            return label
+    return RECENCY_OLDEST
+
+
+def build_patient_summary(patient, today=None):
+    """
+    Encode the fields the risk model uses, and nothing else.
+
+    Args:
+        patient: PatientRecord
+        today: Reference date for the recency band (defaults to today)
+
+    Returns:
+        str: Compact multi-line summary
+
+    Example:
+        >>> print(build_patient_summary(patient))
+        adherence: 60%
+        missed_appts_6mo: 2
+        crisis_calls_30d: 1
+        last_appt: 31-90 days ago
+        diagnosis: Major Depressive Disorder
+    """
+    return (
+        f"adherence: {patient.medication_adherence*100:.0f}%\n"
+        f"missed_appts_6mo: {patient.appointments_missed}\n"
+        f"crisis_calls_30d: {patient.crisis_calls_30days}\n"
+        f"last_appt: {appointment_recency(patient.last_appointment, today)}\n"
+        f"diagnosis: {str(patient.diagnosis).strip()}"
+    )
@@ -0,0 +1,53 @@
+"""
+Per-model token prices for cost estimates.
+
+USD per million tokens, from the public Anthropic price list. Update
+the table when prices or models change. An unknown model is priced as
+Sonnet so estimates never silently drop to zero.
+"""
+
+# model -> (input, output) USD per million tokens
+MODEL_PRICES_PER_MTOK = {
+    "claude-sonnet-4-20250514": (3.00, 15.00),
+    "claude-3-5-haiku-20241022": (0.80, 4.00),
+    "claude-opus-4-20250514": (15.00, 75.00),
+}
+
+# Prompt-cache writes and reads relative to the base input price
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.1
+
+# Message Batches bill every token at this share of the interactive price
+BATCH_DISCOUNT = 0.5
+
+FALLBACK_PRICED_MODEL = "claude-sonnet-4-20250514"
+
+
+def model_prices(model):
+    """(input, output) USD per million tokens for a model."""
+    return MODEL_PRICES_PER_MTOK.get(model, MODEL_PRICES_PER_MTOK[FALLBACK_PRICED_MODEL])
+
+
+def estimate_cost(model, usage):
+    """
+    Estimated USD cost of token usage on a model.
+
+    Args:
+        model: Model name
+        usage: Dict with input_tokens, output_tokens and optionally
+            cache_creation_input_tokens / cache_read_input_tokens
+
+    Returns:
+        float: USD
+
+    Example:
+        >>> estimate_cost("claude-sonnet-4-20250514", {"input_tokens": 1000, "output_tokens": 100})
+        0.0045
+    """
+    input_price, output_price = model_prices(model)
+    billed_input = (
+        usage.get('input_tokens', 0)
+        + usage.get('cache_creation_input_tokens', 0) * CACHE_WRITE_MULTIPLIER
+        + usage.get('cache_read_input_tokens', 0) * CACHE_READ_MULTIPLIER
+    )
+    return (billed_input * input_price + usage.get('output_tokens', 0) * output_price) / 1_000_000
@@ -0,0 +1,182 @@
+"""
+Adaptive rate limiting for Claude calls.
+
+Two token buckets keep us under the account's requests-per-minute and
+tokens-per-minute limits. Each call reserves max_tokens plus an estimate
+of its input tokens, then settles against the real usage once the reply
+arrives. Concurrency adapts with AIMD (additive increase, multiplicative
+decrease). The limit grows by one for every window of successful calls
+and halves on a 429 or 529, so throughput stays near the account limit
+without a retry storm.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+
+def estimate_tokens(text):
+    """Rough input-token estimate (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """
+    Continuously refilling bucket measured in units per minute.
+
+    Args:
+        per_minute: Refill rate (e.g. the account RPM or TPM limit)
+        burst: Bucket capacity (defaults to one minute's worth)
+    """
+
+    def __init__(self, per_minute, burst=None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst or per_minute
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount):
+        """Wait until amount units are available, then take them (FIFO)."""
+        # A request bigger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, delta):
+        """Charge (positive) or refund (negative) units after the fact."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class AIMDConcurrency:
+    """
+    Concurrency limit with additive increase and multiplicative decrease.
+
+    Args:
+        initial: Starting number of calls allowed in flight
+        minimum: Floor for the limit
+        maximum: Ceiling for the limit
+        backoff: Factor applied to the limit on overload
+    """
+
+    def __init__(self, initial, minimum=1, maximum=32, backoff=0.5):
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        # +1 after roughly `limit` successes, i.e. one per round trip
+        self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+    def on_overload(self, started_at):
+        """
+        Back off once per congestion event.
+
+        Calls that were already in flight when we last backed off are
+        reporting the same congestion, so they don't halve the limit again.
+        """
+        if started_at < self.last_decrease:
+            return
+        self.limit = max(self.minimum, self.limit * self.backoff)
+        self.last_decrease = time.monotonic()
+
+
+class RateSlot:
+    """Handle for one admitted call; settle() or overloaded() it."""
+
+    def __init__(self, limiter, reserved_tokens):
+        self.limiter = limiter
+        self.reserved_tokens = reserved_tokens
+        self.started_at = time.monotonic()
+        self.succeeded = False
+
+    def settle(self, used_tokens):
+        """Replace the token reservation with the call's real usage."""
+        self.limiter.tokens.adjust(used_tokens - self.reserved_tokens)
+        self.succeeded = True
+
+    def overloaded(self, retry_after=None):
+        """Record a 429/529: halve concurrency and pause new calls."""
+        self.limiter.throttled += 1
+        self.limiter.concurrency.on_overload(self.started_at)
+        # The rejected request never consumed its token reservation
+        self.limiter.tokens.adjust(-self.reserved_tokens)
+        if retry_after:
+            self.limiter.pause(retry_after)
+
+
+class RateLimiter:
+    """
+    RPM + TPM token buckets in front of an AIMD concurrency limit.
+
+    Args:
+        rpm: Requests per minute allowed by the account
+        tpm: Tokens per minute (input + output) allowed by the account
+        initial_concurrency: Calls in flight before AIMD adapts
+        max_concurrency: Ceiling for the adaptive limit
+
+    Example:
+        >>> limiter = RateLimiter(rpm=50, tpm=30_000)
+        >>> async with limiter.slot(estimated_tokens=800) as slot:
+        ...     message = await client.messages.create(...)
+        ...     slot.settle(message.usage.input_tokens + message.usage.output_tokens)
+    """
+
+    def __init__(self, rpm, tpm, initial_concurrency=4, max_concurrency=32):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AIMDConcurrency(initial_concurrency, maximum=max_concurrency)
+        self.paused_until = 0.0
+        self.throttled = 0
+
+    def pause(self, seconds):
+        """Hold every new call for `seconds` (from a retry-after header)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens):
+        await self.concurrency.acquire()
+        slot = None
+        try:
+            delay = self.paused_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.requests.acquire(1)
+            await self.tokens.acquire(estimated_tokens)
+            slot = RateSlot(self, estimated_tokens)
+            yield slot
+        finally:
+            if slot and slot.succeeded:
+                self.concurrency.on_success()
+            await self.concurrency.release()
+
+    def stats(self):
+        return {
+            'concurrency_limit': round(self.concurrency.limit, 2),
+            'in_flight': self.concurrency.in_flight,
+            'throttled': self.throttled
+        }
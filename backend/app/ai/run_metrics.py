@@ -0,0 +1,210 @@
+"""
+Per-run accounting of Claude calls: tokens, cost, latency and retries.
+
+Every ClaudeClient records each messages.create() it makes into a
+RunMetrics: the usage the API reported (input, output, cache writes and
+reads), how long the call took including retries, and how many retries
+it needed. Batch results are recorded too, at the batch discount. The
+screener adds how many patients each stage decided, so a run summary
+shows what a screen cost and where its time went.
+
+The report scripts write summary() as a JSON run summary next to their
+reports and render metrics_rows() as a "Run Metrics" appendix.
+"""
+import json
+import time
+from collections import Counter
+from datetime import datetime
+
+from app.ai.pricing import BATCH_DISCOUNT, estimate_cost
+
+# Upper bounds (seconds) of the latency histogram buckets; one more
+# bucket catches everything slower
+LATENCY_BUCKETS_S = (0.5, 1, 2, 5, 10, 30)
+
+TOKEN_FIELDS = (
+    'input_tokens',
+    'output_tokens',
+    'cache_creation_input_tokens',
+    'cache_read_input_tokens'
+)
+
+
+def percentile(sorted_values, share):
+    """Nearest-rank percentile of an already sorted list (None if empty)."""
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * share))], 3)
+
+
+def latency_histogram(latencies, buckets=LATENCY_BUCKETS_S):
+    """
+    Count latencies per bucket.
+
+    Returns:
+        dict: Bucket label ("<=0.5s", ..., ">30s") -> count
+    """
+    labels = [f"<={bound}s" for bound in buckets] + [f">{buckets[-1]}s"]
+    counts = dict.fromkeys(labels, 0)
+    for seconds in latencies:
+        position = next((i for i, bound in enumerate(buckets) if seconds <= bound), len(buckets))
+        counts[labels[position]] += 1
+    return counts
+
+
+class RunMetrics:
+    """
+    Token, cost, latency and retry totals for one screening run.
+
+    Args:
+        run_id: Label for the run (the report timestamp)
+
+    Example:
+        >>> metrics = RunMetrics("20250101_0900")
+        >>> results = screen_patients(patients, metrics=metrics)
+        >>> metrics.write("reports/patient_risk_20250101_0900.run_summary.json")
+    """
+
+    def __init__(self, run_id=None):
+        self.run_id = run_id
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self._started = time.perf_counter()
+        self.elapsed = None
+        self.calls = 0
+        self.failed_calls = 0
+        self.retries = 0
+        self.cache_hits = 0
+        # Patients answered by an identical row's call instead of their own
+        self.duplicates = 0
+        self.latencies = []
+        self.tokens_by_model = {}
+        self.cost_usd = 0.0
+        self.hedged_calls = 0
+        self.hedge_wins = 0
+        self.patients = Counter()
+
+    def record_call(self, model, usage, seconds=None, retries=0, batch=False):
+        """
+        Record one successful API call.
+
+        Args:
+            model: Model that served it
+            usage: The response's usage (anthropic.types.Usage)
+            seconds: Wall time including retries (None for batch results)
+            retries: Attempts before the one that succeeded
+            batch: Billed at the Message Batches discount
+        """
+        tokens = {field: getattr(usage, field, 0) or 0 for field in TOKEN_FIELDS}
+        totals = self.tokens_by_model.setdefault(model, dict.fromkeys(('requests',) + TOKEN_FIELDS, 0))
+        totals['requests'] += 1
+        for field, value in tokens.items():
+            totals[field] += value
+
+        cost = estimate_cost(model, tokens)
+        self.cost_usd += cost * BATCH_DISCOUNT if batch else cost
+        self.calls += 1
+        self.retries += retries
+        if seconds is not None:
+            self.latencies.append(seconds)
+
+    def record_hedge(self, won):
+        """Record a hedged call and whether the duplicate answered first."""
+        self.hedged_calls += 1
+        self.hedge_wins += won
+
+    def record_failure(self, retries=0):
+        """Record a call that failed for good after `retries` retries."""
+        self.failed_calls += 1
+        self.retries += retries
+
+    def count_patients(self, stage, count=1):
+        """Add to the patients decided by a stage (rules, Claude, reused, ...)."""
+        if count:
+            self.patients[stage] += count
+
+    def finish(self):
+        """Stop the run clock; summary() uses the time so far until then."""
+        self.elapsed = time.perf_counter() - self._started
+
+    def summary(self):
+        """
+        Machine-readable run summary.
+
+        Returns:
+            dict: run_id, started_at, elapsed_seconds, patients (by stage),
+            patients_per_second, calls, failed_calls, retries, hedged_calls,
+            hedge_wins, cache_hits, duplicates, tokens (total and by model),
+            cost_usd and latency stats with a histogram
+        """
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self._started
+        latencies = sorted(self.latencies)
+        total_patients = sum(self.patients.values())
+        tokens = dict.fromkeys(TOKEN_FIELDS, 0)
+        for totals in self.tokens_by_model.values():
+            for field in TOKEN_FIELDS:
+                tokens[field] += totals[field]
+
+        return {
+            'run_id': self.run_id,
+            'started_at': self.started_at,
+            'elapsed_seconds': round(elapsed, 2),
+            'patients': {'total': total_patients, **self.patients},
+            'patients_per_second': round(total_patients / elapsed, 2) if elapsed else 0.0,
+            'calls': self.calls,
+            'failed_calls': self.failed_calls,
+            'retries': self.retries,
+            'hedged_calls': self.hedged_calls,
+            'hedge_wins': self.hedge_wins,
+            'cache_hits': self.cache_hits,
+            'duplicates': self.duplicates,
+            'tokens': tokens,
+            'tokens_by_model': self.tokens_by_model,
+            'cost_usd': round(self.cost_usd, 4),
+            'latency_seconds': {
+                'mean': round(sum(latencies) / len(latencies), 3) if latencies else None,
+                'p50': percentile(latencies, 0.5),
+                'p95': percentile(latencies, 0.95),
+                'max': round(latencies[-1], 3) if latencies else None,
+                'histogram': latency_histogram(latencies)
+            }
+        }
+
+    def write(self, path):
+        """Write summary() as JSON; returns the summary."""
+        summary = self.summary()
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(summary, file, indent=2)
+        return summary
+
+
+def metrics_rows(summary):
+    """
+    Compact (label, value) rows for a report's "Run Metrics" appendix.
+
+    Args:
+        summary: RunMetrics.summary()
+    """
+    def seconds(value):
+        return "n/a" if value is None else f"{value:.2f}s"
+
+    latency = summary['latency_seconds']
+    tokens = summary['tokens']
+    stages = ", ".join(f"{count} {stage}" for stage, count in summary['patients'].items()
+                       if stage != 'total')
+    histogram = "  ".join(f"{label}: {count}" for label, count in latency['histogram'].items() if count)
+    return [
+        ("Run ID", summary['run_id'] or "n/a"),
+        ("Duration", f"{summary['elapsed_seconds']:.1f}s ({summary['patients_per_second']:.2f} patients/s)"),
+        ("Patients", f"{summary['patients']['total']} ({stages or 'none'})"),
+        ("Claude calls", f"{summary['calls']} ok, {summary['failed_calls']} failed, "
+                         f"{summary['retries']} retries, {summary['hedged_calls']} hedged "
+                         f"({summary['hedge_wins']} won by the duplicate), {summary['cache_hits']} cache hits"),
+        ("Duplicate patients", f"{summary['duplicates']} answered by an identical row's call"),
+        ("Input tokens", f"{tokens['input_tokens']:,} (+{tokens['cache_read_input_tokens']:,} cache reads, "
+                         f"{tokens['cache_creation_input_tokens']:,} cache writes)"),
+        ("Output tokens", f"{tokens['output_tokens']:,}"),
+        ("Estimated cost", f"${summary['cost_usd']:.4f}"),
+        ("Call latency", f"mean {seconds(latency['mean'])}, p50 {seconds(latency['p50'])}, "
+                         f"p95 {seconds(latency['p95'])}, max {seconds(latency['max'])}"),
+        ("Latency histogram", histogram or "no calls"),
+    ]
@@ -0,0 +1,100 @@
+"""
+One priority queue for every Claude call a client makes.
+
+analyze_many() used to start its own pool of workers per call. A
+chunked run (pipeline.screen_stream) calls it once per chunk, so every
+chunk started cold with a serial warm-up call and a fresh fan-out, and
+most-urgent-first stopped at the chunk boundary. A ClaudeClient now owns
+one CallScheduler. Every cohort queues its calls here, the most urgent
+queued call is sent next whichever cohort it came from, and the warm-up
+call that writes the system prompt cache happens once per client.
+"""
+import asyncio
+import itertools
+
+
+class CallScheduler:
+    """
+    Priority queue of calls drained by a fixed pool of workers.
+
+    Args:
+        workers: Calls started at once. Use the limiter's maximum
+            concurrency, so a call taken off the queue always gets a slot
+            and nothing overtakes the queue order while waiting.
+
+    Example:
+        >>> scheduler = CallScheduler(workers=32)
+        >>> done = scheduler.submit(lambda: claude.assess(patient), priority=0.9)
+        >>> await done
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.queue = asyncio.PriorityQueue()
+        self.order = itertools.count()
+        # Future handed out by submit() -> task running its job
+        self.running = {}
+        self.tasks = []
+
+    def submit(self, job, priority=0.0):
+        """
+        Queue a call. Higher priority is sent sooner; ties go in submit order.
+
+        Args:
+            job: Zero-argument coroutine function making the call; it
+                handles its own API errors
+            priority: Urgency score
+
+        Returns:
+            asyncio.Future: Resolved once the job has run
+        """
+        done = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((-priority, next(self.order), job, done))
+        if not self.tasks:
+            self.tasks.append(asyncio.ensure_future(self.start()))
+        return done
+
+    async def start(self):
+        # The first call writes the system prompt cache; the fan-out reads it
+        await self.run_next()
+        self.tasks += [asyncio.ensure_future(self.worker()) for _ in range(self.workers)]
+
+    async def worker(self):
+        while True:
+            await self.run_next()
+
+    async def run_next(self):
+        _, _, job, done = await self.queue.get()
+        if done.done():
+            # Cancelled while queued
+            return
+        task = asyncio.ensure_future(job())
+        self.running[done] = task
+        try:
+            # wait() rather than await, so cancelling the job doesn't stop the worker
+            await asyncio.wait([task])
+        finally:
+            self.running.pop(done, None)
+        if done.done():
+            return
+        if task.cancelled():
+            done.cancel()
+        elif task.exception() is not None:
+            done.set_exception(task.exception())
+        else:
+            done.set_result(None)
+
+    def cancel(self, futures):
+        """Drop these submitted calls: queued ones are skipped, running ones cancelled."""
+        for done in futures:
+            task = self.running.get(done)
+            if task:
+                task.cancel()
+            done.cancel()
+
+    async def close(self):
+        tasks = [*self.tasks, *self.running.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.tasks = []
@@ -0,0 +1,237 @@
+"""
+Buffered HIPAA audit-log writer for the MindBridge API.
+
+Handlers call AuditBuffer.record() on every PHI read. That only appends
+a tuple to an in-process deque, so the request never waits on Postgres.
+A background task drains the deque into audit_logs with COPY, either
+every flush_interval_ms or as soon as flush_max_records rows are
+waiting, whichever comes first. lifespan() flushes once more on shutdown.
+
+Loss and lag guarantee:
+    - With the database reachable, a record reaches Postgres within
+      flush_interval_ms plus one COPY round trip.
+    - A hard crash loses at most the rows still pending, which is never
+      more than max_pending. stats() reports that number live.
+    - While Postgres is down, flushes back off exponentially (from
+      flush_interval_ms up to max_backoff_ms) instead of retrying on
+      every record() wake-up, and recover at the normal pace after the
+      first successful flush.
+    - If Postgres stays down long enough to fill the buffer, new records
+      are counted in 'dropped' instead of blocking the request. The
+      buffer always keeps the oldest rows and drops the newest, so what
+      survives is an unbroken prefix of the trail.
+"""
+import asyncio
+import ipaddress
+import json
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+AUDIT_SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS audit_logs (
+        id UUID PRIMARY KEY,
+        user_id UUID,
+        action VARCHAR(50) NOT NULL,
+        resource_type VARCHAR(50) NOT NULL,
+        resource_id TEXT,
+        changes JSONB,
+        ip_address INET,
+        user_agent TEXT,
+        session_id VARCHAR(255),
+        phi_accessed BOOLEAN DEFAULT FALSE,
+        access_reason TEXT,
+        created_at TIMESTAMP DEFAULT NOW()
+    );
+    CREATE INDEX IF NOT EXISTS idx_audit_user ON audit_logs(user_id, created_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_audit_resource ON audit_logs(resource_type, resource_id);
+    CREATE INDEX IF NOT EXISTS idx_audit_phi ON audit_logs(phi_accessed, created_at DESC)
+        WHERE phi_accessed = TRUE;
+"""
+
+AUDIT_COLUMNS = [
+    "id", "user_id", "action", "resource_type", "resource_id", "changes",
+    "ip_address", "user_agent", "session_id", "phi_accessed",
+    "access_reason", "created_at",
+]
+
+
+def _parse_ip(host):
+    """Return an ipaddress object for INET, or None if host isn't an IP."""
+    try:
+        return ipaddress.ip_address(host) if host else None
+    except ValueError:
+        return None
+
+
+class AuditBuffer:
+    """
+    Non-blocking audit-log buffer flushed to Postgres in batches.
+
+    Args:
+        pool: asyncpg pool used for the COPY flushes
+        flush_interval_ms: Longest time a record waits before a flush
+        flush_max_records: Pending count that triggers an early flush
+        max_pending: Hard cap on unflushed records (the loss bound)
+        max_backoff_ms: Longest wait between flush retries while the
+            database is failing
+
+    Example:
+        >>> audit = AuditBuffer(db_pool)
+        >>> await audit.start()
+        >>> audit.record("READ", "patient", 42, ip_address="10.0.0.1")
+        >>> await audit.close()
+    """
+
+    def __init__(self, pool, flush_interval_ms=250, flush_max_records=500,
+                 max_pending=10_000, max_backoff_ms=30_000):
+        self.pool = pool
+        self.flush_interval_ms = flush_interval_ms
+        self.flush_max_records = flush_max_records
+        self.max_pending = max_pending
+        self.max_backoff_ms = max_backoff_ms
+
+        # Each entry is (monotonic enqueue time, COPY record tuple)
+        self._pending = deque()
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._stop = asyncio.Event()
+        self._task = None
+        self._closing = False
+        # Wait before the next flush after a failure (0 = healthy)
+        self._backoff_ms = 0.0
+
+        self.flushed = 0
+        self.dropped = 0
+        self.flush_failures = 0
+        self.max_lag_ms = 0.0
+        self.last_flush_at = None
+
+    def record(self, action, resource_type, resource_id=None, *, user_id=None,
+               changes=None, ip_address=None, user_agent=None,
+               session_id=None, phi_accessed=True, access_reason=None):
+        """
+        Queue one audit row without touching the database.
+
+        Returns:
+            bool: False if the buffer was full and the record was dropped
+        """
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return False
+
+        row = (
+            uuid.uuid4(),
+            user_id,
+            action,
+            resource_type,
+            None if resource_id is None else str(resource_id),
+            None if changes is None else json.dumps(changes),
+            _parse_ip(ip_address),
+            user_agent,
+            session_id,
+            phi_accessed,
+            access_reason,
+            datetime.utcnow(),
+        )
+        self._pending.append((time.monotonic(), row))
+
+        if len(self._pending) >= self.flush_max_records:
+            self._wake.set()
+        return True
+
+    async def start(self):
+        """Start the background flush task."""
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while not self._closing:
+            # After a failure, record() wake-ups are ignored until the
+            # backoff is over; only close() cuts it short
+            event = self._stop if self._backoff_ms else self._wake
+            try:
+                await asyncio.wait_for(event.wait(),
+                                       timeout=(self._backoff_ms or self.flush_interval_ms) / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._closing:
+                break
+            if await self.flush():
+                self._backoff_ms = 0.0
+            else:
+                self._backoff_ms = min(self.max_backoff_ms,
+                                       max(self.flush_interval_ms, self._backoff_ms * 2))
+
+    async def flush(self):
+        """
+        COPY everything pending into audit_logs.
+
+        On failure the batch goes back to the front of the buffer so the
+        next flush retries it in order. Records queued during the failed
+        COPY can push the buffer past max_pending; the newest of them are
+        then dropped (and counted), as record() would have done.
+
+        Returns:
+            bool: True if the buffer was fully drained
+        """
+        async with self._flush_lock:
+            while self._pending:
+                batch = [self._pending.popleft()
+                         for _ in range(min(self.flush_max_records, len(self._pending)))]
+                try:
+                    async with self.pool.acquire() as conn:
+                        await conn.copy_records_to_table(
+                            "audit_logs",
+                            records=[row for _, row in batch],
+                            columns=AUDIT_COLUMNS,
+                        )
+                except Exception as e:
+                    self._pending.extendleft(reversed(batch))
+                    overflow = len(self._pending) - self.max_pending
+                    for _ in range(max(0, overflow)):
+                        self._pending.pop()
+                        self.dropped += 1
+                    self.flush_failures += 1
+                    print(f"⚠️ Audit flush failed ({len(self._pending)} pending): {type(e).__name__}: {e}")
+                    return False
+
+                oldest_lag_ms = (time.monotonic() - batch[0][0]) * 1000
+                self.max_lag_ms = max(self.max_lag_ms, oldest_lag_ms)
+                self.flushed += len(batch)
+                self.last_flush_at = datetime.utcnow().isoformat()
+            return True
+
+    async def close(self):
+        """Stop the background task and flush whatever is left."""
+        self._closing = True
+        self._wake.set()
+        self._stop.set()
+        if self._task:
+            await self._task
+        await self.flush()
+
+    def stats(self):
+        """
+        Current loss/lag metrics for /health.
+
+        'pending' is the number of rows a crash right now would lose;
+        'oldest_pending_ms' is the current lag of the audit trail.
+        """
+        oldest_ms = 0.0
+        if self._pending:
+            oldest_ms = (time.monotonic() - self._pending[0][0]) * 1000
+        return {
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "oldest_pending_ms": round(oldest_ms, 1),
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "flush_failures": self.flush_failures,
+            "flush_backoff_ms": self._backoff_ms,
+            "flush_interval_ms": self.flush_interval_ms,
+            "flush_max_records": self.flush_max_records,
+            "last_flush_at": self.last_flush_at,
+        }
@@ -1,19 +1,41 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from contextlib import asynccontextmanager
+import asyncio
 import asyncpg
+import json
 import os
+import threading
 from dotenv import load_dotenv
 
+from app.ai.claude_client import ClaudeClient, parse_analysis
+from app.audit import AuditBuffer, AUDIT_SCHEMA_SQL
+from app.schema import PATIENT_SEARCH_SCHEMA_SQL, PATIENT_TRIAGE_SCHEMA_SQL
+from app.screening.records import PatientRecord
+from app.screening.screener import screen_patients
+
 load_dotenv()
 
 DATABASE_URL = os.environ.get("DATABASE_URL", "")
+AUDIT_FLUSH_INTERVAL_MS = int(os.environ.get("AUDIT_FLUSH_INTERVAL_MS", "250"))
+AUDIT_FLUSH_MAX_RECORDS = int(os.environ.get("AUDIT_FLUSH_MAX_RECORDS", "500"))
+AUDIT_MAX_PENDING = int(os.environ.get("AUDIT_MAX_PENDING", "10000"))
+
+# Trigrams need at least 3 characters to be selective
+SEARCH_MIN_QUERY_LENGTH = 3
+SEARCH_MAX_LIMIT = 50
+
+# How often a quiet screening stream checks whether its client is still there
+STREAM_DISCONNECT_CHECK_S = 1.0
 
 db_pool = None
+audit_buffer = None
+claude = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global db_pool
+    global db_pool, audit_buffer, claude
     try:
         db_pool = await asyncpg.create_pool(
             DATABASE_URL,
@@ -26,7 +48,32 @@ async def lifespan(app: FastAPI):
         print(f"⚠️ Database connection error: {type(e).__name__}: {e}")
         print(f"⚠️ DATABASE_URL starts with: {DATABASE_URL[:30] if DATABASE_URL else 'EMPTY'}")
         db_pool = None
+    if db_pool:
+        # setup_railway_mindbridge.py owns the schema; this only catches up
+        # older databases, so a failure (no patients table, no ALTER rights,
+        # another worker mid-CREATE INDEX) must not stop the API starting
+        async with db_pool.acquire() as conn:
+            for label, schema_sql in [
+                ("Audit log table", AUDIT_SCHEMA_SQL),
+                ("Triage column and index", PATIENT_TRIAGE_SCHEMA_SQL),
+                ("Trigram search indexes", PATIENT_SEARCH_SCHEMA_SQL),
+            ]:
+                try:
+                    await conn.execute(schema_sql)
+                except Exception as e:
+                    print(f"⚠️ {label} unavailable: {type(e).__name__}: {e}")
+        audit_buffer = AuditBuffer(
+            db_pool,
+            flush_interval_ms=AUDIT_FLUSH_INTERVAL_MS,
+            flush_max_records=AUDIT_FLUSH_MAX_RECORDS,
+            max_pending=AUDIT_MAX_PENDING
+        )
+        await audit_buffer.start()
+    claude = ClaudeClient()
     yield
+    await claude.close()
+    if audit_buffer:
+        await audit_buffer.close()
     if db_pool:
         await db_pool.close()
 
@@ -53,11 +100,24 @@ async def health_check():
         "status": "healthy",
         "service": "MindBridge Health AI",
         "version": "1.0.0",
-        "database": "connected" if db_pool else "unavailable"
+        "database": "connected" if db_pool else "unavailable",
+        "audit": audit_buffer.stats() if audit_buffer else None
     }
 
+def audit_phi_read(request: Request, resource_type: str, resource_id=None, action="READ"):
+    """Queue a PHI-read audit row; never blocks the request."""
+    if audit_buffer:
+        audit_buffer.record(
+            action,
+            resource_type,
+            resource_id,
+            ip_address=request.client.host if request.client else None,
+            user_agent=request.headers.get("user-agent"),
+            phi_accessed=True
+        )
+
 @app.get("/api/patients")
-async def get_patients():
+async def get_patients(request: Request):
     async with db_pool.acquire() as conn:
         rows = await conn.fetch("""
             SELECT 
@@ -71,6 +131,7 @@ async def get_patients():
             FROM patients
             ORDER BY id ASC
         """)
+    audit_phi_read(request, "patient_list")
     return {
         "success": True,
         "patients": [dict(row) for row in rows],
@@ -78,8 +139,151 @@ async def get_patients():
         "source": "FastAPI + Railway PostgreSQL"
     }
 
+@app.get("/api/patients/search")
+async def search_patients(
+    request: Request,
+    q: str = Query(..., min_length=SEARCH_MIN_QUERY_LENGTH, max_length=100),
+    limit: int = Query(10, ge=1, le=SEARCH_MAX_LIMIT)
+):
+    """Typeahead search on patient name or diagnosis, best matches first."""
+    # ILIKE and <% (word similarity) can both use the gin_trgm_ops indexes
+    pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    async with db_pool.acquire() as conn:
+        rows = await conn.fetch("""
+            SELECT
+                id,
+                patient_name,
+                risk_level,
+                diagnosis,
+                GREATEST(
+                    word_similarity($1, patient_name),
+                    word_similarity($1, COALESCE(diagnosis, ''))
+                ) AS score
+            FROM patients
+            WHERE patient_name ILIKE $2
+               OR diagnosis ILIKE $2
+               OR $1 <% patient_name
+               OR $1 <% diagnosis
+            ORDER BY score DESC, id ASC
+            LIMIT $3
+        """, q, pattern, limit)
+    audit_phi_read(request, "patient_search")
+    return {
+        "success": True,
+        "query": q,
+        "patients": [dict(row) for row in rows],
+        "count": len(rows)
+    }
+
+@app.get("/api/patients/at-risk")
+async def get_at_risk_patients(request: Request, limit: int = Query(20, ge=1, le=200)):
+    """Top-N most at-risk patients in triage order."""
+    async with db_pool.acquire() as conn:
+        rows = await conn.fetch("""
+            SELECT
+                id,
+                patient_name,
+                risk_level,
+                medication_adherence,
+                appointments_missed,
+                crisis_calls_30days,
+                diagnosis
+            FROM patients
+            ORDER BY risk_priority ASC, medication_adherence ASC
+            LIMIT $1
+        """, limit)
+    audit_phi_read(request, "patient_list")
+    return {
+        "success": True,
+        "patients": [dict(row) for row in rows],
+        "count": len(rows)
+    }
+
+def screening_row(row):
+    """Map a patients table row onto the PatientRecord screening uses."""
+    return PatientRecord.from_row({
+        "patient_id": row["id"],
+        "name": row["patient_name"],
+        "last_appointment": "Not recorded",
+        "appointments_missed": row["appointments_missed"],
+        "medication_adherence": row["medication_adherence"],
+        "crisis_calls_30days": row["crisis_calls_30days"],
+        "diagnosis": row["diagnosis"],
+        "case_manager": "Not assigned"
+    })
+
+@app.post("/api/patients/screen/stream")
+async def stream_screening(request: Request):
+    """
+    Screen every patient, streaming NDJSON results as they are decided.
+
+    The most urgent patients (by crisis calls, adherence and missed
+    appointments) are screened and emitted first. The blocking screener
+    runs in a worker thread and hands each result back to the event loop.
+
+    A POST, since every call starts a paid screen of the whole census.
+    If the client disconnects, the run is cancelled and its outstanding
+    Claude calls are dropped.
+    """
+    async with db_pool.acquire() as conn:
+        rows = await conn.fetch("""
+            SELECT
+                id,
+                patient_name,
+                medication_adherence,
+                appointments_missed,
+                crisis_calls_30days,
+                diagnosis
+            FROM patients
+            ORDER BY id ASC
+        """)
+    audit_phi_read(request, "patient_list", action="SCREEN")
+    patients = [screening_row(row) for row in rows]
+
+    loop = asyncio.get_running_loop()
+    landed = asyncio.Queue()
+
+    def on_result(index, result):
+        loop.call_soon_threadsafe(landed.put_nowait, (index, result))
+
+    def screening_done(screening):
+        # Retrieved here so a cancelled run's RunCancelled is never logged as unhandled
+        screening.exception()
+        # Queued after every on_result callback, so it always arrives last
+        landed.put_nowait(None)
+
+    async def stream():
+        cancel = threading.Event()
+        screening = asyncio.ensure_future(
+            asyncio.to_thread(screen_patients, patients, on_result=on_result, cancel=cancel)
+        )
+        screening.add_done_callback(screening_done)
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(landed.get(), STREAM_DISCONNECT_CHECK_S)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    continue
+                if item is None:
+                    break
+                index, result = item
+                yield json.dumps({
+                    "patient_id": patients[index].patient_id,
+                    **parse_analysis(result["analysis"]),
+                    "decided_by": result["decided_by"]
+                }) + "\n"
+            if screening.exception():
+                yield json.dumps({"error": type(screening.exception()).__name__}) + "\n"
+        finally:
+            # Client gone (or the response torn down): stop paying for calls nobody reads
+            cancel.set()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @app.get("/api/patients/{patient_id}")
-async def get_patient(patient_id: int):
+async def get_patient(patient_id: int, request: Request):
     async with db_pool.acquire() as conn:
         row = await conn.fetchrow("""
             SELECT * FROM patients WHERE id = $1
@@ -87,4 +291,20 @@ async def get_patient(patient_id: int):
     if not row:
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Patient not found")
-    return {"success": True, "patient": dict(row)}
\ No newline at end of file
+    audit_phi_read(request, "patient", patient_id)
+    return {"success": True, "patient": dict(row)}
+
+@app.post("/api/patients/{patient_id}/analyze")
+async def analyze_patient(patient_id: int, request: Request):
+    async with db_pool.acquire() as conn:
+        row = await conn.fetchrow("""
+            SELECT * FROM patients WHERE id = $1
+        """, patient_id)
+    if not row:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=404, detail="Patient not found")
+    audit_phi_read(request, "patient", patient_id, action="ANALYZE")
+
+    # Map the database columns onto the PatientRecord the prompt uses
+    assessment = await claude.assess(screening_row(row))
+    return {"success": True, "patient_id": patient_id, "analysis": assessment.as_dict()}
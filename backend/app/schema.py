@@ -0,0 +1,40 @@
+"""
+Patients-table DDL shared by the API and the database setup scripts.
+
+scripts/setup_railway_mindbridge.py (and scripts/test_docker_db.py for
+the local container) create the patients table and then apply these
+migrations; lifespan() in main.py re-applies them on startup so a
+database set up before a column or index existed catches up. Every
+statement is idempotent, so running them from both places is safe, and
+keeping them here means the two can't drift apart.
+"""
+
+# risk_priority lets triage order (HIGH first, worst adherence first)
+# stream straight from idx_patients_triage instead of sorting on a CASE.
+# The CHECK keeps risk_level to the three values risk_priority maps.
+PATIENT_TRIAGE_SCHEMA_SQL = """
+    ALTER TABLE patients
+    ADD COLUMN IF NOT EXISTS risk_priority SMALLINT GENERATED ALWAYS AS (
+        CASE risk_level
+            WHEN 'HIGH' THEN 1
+            WHEN 'MEDIUM' THEN 2
+            WHEN 'LOW' THEN 3
+        END
+    ) STORED;
+    DO $$ BEGIN
+        ALTER TABLE patients ADD CONSTRAINT patients_risk_level_check
+            CHECK (risk_level IN ('HIGH', 'MEDIUM', 'LOW'));
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$;
+    CREATE INDEX IF NOT EXISTS idx_patients_triage
+        ON patients(risk_priority, medication_adherence);
+"""
+
+# Trigram indexes for /api/patients/search typeahead
+PATIENT_SEARCH_SCHEMA_SQL = """
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    CREATE INDEX IF NOT EXISTS idx_patients_name_trgm
+        ON patients USING GIN (patient_name gin_trgm_ops);
+    CREATE INDEX IF NOT EXISTS idx_patients_diagnosis_trgm
+        ON patients USING GIN (diagnosis gin_trgm_ops);
+"""
@@ -0,0 +1,555 @@
+"""
+Columnar patient loader: parse the extract once into typed arrays.
+
+With csv.DictReader every patient is a dict of strings, and each
+consumer parses again: triage calls float() on adherence, the prompt
+builder and the Excel writer call int(float()) on the counts, and so
+on, several times per row. Here each chunk of the CSV is read with
+csv.reader, transposed, and converted column by column into
+NumPy arrays (float64 adherence, int32 counts). Diagnosis and case
+manager are dictionary-encoded: an int32 code per row plus the list of
+distinct strings, which are few.
+
+Triage and priority scores read the arrays directly. rows() hands the
+rest of the pipeline PatientRecords whose numeric fields are already
+numbers, so nothing downstream parses them again.
+
+Rows that can't be parsed (missing fields, non-numeric or out-of-range
+values) are dropped and reported through an on_reject callback.
+
+For multi-gigabyte extracts, parallel_column_chunks() splits the file
+into byte ranges at line boundaries and parses them in a process pool
+(SCREENING_PARSE_WORKERS or --parse-workers), yielding the chunks in
+file order.
+
+Extracts may arrive as .csv.gz or .csv.zst. They are decompressed as
+they are read, never to a file on disk. Uncompressed files are read
+through mmap (mapped_column_chunks()).
+"""
+import csv
+import gzip
+import io
+import math
+import mmap
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+
+import numpy as np
+
+from app.screening.records import PatientRecord
+
+# Worker processes for parsing (0 = parse in this process)
+DEFAULT_PARSE_WORKERS = int(os.environ.get("SCREENING_PARSE_WORKERS", "0"))
+# Bytes of CSV per parse task; a few of these per worker are in flight
+DEFAULT_RANGE_BYTES = 8 * 2**20
+
+REQUIRED_COLUMNS = (
+    'patient_id',
+    'name',
+    'last_appointment',
+    'appointments_missed',
+    'medication_adherence',
+    'crisis_calls_30days',
+    'diagnosis',
+    'case_manager'
+)
+
+# Counts are stored as int32; larger values are rejected, not wrapped
+MAX_COUNT = int(np.iinfo(np.int32).max)
+
+
+def row_problem(row):
+    """
+    Why a row can't be screened, or None if it can.
+
+    Args:
+        row: Dict with the patients.csv columns (string values)
+    """
+    missing = [column for column in REQUIRED_COLUMNS if not str(row.get(column) or '').strip()]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    try:
+        adherence = float(row['medication_adherence'])
+        counts = (float(row['appointments_missed']), float(row['crisis_calls_30days']))
+    except ValueError:
+        return "non-numeric adherence, missed appointments or crisis calls"
+    if not 0 <= adherence <= 1:
+        return f"medication_adherence {adherence} outside 0-1"
+    if not all(math.isfinite(count) and count >= 0 for count in counts):
+        return "negative or non-finite appointment or crisis-call count"
+    if any(count > MAX_COUNT for count in counts):
+        return f"appointment or crisis-call count above {MAX_COUNT}"
+    return None
+
+
+def encode_strings(values):
+    """
+    Dictionary-encode a string column.
+
+    Returns:
+        tuple: (int32 code per value, list of distinct strings)
+    """
+    distinct = list(dict.fromkeys(values))
+    lookup = {value: code for code, value in enumerate(distinct)}
+    codes = np.fromiter(map(lookup.__getitem__, values), dtype=np.int32, count=len(values))
+    return codes, distinct
+
+
+class PatientColumns:
+    """
+    One chunk of patients as typed columns.
+
+    Attributes:
+        patient_id, name, last_appointment: Lists of str
+        adherence: float64 array (0.0-1.0)
+        missed, crisis: int32 arrays
+        diagnosis_codes, case_manager_codes: int32 arrays indexing
+            diagnoses / case_managers (lists of distinct str)
+
+    Example:
+        >>> chunk = load_columns("patients.csv")
+        >>> codes = triage_codes(*chunk.triage_arrays())
+        >>> chunk.rows()[0].medication_adherence
+        0.6
+    """
+
+    def __init__(self, patient_id, name, last_appointment, adherence, missed, crisis,
+                 diagnosis_codes, diagnoses, case_manager_codes, case_managers):
+        self.patient_id = patient_id
+        self.name = name
+        self.last_appointment = last_appointment
+        self.adherence = adherence
+        self.missed = missed
+        self.crisis = crisis
+        self.diagnosis_codes = diagnosis_codes
+        self.diagnoses = diagnoses
+        self.case_manager_codes = case_manager_codes
+        self.case_managers = case_managers
+
+    def __len__(self):
+        return len(self.patient_id)
+
+    def select(self, indexes):
+        """A new PatientColumns with just these rows, in this order."""
+        picked = np.asarray(indexes, dtype=np.intp)
+        return PatientColumns(
+            [self.patient_id[i] for i in indexes], [self.name[i] for i in indexes],
+            [self.last_appointment[i] for i in indexes],
+            self.adherence[picked], self.missed[picked], self.crisis[picked],
+            self.diagnosis_codes[picked], self.diagnoses,
+            self.case_manager_codes[picked], self.case_managers
+        )
+
+    def triage_arrays(self, indexes=None):
+        """
+        (adherence, missed, crisis) for triage_codes() and priority_scores().
+
+        Args:
+            indexes: Optional row positions to select (default: every row)
+        """
+        arrays = (self.adherence, self.missed, self.crisis)
+        if indexes is None:
+            return arrays
+        indexes = np.asarray(indexes, dtype=np.intp)
+        return tuple(array[indexes] for array in arrays)
+
+    def rows(self):
+        """
+        The chunk as PatientRecords.
+
+        Diagnosis and case manager strings are shared between records
+        rather than copied per row.
+
+        Returns:
+            list: One PatientRecord per row
+        """
+        return list(map(
+            PatientRecord, self.patient_id, self.name, self.last_appointment,
+            self.missed.tolist(), self.adherence.tolist(), self.crisis.tolist(),
+            map(self.diagnoses.__getitem__, self.diagnosis_codes.tolist()),
+            map(self.case_managers.__getitem__, self.case_manager_codes.tolist())
+        ))
+
+    @classmethod
+    def concat(cls, chunks):
+        """Join chunks into one, merging the string dictionaries."""
+        chunks = list(chunks)
+
+        def merge(codes_of, names_of):
+            names = {}
+            codes = [
+                np.array([names.setdefault(name, len(names)) for name in names_of(c)],
+                         dtype=np.int32)[codes_of(c)]
+                for c in chunks
+            ]
+            return (np.concatenate(codes) if codes else np.empty(0, np.int32)), list(names)
+
+        diagnosis_codes, diagnosis_names = merge(lambda c: c.diagnosis_codes, lambda c: c.diagnoses)
+        manager_codes, manager_names = merge(lambda c: c.case_manager_codes, lambda c: c.case_managers)
+        return cls(
+            list(chain.from_iterable(c.patient_id for c in chunks)),
+            list(chain.from_iterable(c.name for c in chunks)),
+            list(chain.from_iterable(c.last_appointment for c in chunks)),
+            np.concatenate([c.adherence for c in chunks]) if chunks else np.empty(0, np.float64),
+            np.concatenate([c.missed for c in chunks]) if chunks else np.empty(0, np.int32),
+            np.concatenate([c.crisis for c in chunks]) if chunks else np.empty(0, np.int32),
+            diagnosis_codes, diagnosis_names, manager_codes, manager_names
+        )
+
+
+def record_columns(records, positions):
+    """Text columns (name -> list of str) from csv.reader records; short rows get ''."""
+    if min(map(len, records)) > max(positions[name] for name in REQUIRED_COLUMNS):
+        return {name: [record[positions[name]] for record in records] for name in REQUIRED_COLUMNS}
+    return {name: [record[positions[name]] if positions[name] < len(record) else ''
+                   for record in records]
+            for name in REQUIRED_COLUMNS}
+
+
+def split_block(block, rows, positions, width):
+    """
+    Text columns from `rows` lines of CSV text, splitting the whole block at once.
+
+    Only valid for unquoted CSV, so the caller checks for quotes first.
+
+    Returns:
+        dict: name -> list of str, or None if any line doesn't have
+        exactly `width` fields (blank or ragged lines)
+    """
+    block = block.replace("\r\n", "\n")
+    if block.endswith("\n"):
+        block = block[:-1]
+    fields = block.replace("\n", ",").split(",")
+    if len(fields) != rows * width:
+        return None
+    return {name: fields[positions[name]::width] for name in REQUIRED_COLUMNS}
+
+
+def split_columns(lines, positions, width):
+    """split_block() for a list of lines."""
+    return split_block("".join(lines), len(lines), positions, width)
+
+
+def parse_columns(text, first_row=2, on_reject=None):
+    """
+    Convert text columns to PatientColumns.
+
+    Numeric columns are converted in one np.array() call each. Only if
+    that fails are the rows checked one by one to find and drop the bad
+    ones.
+
+    Args:
+        text: Column name -> list of str, one per row (all REQUIRED_COLUMNS)
+        first_row: Row number of the first row in the file (header is row 1)
+        on_reject: Optional callback(row_number, row, reason) per dropped row
+    """
+    try:
+        adherence = np.array(text['medication_adherence'], dtype=np.float64)
+        missed = np.array(text['appointments_missed'], dtype=np.float64)
+        crisis = np.array(text['crisis_calls_30days'], dtype=np.float64)
+        # Whitespace-only counts as empty, as in row_problem()
+        empty = any('' in map(str.strip, text[name])
+                    for name in ('patient_id', 'name', 'last_appointment', 'diagnosis', 'case_manager'))
+        in_range = ((adherence >= 0) & (adherence <= 1)
+                    & (missed >= 0) & (missed <= MAX_COUNT) & (crisis >= 0) & (crisis <= MAX_COUNT))
+        valid = not empty and bool(np.all(in_range))
+    except ValueError:
+        valid = False
+
+    if not valid:
+        keep = []
+        for offset in range(len(text['patient_id'])):
+            row = {name: text[name][offset] for name in REQUIRED_COLUMNS}
+            problem = row_problem(row)
+            if problem is None:
+                keep.append(offset)
+            elif on_reject:
+                on_reject(first_row + offset, row, problem)
+        text = {name: [values[i] for i in keep] for name, values in text.items()}
+        adherence = np.array(text['medication_adherence'], dtype=np.float64)
+        missed = np.array(text['appointments_missed'], dtype=np.float64)
+        crisis = np.array(text['crisis_calls_30days'], dtype=np.float64)
+
+    diagnosis_codes, diagnoses = encode_strings(text['diagnosis'])
+    manager_codes, case_managers = encode_strings(text['case_manager'])
+    return PatientColumns(
+        text['patient_id'], text['name'], text['last_appointment'],
+        adherence, missed.astype(np.int32), crisis.astype(np.int32),
+        diagnosis_codes, diagnoses, manager_codes, case_managers
+    )
+
+
+def header_positions(header):
+    """Column name -> index; raises ValueError naming any required column missing."""
+    positions = {name.strip(): i for i, name in enumerate(header)}
+    missing = [name for name in REQUIRED_COLUMNS if name not in positions]
+    if missing:
+        raise ValueError(f"patients.csv is missing columns: {', '.join(missing)}")
+    return positions
+
+
+def column_chunks(file, chunk_size, on_reject=None, header=None, first_row=2):
+    """
+    Yield PatientColumns of up to chunk_size rows from an open patients.csv.
+
+    Unquoted chunks (the usual EHR export) are split in one pass over
+    the text, which is several times faster than csv.reader. From the
+    first chunk containing a quote on, csv.reader takes over, since a
+    quoted field may hold commas or newlines.
+
+    Args:
+        file: Text file positioned at the header line, or at the first
+            data row if `header` is given
+        chunk_size: Rows per chunk (before invalid rows are dropped)
+        on_reject: Optional callback(row_number, row, reason) per dropped row
+        header: Column names, when the file doesn't start with them
+        first_row: Row number of the file's first data row
+    """
+    if header is None:
+        header = next(csv.reader([file.readline()]), [])
+    positions = header_positions(header)
+    width = len(header)
+    while True:
+        lines = list(islice(file, chunk_size))
+        if not lines:
+            return
+        if any('"' in line for line in lines):
+            break
+        text = split_columns(lines, positions, width)
+        if text is None:
+            # Blank or ragged lines: let csv.reader sort them out
+            records = [record for record in csv.reader(lines) if record]
+            if not records:
+                continue
+            text = record_columns(records, positions)
+        yield parse_columns(text, first_row, on_reject)
+        first_row += len(text['patient_id'])
+
+    reader = csv.reader(chain(lines, file))
+    while True:
+        # Blank lines come back as [] and are skipped, as csv.DictReader does
+        records = [record for record in islice(reader, chunk_size) if record]
+        if not records:
+            return
+        yield parse_columns(record_columns(records, positions), first_row, on_reject)
+        first_row += len(records)
+
+
+def mapped_column_chunks(path, chunk_size, on_reject=None):
+    """
+    Yield PatientColumns from an uncompressed patients.csv through mmap.
+
+    Each chunk is cut from the mapping as one block and decoded at once,
+    so the file isn't copied through read() buffers or split into
+    per-line strings. The cut is first guessed from the average row
+    length so far and then moved line by line to exactly chunk_size
+    rows. From the first chunk containing a quote on, the rest is read
+    as text with csv.reader, as column_chunks() does.
+
+    Args:
+        path: patients.csv (not empty; an empty file can't be mapped)
+        chunk_size: Rows per chunk (before invalid rows are dropped)
+        on_reject: Optional callback(row_number, row, reason) per dropped row
+    """
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        size = len(mapped)
+        start = mapped.find(b"\n") + 1 or size
+        header = next(csv.reader([mapped[:start].decode('utf-8')]), [])
+        positions = header_positions(header)
+        width = len(header)
+        first_row = 2
+        row_bytes = start
+        while start < size:
+            end = mapped.rfind(b"\n", start, start + row_bytes * chunk_size) + 1 or start
+            rows = mapped[start:end].count(b"\n")
+            while rows > chunk_size:
+                end = mapped.rfind(b"\n", start, end - 1) + 1
+                rows -= 1
+            while rows < chunk_size and end < size:
+                end = mapped.find(b"\n", end) + 1 or size
+                rows += 1
+            row_bytes = max(1, (end - start) // rows)
+            block = mapped[start:end].decode('utf-8')
+            if '"' in block:
+                file.seek(start)
+                text_file = io.TextIOWrapper(file, encoding='utf-8', newline='')
+                yield from column_chunks(text_file, chunk_size, on_reject, header=header,
+                                         first_row=first_row)
+                return
+            text = split_block(block, rows, positions, width)
+            if text is None:
+                # Blank or ragged lines: let csv.reader sort them out
+                records = [record for record in csv.reader(io.StringIO(block, newline='')) if record]
+                text = record_columns(records, positions) if records else None
+            if text is not None:
+                yield parse_columns(text, first_row, on_reject)
+                first_row += len(text['patient_id'])
+            start = end
+
+
+def is_compressed(path):
+    """True for .gz and .zst extracts."""
+    return str(path).lower().endswith(('.gz', '.zst'))
+
+
+def open_binary(path):
+    """
+    Open an extract as bytes, decompressing .gz and .zst as it is read.
+
+    Compressed streams only seek forward (by decompressing and
+    discarding), which is all offset-based readers need.
+    """
+    lower = str(path).lower()
+    if lower.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if lower.endswith('.zst'):
+        # Only needed for .zst extracts, so not a module-level import
+        import zstandard
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True)
+        return io.BufferedReader(reader, 2**20)
+    return open(path, 'rb')
+
+
+def open_extract(path):
+    """
+    Open patients.csv, patients.csv.gz or patients.csv.zst as text.
+
+    Compressed extracts are decompressed as they are read, so the full
+    CSV never has to be written out first.
+    """
+    if is_compressed(path):
+        return io.TextIOWrapper(open_binary(path), encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def line_ranges(path, start, range_bytes=DEFAULT_RANGE_BYTES):
+    """
+    Split a file from byte `start` into (start, end) ranges ending at a newline.
+
+    Each range is about range_bytes long, extended to the end of the
+    line it would otherwise cut.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as file:
+        while start < size:
+            file.seek(min(start + range_bytes, size))
+            file.readline()
+            end = min(file.tell(), size)
+            yield start, end
+            start = end
+
+
+def spans_lines(text):
+    """True if a quoted field may continue onto the next line (odd quote count)."""
+    return '"' in text and any(line.count('"') % 2 for line in text.split("\n"))
+
+
+def parse_range(path, start, end, header, chunk_size):
+    """
+    Parse one byte range of patients.csv in a worker process.
+
+    Returns:
+        tuple: (list of PatientColumns, rejects as (row offset, row, reason),
+        rows read), or None if a quoted field may cross the range's line
+        boundaries, in which case the caller parses from `start` itself
+    """
+    with open(path, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode('utf-8')
+    if spans_lines(text):
+        return None
+    rejects = []
+    chunks = list(column_chunks(io.StringIO(text, newline=''), chunk_size,
+                                on_reject=lambda *reject: rejects.append(reject),
+                                header=header, first_row=0))
+    return chunks, rejects, sum(map(len, chunks)) + len(rejects)
+
+
+def parallel_column_chunks(path, chunk_size, workers, on_reject=None,
+                           range_bytes=DEFAULT_RANGE_BYTES):
+    """
+    Yield PatientColumns in file order, parsing byte ranges in a process pool.
+
+    Ranges are parsed and validated by `workers` processes, at most two
+    per worker ahead of the consumer. Chunks don't straddle ranges, so
+    the chunk ending a range may be short. on_reject still runs here, in
+    order, with file-wide row numbers.
+
+    A quoted field holding a newline could be cut by a range boundary.
+    Ranges where that is possible are detected, and from the first one
+    on the file is parsed sequentially, as read_column_chunks() would.
+
+    Args:
+        path: patients.csv
+        chunk_size: Rows per chunk (before invalid rows are dropped)
+        workers: Worker processes
+        on_reject: Optional callback(row_number, row, reason) per dropped row
+        range_bytes: Bytes of CSV per parse task
+    """
+    with open(path, 'rb') as file:
+        header_line = file.readline()
+    header = next(csv.reader([header_line.decode('utf-8')]), [])
+    header_positions(header)
+
+    first_row = 2
+    # spawn, not fork: the caller may already be running reader and HTTP threads
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = deque()
+        ranges = line_ranges(path, len(header_line), range_bytes)
+        while True:
+            for start, end in islice(ranges, 2 * workers - len(pending)):
+                pending.append((start, pool.submit(parse_range, path, start, end, header,
+                                                   chunk_size)))
+            if not pending:
+                return
+            start, future = pending.popleft()
+            parsed = future.result()
+            if parsed is None:
+                for _, other in pending:
+                    other.cancel()
+                with open(path, 'rb') as raw:
+                    raw.seek(start)
+                    file = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+                    yield from column_chunks(file, chunk_size, on_reject, header=header,
+                                             first_row=first_row)
+                return
+            chunks, rejects, rows = parsed
+            if on_reject:
+                for offset, row, reason in rejects:
+                    on_reject(first_row + offset, row, reason)
+            yield from chunks
+            first_row += rows
+
+
+def read_column_chunks(path, chunk_size, on_reject=None, workers=DEFAULT_PARSE_WORKERS):
+    """
+    Yield PatientColumns of up to chunk_size rows each, reading the file once.
+
+    Args:
+        path: patients.csv, or a .csv.gz / .csv.zst extract (decompressed
+            as it is read)
+        chunk_size: Rows per chunk (before invalid rows are dropped)
+        on_reject: Optional callback(row_number, row, reason) per dropped row
+        workers: Parse in this many worker processes (see
+            parallel_column_chunks); 0 parses in this process. Compressed
+            extracts can't be split by byte range and are always parsed
+            here.
+    """
+    if is_compressed(path):
+        with open_extract(path) as file:
+            yield from column_chunks(file, chunk_size, on_reject)
+    elif workers:
+        yield from parallel_column_chunks(path, chunk_size, workers, on_reject)
+    elif os.path.getsize(path):
+        yield from mapped_column_chunks(path, chunk_size, on_reject)
+    else:
+        with open_extract(path) as file:
+            yield from column_chunks(file, chunk_size, on_reject)
+
+
+def load_columns(path, chunk_size=100_000, on_reject=None, workers=DEFAULT_PARSE_WORKERS):
+    """Whole extract as one PatientColumns (parsed chunk by chunk)."""
+    return PatientColumns.concat(read_column_chunks(path, chunk_size, on_reject, workers))
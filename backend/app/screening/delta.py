@@ -0,0 +1,140 @@
+"""
+Per-patient screening state for delta re-screening.
+
+Most of the census hasn't changed since yesterday's run. For each
+patient_id we store a fingerprint of everything that shaped the last
+result: the analyzed fields, prompt version, model (or cascade) and
+triage rules version. We store the result with it. A delta run only analyzes patients
+whose fingerprint is new or different and carries the rest forward, so
+daily LLM volume tracks the day's churn instead of the census size.
+
+Stored in SQLite at cache/screening_state.db unless SCREENING_STATE_PATH
+says otherwise.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from app.ai.analysis_cache import normalize_summary
+from app.ai.claude_client import DEFAULT_MODEL, PROMPT_VERSION, build_patient_summary
+
+DEFAULT_STATE_PATH = Path(
+    os.environ.get(
+        "SCREENING_STATE_PATH",
+        Path(__file__).resolve().parent.parent.parent.parent / "cache" / "screening_state.db"
+    )
+)
+
+
+def screening_fingerprint(patient, rules_version, model=DEFAULT_MODEL):
+    """
+    Hash of every input that determines a patient's screening result.
+
+    Args:
+        patient: PatientRecord
+        rules_version: Triage rules version
+        model: Model setup that screens the patient: the model name, or
+            Cascade.label() when a cascade is on, so switching the cascade
+            on or off re-screens everyone
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    payload = json.dumps({
+        "summary": normalize_summary(build_patient_summary(patient)),
+        "prompt_version": PROMPT_VERSION,
+        "model": model,
+        "rules_version": rules_version,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ScreeningState:
+    """
+    Last screening result per patient, keyed by patient_id.
+
+    Example:
+        >>> state = ScreeningState()
+        >>> previous = state.load(patient.patient_id for patient in patients)
+        >>> state.save_many([(patient_id, fingerprint, analysis, decided_by)])
+    """
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS patient_state (
+                patient_id TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                analysis TEXT NOT NULL,
+                decided_by TEXT NOT NULL,
+                screened_at TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def load_all(self):
+        """
+        Returns:
+            dict: patient_id -> {fingerprint, analysis, decided_by, screened_at}
+        """
+        rows = self.conn.execute(
+            "SELECT patient_id, fingerprint, analysis, decided_by, screened_at FROM patient_state"
+        )
+        return {
+            row[0]: {
+                'fingerprint': row[1],
+                'analysis': row[2],
+                'decided_by': row[3],
+                'screened_at': row[4]
+            }
+            for row in rows
+        }
+
+    def load(self, patient_ids):
+        """
+        Last results for just these patients, so a chunk of a large extract
+        doesn't pull in the whole census.
+
+        Returns:
+            dict: patient_id -> {fingerprint, analysis, decided_by, screened_at}
+        """
+        ids = list(dict.fromkeys(str(pid) for pid in patient_ids))
+        found = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            rows = self.conn.execute(
+                "SELECT patient_id, fingerprint, analysis, decided_by, screened_at FROM patient_state "
+                f"WHERE patient_id IN ({', '.join('?' * len(batch))})",
+                batch
+            )
+            for row in rows:
+                found[row[0]] = {
+                    'fingerprint': row[1],
+                    'analysis': row[2],
+                    'decided_by': row[3],
+                    'screened_at': row[4]
+                }
+        return found
+
+    def save_many(self, entries):
+        """
+        Upsert fresh results in one transaction.
+
+        Args:
+            entries: Iterable of (patient_id, fingerprint, analysis, decided_by)
+        """
+        screened_at = datetime.now().strftime('%Y-%m-%d %H:%M')
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO patient_state VALUES (?, ?, ?, ?, ?)",
+            ((str(pid), fp, analysis, source, screened_at) for pid, fp, analysis, source in entries)
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
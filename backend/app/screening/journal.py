@@ -0,0 +1,90 @@
+"""
+Append-only run journal for checkpoint/resume of long screening runs.
+
+Every completed analysis is appended to cache/runs/<run-id>.jsonl and
+flushed right away. If a 10,000-patient run dies at patient 4,000
+(network error, 529, Ctrl-C), re-running with --resume <run-id> loads
+the journal, skips every patient already recorded, and goes straight to
+rendering once the rest are done. Failed ('Unknown') analyses are never
+journaled, so a resume retries them.
+"""
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+RUNS_DIR = Path(
+    os.environ.get(
+        "SCREENING_RUNS_DIR",
+        Path(__file__).resolve().parent.parent.parent.parent / "cache" / "runs"
+    )
+)
+
+
+class RunJournal:
+    """
+    JSONL journal of one screening run.
+
+    Args:
+        run_id: Run identifier (the report timestamp)
+        runs_dir: Directory holding <run-id>.jsonl files
+
+    Example:
+        >>> journal = RunJournal("20260217_053754")
+        >>> journal.lookup(0, patient)          # None if not done yet
+        >>> journal.record(0, patient, result)
+        >>> journal.close()
+    """
+
+    def __init__(self, run_id, runs_dir=RUNS_DIR):
+        self.run_id = run_id
+        self.path = Path(runs_dir) / f"{run_id}.jsonl"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.completed = self._load()
+        self.file = open(self.path, 'a', encoding='utf-8')
+        if self.torn:
+            # Terminate the torn line so the next record starts clean
+            self.file.write("\n")
+
+    def _load(self):
+        completed = {}
+        self.torn = False
+        if not self.path.exists():
+            return completed
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                self.torn = not line.endswith("\n")
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-write can leave a torn last line
+                    continue
+                completed[entry['index']] = entry
+        return completed
+
+    def lookup(self, index, patient):
+        """
+        Result recorded for row `index`, or None.
+
+        The patient_id must match too, so a journal from a different
+        extract can't be applied to the wrong patients.
+        """
+        entry = self.completed.get(index)
+        if entry and entry['patient_id'] == str(patient.patient_id):
+            return entry['result']
+        return None
+
+    def record(self, index, patient, result):
+        """Append one completed result and flush it to disk."""
+        entry = {
+            'index': index,
+            'patient_id': str(patient.patient_id),
+            'result': result,
+            'recorded_at': datetime.now().isoformat(timespec='seconds')
+        }
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        self.completed[index] = entry
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,53 @@
+"""
+Live feed of screening results as they are decided.
+
+The report files are only written once the whole cohort is screened.
+The live feed is a plain-text file that gets one line per patient the
+moment their result lands, most urgent first, so a clinician can
+`tail -f` it and start on the High-risk patients within the first
+minute of a long run. High-risk lines are echoed to the console too.
+"""
+from datetime import datetime
+
+from app.ai.claude_client import parse_analysis
+
+
+def feed_line(patient, result):
+    """One live-feed line: time, level, patient, primary factor, provenance."""
+    parsed = parse_analysis(result['analysis'])
+    return (
+        f"{datetime.now().strftime('%H:%M:%S')}  {parsed['risk_level'].upper():<7}  "
+        f"{patient.patient_id}  {patient.name}  -  {parsed['primary_factor']}  "
+        f"[{result['decided_by']}]"
+    )
+
+
+class LiveFeed:
+    """
+    Append-only live results file.
+
+    Args:
+        path: Text file to append to (kept on resume, so one run has one feed)
+
+    Example:
+        >>> feed = LiveFeed("reports/live_screening_20250101_0900.txt")
+        >>> screen_patients(patients, on_result=lambda i, r: feed.emit(patients[i], r))
+        >>> feed.close()
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'a', encoding='utf-8')
+        self.emitted = 0
+
+    def emit(self, patient, result):
+        """Write one result and flush it so readers see it immediately."""
+        line = feed_line(patient, result)
+        self.file.write(line + "\n")
+        self.file.flush()
+        self.emitted += 1
+        if parse_analysis(result['analysis'])['risk_level'] == "High":
+            print(f"🚨 {line}")
+
+    def close(self):
+        self.file.close()
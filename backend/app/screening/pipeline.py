@@ -0,0 +1,250 @@
+"""
+Bounded-memory screening pipeline for large extracts.
+
+The report scripts used to read the whole CSV into a list, screen it,
+and then keep the analyses and the High/Medium/Low lists alongside it,
+so memory grew with the extract. Here each stage is a generator:
+
+    read_column_chunks -> screen_stream -> report sink
+
+Chunks are parsed and validated into typed columns (see columns.py) on
+a background thread and handed over through a bounded queue
+(DEFAULT_QUEUE_CHUNKS x DEFAULT_CHUNK_SIZE rows), so the next chunk is
+parsed while the current one is with Claude, and the reader blocks
+instead of running ahead. With parse workers (parallel_column_chunks)
+that thread just collects chunks parsed in other processes. Every chunk
+is screened by one ScreeningRun, so the Claude client, rate limiter,
+analysis cache, cascade and run deadline span the whole extract. Each
+chunk is triaged straight from its arrays and queued on Claude as it
+arrives, up to DEFAULT_LOOKAHEAD_CHUNKS ahead of the oldest unfinished
+one. Those chunks share one priority queue, so the most urgent patient
+in the window is sent first whichever chunk it is in. Results come out
+in input order and are written to the sink and dropped. RiskTally keeps
+the summary counts as results go by, and LineSpool keeps report
+sections that are printed after the patient loop (the High-risk
+roster, ...) on disk.
+
+In batch mode the window instead grows until DEFAULT_BATCH_MAX_REQUESTS
+patients need Claude, and they go out as one Message Batch. In either
+mode the window is also flushed once it holds DEFAULT_MAX_BUFFERED_ROWS
+rows. When the rules decide most patients, a batch can otherwise gather
+across so many chunks that the whole extract ends up in memory.
+
+A 50-row extract is one chunk and screens exactly as before. Urgency
+ordering and de-duplication reach across the lookahead window; beyond
+it the order is the file order, since ordering the whole extract would
+mean holding it in memory.
+"""
+import os
+import queue
+import tempfile
+import threading
+from collections import Counter, deque
+
+from app.ai.batch_screening import DEFAULT_BATCH_MAX_REQUESTS
+from app.screening.screener import ScreeningRun
+
+DEFAULT_CHUNK_SIZE = int(os.environ.get("SCREENING_CHUNK_SIZE", "1000"))
+# Chunks the reader may get ahead of the screener
+DEFAULT_QUEUE_CHUNKS = 2
+# Chunks queued on Claude ahead of the oldest one still being screened
+DEFAULT_LOOKAHEAD_CHUNKS = int(os.environ.get("SCREENING_LOOKAHEAD_CHUNKS", "4"))
+# Rows held in the window before the oldest chunk is finished regardless
+DEFAULT_MAX_BUFFERED_ROWS = int(os.environ.get("SCREENING_MAX_BUFFERED_ROWS", "50000"))
+
+RISK_LEVELS = ("High", "Medium", "Low")
+
+_DONE = object()
+
+
+def prefetch(items, maxsize=DEFAULT_QUEUE_CHUNKS):
+    """
+    Produce `items` on a background thread through a bounded queue.
+
+    The producer blocks once `maxsize` items are waiting, so a slow
+    consumer caps how far ahead it reads. Exceptions raised while
+    producing are re-raised in the consumer.
+    """
+    buffer = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item):
+        # Give up once the consumer has gone, instead of blocking forever
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(e)
+
+    thread = threading.Thread(target=produce, name="patient-reader", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # Consumer stopped early (error, Ctrl-C): let the reader exit
+        stop.set()
+
+
+def screen_stream(chunks, progress=None, on_result=None, lookahead=DEFAULT_LOOKAHEAD_CHUNKS,
+                  max_buffered_rows=DEFAULT_MAX_BUFFERED_ROWS, **run_kwargs):
+    """
+    Screen PatientColumns chunks as one run, yielding results as they are final.
+
+    Args:
+        chunks: Iterable of PatientColumns, e.g. read_column_chunks(); the
+            chunk size and lookahead bound memory
+        progress: Optional callback(done, patient) after each Claude analysis,
+            with done counted across the whole run
+        on_result: Optional callback(patient, result) as each result is
+            decided, most urgent first within the lookahead window
+        lookahead: Chunks queued on Claude ahead of the oldest unfinished one
+            (interactive mode)
+        max_buffered_rows: Rows the window may hold before the oldest
+            chunk is finished (in batch mode this sends the batch early)
+        **run_kwargs: Passed to ScreeningRun (batch, delta, journal,
+            pack_size, cascade, metrics, deadline, ...); the deadline
+            covers the whole run and journal indexes stay extract-wide
+
+    Yields:
+        tuple: (PatientRecord, result) in input order
+    """
+    offset = 0
+    done = 0
+    window = deque()
+    buffered = 0
+
+    with ScreeningRun(**run_kwargs) as run:
+        def full():
+            if buffered > max_buffered_rows:
+                return True
+            if run.batch:
+                return run.queued >= DEFAULT_BATCH_MAX_REQUESTS
+            return len(window) > lookahead
+
+        for columns in prefetch(chunks):
+            chunk = columns.rows()
+
+            def chunk_progress(_done, _total, index, chunk=chunk):
+                nonlocal done
+                done += 1
+                if progress:
+                    progress(done, chunk[index])
+
+            def chunk_result(index, result, chunk=chunk):
+                if on_result:
+                    on_result(chunk[index], result)
+
+            window.append((chunk, run.start(chunk, progress=chunk_progress,
+                                            on_result=chunk_result, offset=offset,
+                                            columns=columns)))
+            offset += len(chunk)
+            buffered += len(chunk)
+            # Hand over whatever is already final (rules only, or landed) as we go
+            while window and (full() or window[0][1].done):
+                chunk, pending = window.popleft()
+                buffered -= len(chunk)
+                yield from zip(chunk, run.finish(pending))
+
+        while window:
+            chunk, pending = window.popleft()
+            yield from zip(chunk, run.finish(pending))
+
+
+class RiskTally:
+    """
+    Running summary counts, updated per result instead of re-scanning lists.
+
+    Example:
+        >>> tally = RiskTally()
+        >>> tally.add("High", "Claude (claude-sonnet-4-20250514)")
+        >>> tally.count("High"), tally.share("High")
+        (1, 100.0)
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.counts = Counter()
+        self.rule_decided = 0
+        self.rejected = 0
+
+    def add(self, risk_level, decided_by):
+        """Count one screened patient; anything but High/Medium/Low needs review."""
+        self.total += 1
+        self.counts[risk_level if risk_level in RISK_LEVELS else "Review"] += 1
+        if decided_by.startswith("Rule engine"):
+            self.rule_decided += 1
+
+    def count(self, risk_level):
+        return self.counts[risk_level]
+
+    @property
+    def needs_review(self):
+        return self.counts["Review"]
+
+    def share(self, risk_level):
+        """Percentage of screened patients at this level (0 for an empty run)."""
+        return self.counts[risk_level] / self.total * 100 if self.total else 0.0
+
+    def stats(self):
+        """Counts in the shape the report scripts return."""
+        return {
+            'total': self.total,
+            'high_risk': self.count("High"),
+            'medium_risk': self.count("Medium"),
+            'low_risk': self.count("Low"),
+            'needs_review': self.needs_review,
+            'rejected': self.rejected
+        }
+
+
+class LineSpool:
+    """
+    Disk-backed list of report lines.
+
+    For report sections that come after the patient loop but list
+    patients from it (rosters), so they don't have to stay in memory.
+
+    Example:
+        >>> high_roster = LineSpool()
+        >>> high_roster.append("  • Pat 1 (ID: P001)")
+        >>> lines = list(high_roster)
+        >>> high_roster.close()
+    """
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self.count = 0
+
+    def append(self, line):
+        self.file.write(line + "\n")
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        self.file.flush()
+        self.file.seek(0)
+        for line in self.file:
+            yield line.rstrip("\n")
+        self.file.seek(0, os.SEEK_END)
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,336 @@
+"""
+Screening entry point shared by the report scripts.
+
+Optionally carries forward unchanged patients from the last run (delta
+mode). It then runs rule-based pre-triage over the rest, sends only the
+ambiguous patients to Claude (interactive or Message Batches), and
+merges everything back in input order with the provenance of each
+decision. With a cascade, the fast model screens first and the rules
+cross-check its answers. With a run journal, every finished patient is
+checkpointed as it lands and a resumed run skips them.
+
+Patients are screened most-urgent first, by a cheap pre-score of crisis
+calls, adherence and missed appointments, and every result is handed to
+on_result as soon as it is decided. With a deadline, patients Claude
+didn't reach in time fall back to the rule score instead of waiting.
+
+screen_patients() screens one cohort. ScreeningRun screens several
+(the chunks of a large extract) as one run, on one Claude client.
+"""
+from dataclasses import dataclass
+
+from app.ai.analysis_run import AnalysisRun
+from app.ai.cascade import CASCADE_ENABLED, Cascade
+from app.ai.claude_client import (
+    DEFAULT_MODEL,
+    DEFAULT_PACK_SIZE,
+    DEFAULT_RUN_DEADLINE_S,
+    analysis_failed,
+    deadline_expired,
+)
+from app.screening.delta import ScreeningState, screening_fingerprint
+from app.screening.triage import (
+    NEEDS_MODEL,
+    cohort_columns,
+    fallback_analysis,
+    load_rules,
+    priority_scores,
+    rule_analysis,
+    rule_floor,
+    rules_provenance,
+    triage_codes,
+)
+
+
+def describe_provenance(result):
+    """Report label for a screening result, flagging carried-forward ones."""
+    if result['reused_from']:
+        return f"{result['decided_by']} - reused from {result['reused_from']}"
+    return result['decided_by']
+
+
+def screen_patients(patients, progress=None, batch=False, rules=None, delta=False,
+                    journal=None, pack_size=DEFAULT_PACK_SIZE, cascade=CASCADE_ENABLED,
+                    on_result=None, metrics=None, deadline=DEFAULT_RUN_DEADLINE_S, offset=0,
+                    columns=None, cancel=None):
+    """
+    Screen a cohort: rules first, Claude for whatever the rules can't decide.
+
+    Args:
+        patients: List of PatientRecord
+        progress: Optional callback(done, total, index) for model calls;
+            index refers to the position in `patients`
+        batch: Use the Message Batches API for the model calls
+        rules: Triage rules (defaults to load_rules())
+        delta: Reuse last run's result for patients whose inputs haven't changed
+        journal: Optional RunJournal; results already in it are skipped and
+            new ones are appended as they complete
+        pack_size: Patients per interactive request (ignored in batch mode)
+        cascade: Screen on the fast model first and escalate uncertain,
+            high-risk or rule-contradicting answers (ignored in batch mode)
+        on_result: Optional callback(index, result) as each new result is
+            decided, most urgent first (carried-forward and journaled
+            results are not re-emitted)
+        metrics: Optional RunMetrics; Claude calls are recorded into it and
+            it counts how many patients each stage decided
+        deadline: Seconds the Claude stage may take (0 = no limit;
+            interactive only). Patients still unscreened
+            then get a rule-score fallback, which is neither journaled
+            nor carried forward, so the next run screens them properly.
+        offset: Position of patients[0] in the whole extract, when screening
+            it in chunks (journal entries are indexed extract-wide)
+        columns: Optional PatientColumns holding the same rows, already
+            parsed; triage then reads its arrays instead of the records
+        cancel: Optional threading.Event; setting it stops the run and
+            cancels its outstanding Claude calls
+
+    Returns:
+        list: One dict per patient, in input order, with 'analysis' (reply
+        text), 'decided_by' (rule engine or the Claude model) and 'reused_from'
+        (timestamp of the carried-forward result, or None)
+
+    Raises:
+        RunCancelled: `cancel` was set before every patient was screened
+    """
+    with ScreeningRun(batch=batch, rules=rules, delta=delta, journal=journal,
+                      pack_size=pack_size, cascade=cascade, metrics=metrics,
+                      deadline=deadline, cancel=cancel) as run:
+        return run.finish(run.start(patients, progress=progress, on_result=on_result,
+                                    offset=offset, columns=columns))
+
+
+@dataclass
+class PendingCohort:
+    """A cohort ScreeningRun.start() has triaged and queued; pass it to finish()."""
+    patients: list
+    results: list
+    todo: list
+    fingerprints: list
+    model_indexes: list
+    priority: dict
+    model_result: object = None
+    analyses: object = None
+
+    @property
+    def done(self):
+        """True once every result is in (finish() won't wait)."""
+        return self.analyses is None or self.analyses.done()
+
+
+class ScreeningRun:
+    """
+    Everything a screening run keeps across the cohorts it screens.
+
+    A run screened in chunks (pipeline.screen_stream) must not restart
+    per chunk: the rules, delta state and journal are loaded once, and
+    one AnalysisRun holds the Claude client, rate limiter, analysis
+    cache, cascade and the run deadline. start() triages a cohort,
+    emits what the rules decide and queues the rest on Claude without
+    waiting; finish() waits for it. Cohorts started before the first
+    finish() share Claude's priority queue, so an urgent patient in a
+    later chunk is sent ahead of routine ones in earlier chunks, and in
+    batch mode they go out as one Message Batch.
+
+    Args:
+        See screen_patients(); deadline counts from the run's first
+        Claude call, across every cohort.
+
+    Example:
+        >>> with ScreeningRun(delta=True, deadline=600) as run:
+        ...     first = run.start(chunk_one, on_result=emit_one)
+        ...     second = run.start(chunk_two, offset=len(chunk_one), on_result=emit_two)
+        ...     results = run.finish(first) + run.finish(second)
+    """
+
+    def __init__(self, batch=False, rules=None, delta=False, journal=None,
+                 pack_size=DEFAULT_PACK_SIZE, cascade=CASCADE_ENABLED, metrics=None,
+                 deadline=DEFAULT_RUN_DEADLINE_S, cancel=None):
+        self.batch = batch
+        self.rules = rules or load_rules()
+        self.journal = journal
+        self.pack_size = pack_size
+        self.cascade = cascade
+        self.metrics = metrics
+        self.deadline = deadline
+        self.cancel = cancel
+        self.state = ScreeningState() if delta else None
+        self.model_cascade = None
+        if cascade and not batch:
+            self.model_cascade = Cascade(rule_floor=lambda patient: rule_floor(patient, self.rules))
+        # Part of the delta fingerprint, so turning the cascade on or off re-screens
+        self.model_label = (self.model_cascade.label(DEFAULT_MODEL) if self.model_cascade
+                            else DEFAULT_MODEL)
+        # Opened on the first patient that needs Claude
+        self.analysis = None
+
+    @property
+    def queued(self):
+        """Patients waiting for the next Message Batch (batch mode)."""
+        return self.analysis.queued if self.analysis else 0
+
+    def claude(self):
+        """The run's AnalysisRun, opened on first use."""
+        if self.analysis is None:
+            if self.cascade and self.batch:
+                print("ℹ️  Cascade applies to interactive screening only; batch uses the main model")
+            self.analysis = AnalysisRun(pack_size=self.pack_size, cascade=self.model_cascade,
+                                        metrics=self.metrics, deadline=self.deadline,
+                                        batch=self.batch, cancel=self.cancel)
+        return self.analysis
+
+    def start(self, patients, progress=None, on_result=None, offset=0, columns=None):
+        """
+        Triage a cohort and queue whatever the rules can't decide.
+
+        Args:
+            patients, progress, on_result, offset, columns: See screen_patients()
+
+        Returns:
+            PendingCohort: Pass to finish() for the results
+        """
+        rules = self.rules
+        journal = self.journal
+        metrics = self.metrics
+        results = [None] * len(patients)
+        todo = list(range(len(patients)))
+
+        fingerprints = None
+        if self.state:
+            previous = self.state.load(patient.patient_id for patient in patients)
+            fingerprints = [screening_fingerprint(p, rules['version'], self.model_label)
+                            for p in patients]
+            todo = []
+            for index, patient in enumerate(patients):
+                last = previous.get(str(patient.patient_id))
+                if last and last['fingerprint'] == fingerprints[index]:
+                    results[index] = {
+                        'analysis': last['analysis'],
+                        'decided_by': last['decided_by'],
+                        'reused_from': last['screened_at']
+                    }
+                else:
+                    todo.append(index)
+            print(f"🔁 Delta run: {len(patients) - len(todo)} unchanged (reused), "
+                  f"{len(todo)} new or changed")
+            if metrics:
+                metrics.count_patients("reused", len(patients) - len(todo))
+
+        def finish(index, result):
+            results[index] = result
+            if journal and not analysis_failed(result['analysis']) and not result.get('fallback'):
+                journal.record(offset + index, patients[index], result)
+            if on_result:
+                on_result(index, result)
+
+        remaining = todo
+        if journal:
+            for index in todo:
+                results[index] = journal.lookup(offset + index, patients[index])
+            remaining = [i for i in todo if results[i] is None]
+            print(f"⏯️  Run {journal.run_id}: {len(todo) - len(remaining)} already done, "
+                  f"{len(remaining)} to go")
+            if metrics:
+                metrics.count_patients("resumed", len(todo) - len(remaining))
+
+        if columns is not None:
+            arrays = columns.triage_arrays(remaining)
+        else:
+            arrays = cohort_columns([patients[i] for i in remaining])
+        codes = triage_codes(*arrays, rules=rules)
+        scores = priority_scores(*arrays)
+        priority = dict(zip(remaining, scores.tolist()))
+        model_indexes = []
+
+        # Most urgent first, so rule-decided HIGHs are emitted before anything else
+        for index, code in sorted(zip(remaining, codes), key=lambda pair: priority[pair[0]],
+                                  reverse=True):
+            if code == NEEDS_MODEL:
+                model_indexes.append(index)
+            else:
+                finish(index, {
+                    'analysis': rule_analysis(code, patients[index]),
+                    'decided_by': rules_provenance(rules),
+                    'reused_from': None
+                })
+
+        print(f"🧮 Rule triage ({rules['version']}): {len(remaining) - len(model_indexes)} decided, "
+              f"{len(model_indexes)} need Claude")
+        if metrics:
+            metrics.count_patients("rules", len(remaining) - len(model_indexes))
+
+        pending = PendingCohort(patients, results, todo, fingerprints, model_indexes, priority)
+        if not model_indexes:
+            return pending
+        model_patients = [patients[i] for i in model_indexes]
+
+        def model_result(index, analysis, model=None):
+            if deadline_expired(analysis):
+                finish(model_indexes[index], {
+                    'analysis': fallback_analysis(model_patients[index], rules),
+                    'decided_by': f"{rules_provenance(rules)} - deadline fallback",
+                    'reused_from': None,
+                    'fallback': True
+                })
+                if metrics:
+                    metrics.count_patients("deadline fallback")
+                return
+            finish(model_indexes[index], {
+                'analysis': analysis,
+                'decided_by': f"Claude ({model or DEFAULT_MODEL})",
+                'reused_from': None
+            })
+            if metrics:
+                metrics.count_patients("Claude")
+
+        pending.model_result = model_result
+        if self.batch:
+            pending.analyses = self.claude().submit(model_patients)
+        else:
+            def model_progress(done, total, index):
+                if progress:
+                    progress(done, total, model_indexes[index])
+            pending.analyses = self.claude().submit(
+                model_patients, progress=model_progress, on_result=model_result,
+                priority=[priority[i] for i in model_indexes]
+            )
+        return pending
+
+    def finish(self, pending):
+        """
+        Wait for a started cohort and record it in the delta state.
+
+        Returns:
+            list: One result dict per patient, in input order (see screen_patients())
+        """
+        if pending.analyses is not None:
+            analyses = self.analysis.result(pending.analyses)
+            if self.batch:
+                model_indexes, priority = pending.model_indexes, pending.priority
+                for index in sorted(range(len(analyses)), key=lambda i: priority[model_indexes[i]],
+                                    reverse=True):
+                    pending.model_result(index, analyses[index])
+
+        results = pending.results
+        if self.state:
+            # Failed calls come back as 'Unknown' and must be retried next run
+            self.state.save_many(
+                (pending.patients[i].patient_id, pending.fingerprints[i], results[i]['analysis'],
+                 results[i]['decided_by'])
+                for i in pending.todo
+                if not analysis_failed(results[i]['analysis']) and not results[i].get('fallback')
+            )
+        return results
+
+    def close(self):
+        try:
+            if self.analysis:
+                self.analysis.close()
+        finally:
+            if self.state:
+                self.state.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,483 @@
+"""
+Watch-folder ingest: screen new admissions minutes after they land.
+
+The EHR drops extracts (.csv, .csv.gz, .csv.zst) into a folder, as new
+files or as rows appended to existing ones. ingest_batches() waits for
+changes with inotify (Linux), or on a poll timer where inotify isn't
+available, and reads only what it hasn't seen before:
+
+- per file, the byte offset just past the last complete row read (in
+  decompressed bytes for compressed extracts), so an append is read
+  from where the last read stopped. The bytes just before the offset
+  are kept too; if they no longer match, the file was rewritten and is
+  read again from the start.
+- per patient, a fingerprint of every field of their latest row, so a
+  rewritten or re-exported file only yields the rows that differ from
+  what was last screened for that patient. A row that changes and later
+  changes back is screened each time.
+
+A row still being written (no newline yet) is left for the next pass.
+
+watch_folder() pushes the new rows through the pipeline's bounded
+queue (pipeline.prefetch) into one ScreeningRun kept open for as long
+as it watches, in delta mode so the nightly full run reuses these
+results. Offsets and fingerprints are
+committed only once a batch has been screened, so a crash re-reads rows
+instead of losing them.
+
+State is stored in SQLite at cache/ingest_state.db unless
+INGEST_STATE_PATH says otherwise.
+"""
+import ctypes
+import ctypes.util
+import csv
+import hashlib
+import io
+import os
+import select
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from app.screening.columns import (
+    DEFAULT_RANGE_BYTES,
+    column_chunks,
+    open_binary,
+)
+from app.screening.pipeline import DEFAULT_CHUNK_SIZE, prefetch
+from app.screening.screener import ScreeningRun
+
+DEFAULT_INGEST_STATE_PATH = Path(
+    os.environ.get(
+        "INGEST_STATE_PATH",
+        Path(__file__).resolve().parent.parent.parent.parent / "cache" / "ingest_state.db"
+    )
+)
+# Rescan interval; also the safety net when inotify misses events (network mounts)
+DEFAULT_POLL_INTERVAL_S = float(os.environ.get("INGEST_POLL_INTERVAL", "30"))
+# Quiet time after the last change before reading, so a copy in progress can finish
+DEFAULT_SETTLE_S = float(os.environ.get("INGEST_SETTLE_SECONDS", "2"))
+
+EXTRACT_SUFFIXES = ('.csv', '.csv.gz', '.csv.zst')
+# Bytes before the offset kept to detect a rewritten file
+ANCHOR_BYTES = 64
+
+# inotify(7) event masks
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+
+
+def row_fingerprint(patient):
+    """SHA-256 over every field of a PatientRecord; any change gives a new one."""
+    payload = "\x1f".join(str(value) for value in (
+        patient.patient_id, patient.name, patient.last_appointment,
+        patient.appointments_missed, patient.medication_adherence,
+        patient.crisis_calls_30days, patient.diagnosis, patient.case_manager
+    ))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def complete_rows_end(data):
+    """
+    Length of the prefix of `data` (bytes) that holds only complete rows.
+
+    A row is complete at a newline outside quotes; anything after the
+    last one may still be being written.
+    """
+    if b'"' not in data:
+        return data.rfind(b"\n") + 1
+    end = 0
+    position = 0
+    quotes = 0
+    for line in data.splitlines(keepends=True):
+        position += len(line)
+        quotes += line.count(b'"')
+        if line.endswith(b"\n") and quotes % 2 == 0:
+            end = position
+    return end
+
+
+def extract_files(folder):
+    """Extracts in the drop folder, oldest first, so files are read in arrival order."""
+    entries = [entry for entry in os.scandir(folder)
+               if entry.is_file() and entry.name.lower().endswith(EXTRACT_SUFFIXES)
+               and not entry.name.startswith('.')]
+    return [Path(entry.path) for entry in sorted(entries, key=lambda e: (e.stat().st_mtime_ns, e.name))]
+
+
+@dataclass
+class FilePosition:
+    """How far one extract has been read."""
+    inode: int = 0
+    size: int = 0
+    mtime_ns: int = 0
+    offset: int = 0
+    rows: int = 0
+    header: str = ""
+    anchor: bytes = b""
+
+
+@dataclass
+class IngestBatch:
+    """
+    Unseen rows from one extract, ready to screen.
+
+    Attributes:
+        path: Extract the rows came from
+        columns: PatientColumns of the unseen rows (may be empty)
+        fingerprints: (patient_id, row_fingerprint()) per row in columns
+        position: FilePosition to commit once screened, or None if the
+            batch ends mid-block (only its fingerprints are committed)
+    """
+    path: Path
+    columns: object
+    fingerprints: list
+    position: FilePosition = None
+
+
+class IngestState:
+    """
+    Read positions per extract and the latest row fingerprint per patient.
+
+    Shared by the reader thread and the screening loop, so access goes
+    through a lock. Rows read but not yet committed are held in memory
+    (hold()) so a rescan in the meantime doesn't queue them twice.
+
+    Example:
+        >>> state = IngestState()
+        >>> state.position("incoming/admissions.csv")
+        >>> state.latest(["P001", "P002"])
+        >>> state.commit(batch)
+    """
+
+    def __init__(self, path=DEFAULT_INGEST_STATE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        # patient_id -> fingerprint queued for screening, not yet committed
+        self.pending = {}
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS ingest_files (
+                path TEXT PRIMARY KEY,
+                inode INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                rows INTEGER NOT NULL,
+                header TEXT NOT NULL,
+                anchor BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS ingested_patients (
+                patient_id TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                ingested_at TEXT NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    def position(self, path):
+        """Committed FilePosition for an extract (a fresh one if never read)."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT inode, size, mtime_ns, offset, rows, header, anchor FROM ingest_files "
+                "WHERE path = ?", (str(path),)
+            ).fetchone()
+        return FilePosition(*row) if row else FilePosition()
+
+    def latest(self, patient_ids):
+        """
+        Fingerprint of each patient's most recent row, queued or screened.
+
+        Returns:
+            dict: patient_id -> fingerprint, for patients seen before
+        """
+        patient_ids = list(dict.fromkeys(str(patient_id) for patient_id in patient_ids))
+        latest = {}
+        with self.lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(patient_ids), 500):
+                batch = patient_ids[start:start + 500]
+                rows = self.conn.execute(
+                    "SELECT patient_id, fingerprint FROM ingested_patients "
+                    f"WHERE patient_id IN ({', '.join('?' * len(batch))})",
+                    batch
+                )
+                latest.update(rows)
+            latest.update((patient_id, self.pending[patient_id])
+                          for patient_id in patient_ids if patient_id in self.pending)
+        return latest
+
+    def hold(self, fingerprints):
+        """Mark (patient_id, fingerprint) pairs as queued until their batch is committed."""
+        with self.lock:
+            self.pending.update(fingerprints)
+
+    def commit(self, batch):
+        """Record a screened batch's fingerprints and, if it has one, its file position."""
+        ingested_at = datetime.now().strftime('%Y-%m-%d %H:%M')
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO ingested_patients VALUES (?, ?, ?)",
+                ((patient_id, fingerprint, ingested_at)
+                 for patient_id, fingerprint in batch.fingerprints)
+            )
+            if batch.position:
+                p = batch.position
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO ingest_files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (str(batch.path), p.inode, p.size, p.mtime_ns, p.offset, p.rows, p.header,
+                     p.anchor)
+                )
+            self.conn.commit()
+            for patient_id, fingerprint in batch.fingerprints:
+                # A newer row for the patient may have been queued since
+                if self.pending.get(patient_id) == fingerprint:
+                    del self.pending[patient_id]
+
+    def close(self):
+        self.conn.close()
+
+
+class FolderEvents:
+    """
+    Wait for changes in a folder: inotify where available, a timer otherwise.
+
+    Example:
+        >>> events = FolderEvents("incoming")
+        >>> events.wait(30)      # returns early once a change has settled
+        >>> events.close()
+    """
+
+    def __init__(self, folder, settle=DEFAULT_SETTLE_S):
+        self.settle = settle
+        self.fd = None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+            mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+            if libc.inotify_add_watch(fd, os.fsencode(str(folder)), mask) < 0:
+                os.close(fd)
+                raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+            self.fd = fd
+        except (OSError, AttributeError):
+            # No inotify (macOS, Windows, some containers): poll instead
+            self.fd = None
+
+    @property
+    def mode(self):
+        return "inotify" if self.fd is not None else "polling"
+
+    def drain(self):
+        """Discard queued events; which file changed doesn't matter, the scan finds out."""
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+
+    def wait(self, timeout):
+        """
+        Block until the folder changed and then stayed quiet for `settle`
+        seconds, or until `timeout` seconds passed.
+        """
+        if self.fd is None:
+            threading.Event().wait(timeout)
+            return
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return
+        self.drain()
+        while select.select([self.fd], [], [], self.settle)[0]:
+            self.drain()
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def skip_to(file, offset, block_bytes=DEFAULT_RANGE_BYTES):
+    """Seek to `offset`; zstd streams can't seek, so read up to it instead."""
+    if file.seekable():
+        file.seek(offset)
+        return
+    while offset > 0:
+        data = file.read(min(offset, block_bytes))
+        if not data:
+            return
+        offset -= len(data)
+
+
+def read_new_rows(path, position, block_bytes=DEFAULT_RANGE_BYTES):
+    """
+    Yield (text, position) for each block of complete rows past position.offset.
+
+    `position` is updated in place to where the next read starts. The
+    header line of a file read from the start is consumed into
+    position.header.
+    """
+    file = open_binary(path)
+    try:
+        if position.offset:
+            skip_to(file, position.offset - len(position.anchor))
+            if file.read(len(position.anchor)) != position.anchor:
+                # Rewritten in place: start over, fingerprints skip the old rows
+                position.offset, position.rows, position.header, position.anchor = 0, 0, "", b""
+                file.close()
+                file = open_binary(path)
+        pending = b""
+        while True:
+            data = file.read(block_bytes)
+            if not data:
+                return
+            data = pending + data
+            cut = complete_rows_end(data)
+            block, pending = data[:cut], data[cut:]
+            if not block:
+                continue
+            start = position.offset
+            position.offset += len(block)
+            position.anchor = (position.anchor + block)[-ANCHOR_BYTES:]
+            text = block.decode('utf-8')
+            if start == 0:
+                header_line, _, text = text.partition("\n")
+                position.header = header_line.rstrip("\r")
+            yield text, position
+    finally:
+        file.close()
+
+
+def file_batches(path, position, state, chunk_size, on_reject=None):
+    """Yield IngestBatch of the unseen rows past `position` in one extract."""
+    for text, position in read_new_rows(path, position):
+        rejected = []
+
+        def reject(row_number, row, reason):
+            rejected.append(row_number)
+            if on_reject:
+                on_reject(path, row_number, row, reason)
+
+        header = next(csv.reader([position.header]), [])
+        chunks = list(column_chunks(io.StringIO(text, newline=''), chunk_size, reject,
+                                    header=header, first_row=position.rows + 2))
+        position.rows += sum(len(columns) for columns in chunks) + len(rejected)
+        # Only the block's last batch moves the file position, so it is
+        # committed once every row before it has been screened
+        committed = FilePosition(**vars(position))
+        if not chunks:
+            yield IngestBatch(path, None, [], committed)
+        for number, columns in enumerate(chunks, 1):
+            fingerprints = [(str(patient.patient_id), row_fingerprint(patient))
+                            for patient in columns.rows()]
+            latest = state.latest(patient_id for patient_id, _ in fingerprints)
+            keep = []
+            for index, (patient_id, fingerprint) in enumerate(fingerprints):
+                # Screen a row only if it differs from the patient's previous one
+                if latest.get(patient_id) != fingerprint:
+                    latest[patient_id] = fingerprint
+                    keep.append(index)
+            kept = [fingerprints[index] for index in keep]
+            state.hold(kept)
+            yield IngestBatch(path, columns.select(keep), kept,
+                              committed if number == len(chunks) else None)
+
+
+def ingest_batches(folder, state, chunk_size=DEFAULT_CHUNK_SIZE, on_reject=None,
+                   poll_interval=DEFAULT_POLL_INTERVAL_S, settle=DEFAULT_SETTLE_S,
+                   once=False, stop=None):
+    """
+    Yield IngestBatch of unseen rows from the drop folder, forever.
+
+    Args:
+        folder: Drop folder to watch
+        state: IngestState
+        chunk_size: Rows per batch (before seen and invalid rows are dropped)
+        on_reject: Optional callback(path, row_number, row, reason) per invalid row
+        poll_interval: Seconds between rescans (with or without inotify)
+        settle: Seconds a change must be quiet before it is read
+        once: Scan the folder once and return (for cron or a first catch-up)
+        stop: Optional threading.Event that ends the loop after the current scan
+    """
+    events = FolderEvents(folder, settle)
+    print(f"👀 Watching {folder} ({events.mode}, rescan every {poll_interval:.0f}s)")
+    # Read ahead of what is committed, so a file isn't re-read while its rows are queued
+    positions = {}
+    try:
+        while True:
+            for path in extract_files(folder):
+                try:
+                    stat = path.stat()
+                    position = positions.get(path) or state.position(path)
+                    if (stat.st_ino, stat.st_size, stat.st_mtime_ns) == (
+                            position.inode, position.size, position.mtime_ns):
+                        continue
+                    if stat.st_ino != position.inode or stat.st_size < position.size:
+                        # Replaced or truncated: start over
+                        position = FilePosition()
+                    position.inode, position.size, position.mtime_ns = (
+                        stat.st_ino, stat.st_size, stat.st_mtime_ns)
+                    positions[path] = position
+                    yield from file_batches(path, position, state, chunk_size, on_reject)
+                except (OSError, EOFError, UnicodeDecodeError, ValueError) as e:
+                    # Half-copied or malformed extract: try again on the next pass
+                    print(f"⚠️  Couldn't read {path.name} yet: {e}")
+                    positions.pop(path, None)
+            if once or (stop and stop.is_set()):
+                return
+            events.wait(poll_interval)
+            if stop and stop.is_set():
+                return
+    finally:
+        events.close()
+
+
+def watch_folder(folder, state=None, on_result=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 on_reject=None, poll_interval=DEFAULT_POLL_INTERVAL_S, settle=DEFAULT_SETTLE_S,
+                 once=False, stop=None, **screen_kwargs):
+    """
+    Screen every unseen row dropped into `folder` as it arrives.
+
+    Reading runs on a background thread (pipeline.prefetch), so the next
+    extract is picked up while the current batch is with Claude.
+
+    Args:
+        folder: Drop folder to watch
+        state: IngestState (defaults to the one at INGEST_STATE_PATH)
+        on_result: Optional callback(patient, result) as each result is decided
+        chunk_size, on_reject, poll_interval, settle, once, stop: See ingest_batches()
+        **screen_kwargs: Passed to ScreeningRun (pack_size, cascade,
+            metrics, ...); delta mode is always on
+
+    Returns:
+        int: Patients screened (when `once` or `stop` ends the loop)
+    """
+    own_state = state is None
+    state = state or IngestState()
+    screened = 0
+    try:
+        batches = ingest_batches(folder, state, chunk_size, on_reject, poll_interval, settle,
+                                 once, stop)
+        with ScreeningRun(delta=True, **screen_kwargs) as run:
+            for batch in prefetch(batches):
+                if batch.columns is not None and len(batch.columns):
+                    patients = batch.columns.rows()
+                    print(f"📥 {len(patients)} new or changed rows from {batch.path.name}")
+
+                    def emit(index, result, patients=patients):
+                        if on_result:
+                            on_result(patients[index], result)
+
+                    run.finish(run.start(patients, on_result=emit, columns=batch.columns))
+                    screened += len(patients)
+                state.commit(batch)
+    finally:
+        if own_state:
+            state.close()
+    return screened
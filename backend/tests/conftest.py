@@ -0,0 +1,117 @@
+"""
+Shared pytest setup for the backend unit tests.
+
+Run from the repository root:
+    python -m pytest
+"""
+import csv
+import functools
+import sys
+from pathlib import Path
+
+import pytest
+
+# app/ is imported the same way the scripts import it
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.ai import analysis_run
+from app.screening import screener
+from app.screening.columns import REQUIRED_COLUMNS
+from app.screening.records import PatientRecord
+
+
+def _extract_row(i):
+    return [
+        f"P{i:04d}", f"Patient {i}", f"2026-{1 + i % 9:02d}-{1 + i % 27:02d}",
+        str(i % 4), f"{0.3 + (i * 37 % 70) / 100:.2f}", str(i % 5 // 3),
+        ["Major Depressive Disorder", "Generalized Anxiety Disorder", "PTSD"][i % 3],
+        ["Dr. Lee", "Dr. Patel"][i % 2],
+    ]
+
+
+@pytest.fixture
+def make_patient():
+    """Build a PatientRecord with sensible defaults for any field not given."""
+    def make(patient_id="P001", **fields):
+        values = {
+            "name": f"Patient {patient_id}",
+            "last_appointment": "2026-10-01",
+            "appointments_missed": 1,
+            "medication_adherence": 0.8,
+            "crisis_calls_30days": 0,
+            "diagnosis": "Generalized Anxiety Disorder",
+            "case_manager": "Unassigned",
+        }
+        values.update(fields)
+        return PatientRecord(patient_id=patient_id, **values)
+    return make
+
+
+@pytest.fixture
+def extract_row():
+    """
+    Synthetic patients.csv rows.
+
+    Returns:
+        callable: i -> list of cell values for row i; the mix of signals
+        sends some patients to Claude and lets the rules decide others
+    """
+    return _extract_row
+
+
+@pytest.fixture
+def write_extract(tmp_path):
+    """
+    Write a patients.csv-shaped file under tmp_path.
+
+    Returns:
+        callable: (name, rows, header=REQUIRED_COLUMNS) -> Path; rows are
+        lists of cell values, e.g. from extract_row
+    """
+    def write(name, rows, header=REQUIRED_COLUMNS):
+        path = tmp_path / name
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            writer.writerows(rows)
+        return path
+    return write
+
+
+@pytest.fixture
+def isolated_state(tmp_path, monkeypatch):
+    """Point the analysis cache and delta state at tmp_path instead of the repo's cache/."""
+    monkeypatch.setattr(analysis_run, "AnalysisCache",
+                        functools.partial(analysis_run.AnalysisCache, tmp_path / "analyses.db"))
+    monkeypatch.setattr(screener, "ScreeningState",
+                        functools.partial(screener.ScreeningState, tmp_path / "state.db"))
+    return tmp_path
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    """The scripts/mock_anthropic_server.py module (scripts/ isn't a package)."""
+    scripts = Path(__file__).resolve().parent.parent.parent / "scripts"
+    monkeypatch.syspath_prepend(str(scripts))
+    import mock_anthropic_server
+    return mock_anthropic_server
+
+
+@pytest.fixture
+def mock_api(mock_server, monkeypatch):
+    """
+    scripts/mock_anthropic_server.py on a free local port.
+
+    ANTHROPIC_BASE_URL and ANTHROPIC_API_KEY point every client made in
+    the test at it. Batches end as soon as they're created.
+
+    Yields:
+        ThreadingHTTPServer: .state.snapshot() has the request counts
+    """
+    monkeypatch.setattr(mock_server, "BATCH_PROCESSING_SECONDS", 0.0)
+    server = mock_server.start_server()
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    yield server
+    server.shutdown()
+    server.server_close()
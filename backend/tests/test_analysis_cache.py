@@ -0,0 +1,91 @@
+import sqlite3
+
+import pytest
+
+from app.ai.analysis_cache import AnalysisCache, cache_key, normalize_summary
+
+SUMMARY = """
+    Patient ID: P001
+      Medication adherence: 45%
+
+    Crisis calls (30 days): 3
+"""
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = AnalysisCache(tmp_path / "nested" / "analyses.db", ttl_days=7)
+    yield cache
+    cache.close()
+
+
+def age_entries(path, seconds):
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE analyses SET created_at = created_at - ?", (seconds,))
+
+
+def test_normalize_summary_ignores_indentation_and_blank_lines():
+    assert normalize_summary(SUMMARY) == (
+        "Patient ID: P001\nMedication adherence: 45%\nCrisis calls (30 days): 3"
+    )
+
+
+def test_cache_key_changes_with_content_prompt_or_model():
+    key = cache_key(SUMMARY, "risk-v1", "model-a")
+
+    assert cache_key("Patient ID: P001\nMedication adherence: 45%\nCrisis calls (30 days): 3",
+                     "risk-v1", "model-a") == key
+    assert cache_key(SUMMARY.replace("45%", "46%"), "risk-v1", "model-a") != key
+    assert cache_key(SUMMARY, "risk-v2", "model-a") != key
+    assert cache_key(SUMMARY, "risk-v1", "model-b") != key
+
+
+def test_get_counts_hits_and_misses(cache):
+    assert cache.get("k1") is None
+    cache.put("k1", "Risk Level: High", "risk-v1", "model-a")
+
+    assert cache.get("k1") == "Risk Level: High"
+    assert cache.get_entry("k1") == {"analysis": "Risk Level: High", "model": "model-a"}
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_put_replaces_and_survives_reopen(cache):
+    cache.put("k1", "Risk Level: Low", "risk-v1", "model-a")
+    cache.put("k1", "Risk Level: High", "risk-v1", "model-a")
+
+    reopened = AnalysisCache(cache.path)
+    try:
+        assert reopened.get("k1") == "Risk Level: High"
+    finally:
+        reopened.close()
+
+
+def test_expired_entries_are_misses_and_purged(cache):
+    cache.put("old", "Risk Level: Low", "risk-v1", "model-a")
+    cache.put("new", "Risk Level: Low", "risk-v1", "model-a")
+    age_entries(cache.path, 8 * 86400)
+    cache.put("new", "Risk Level: Low", "risk-v1", "model-a")
+
+    assert cache.get("old") is None
+    assert cache.purge() == 1
+    assert cache.get("new") == "Risk Level: Low"
+
+
+def test_zero_ttl_never_expires(tmp_path):
+    cache = AnalysisCache(tmp_path / "analyses.db", ttl_days=0)
+    try:
+        cache.put("k1", "Risk Level: Low", "risk-v1", "model-a")
+        age_entries(cache.path, 365 * 86400)
+        assert cache.purge() == 0
+        assert cache.get("k1") == "Risk Level: Low"
+    finally:
+        cache.close()
+
+
+def test_purge_drops_other_prompt_versions(cache):
+    cache.put("v1", "Risk Level: Low", "risk-v1", "model-a")
+    cache.put("v2", "Risk Level: Low", "risk-v2", "model-a")
+
+    assert cache.purge(keep_prompt_version="risk-v2") == 1
+    assert cache.get("v1") is None
+    assert cache.get("v2") == "Risk Level: Low"
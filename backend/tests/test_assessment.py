@@ -0,0 +1,101 @@
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from app.ai.assessment import (
+    MAX_ACTION_CHARS,
+    MAX_FACTOR_CHARS,
+    PACKED_RISK_TOOL,
+    RISK_TOOL,
+    AssessmentError,
+    assessment_from_message,
+    packed_assessments_from_message,
+    tool_use_id,
+    validate_assessment,
+)
+
+VALID = {"risk_level": "High", "primary_factor": " 3 crisis calls ", "action": "Same-day outreach",
+         "confidence": 0.9}
+
+
+def tool_message(name, tool_input, stop_reason="tool_use"):
+    block = SimpleNamespace(type="tool_use", id="toolu_1", name=name, input=tool_input)
+    return SimpleNamespace(content=[block], stop_reason=stop_reason)
+
+
+def test_valid_input_is_stripped_and_rendered():
+    assessment = validate_assessment(VALID)
+
+    assert assessment.primary_factor == "3 crisis calls"
+    assert assessment.confidence == 0.9
+    assert assessment.to_text() == (
+        "Risk Level: High\nPrimary Factor: 3 crisis calls\nAction: Same-day outreach"
+    )
+
+
+@pytest.mark.parametrize("change, problem", [
+    ({"risk_level": "Severe"}, "risk_level must be one of Low, Medium, High"),
+    ({"risk_level": "high"}, "risk_level must be one of"),
+    ({"primary_factor": "   "}, "primary_factor must be a non-empty string"),
+    ({"action": None}, "action must be a non-empty string"),
+    ({"confidence": 1.5}, "confidence must be a number between 0 and 1"),
+    ({"confidence": True}, "confidence must be a number between 0 and 1"),
+    ({"confidence": "0.9"}, "confidence must be a number between 0 and 1"),
+    ({"primary_factor": "x" * (MAX_FACTOR_CHARS + 1)}, f"(max {MAX_FACTOR_CHARS})"),
+    ({"action": "x" * (MAX_ACTION_CHARS + 1)}, f"(max {MAX_ACTION_CHARS})"),
+    ({"notes": "extra"}, "unexpected fields: notes"),
+])
+def test_invalid_input_is_rejected(change, problem):
+    with pytest.raises(AssessmentError, match=re.escape(problem)):
+        validate_assessment({**VALID, **change})
+
+
+def test_every_problem_is_reported_at_once():
+    with pytest.raises(AssessmentError) as error:
+        validate_assessment({"risk_level": "", "confidence": -1})
+    assert str(error.value).count(";") == 3
+
+
+def test_missing_fields_and_non_object_input():
+    with pytest.raises(AssessmentError, match="action must be a non-empty string"):
+        validate_assessment({k: v for k, v in VALID.items() if k != "action"})
+    with pytest.raises(AssessmentError, match="input must be an object, got list"):
+        validate_assessment([VALID])
+
+
+def test_assessment_from_message():
+    message = tool_message(RISK_TOOL["name"], VALID)
+    assert assessment_from_message(message).risk_level == "High"
+    assert tool_use_id(message) == "toolu_1"
+
+    with pytest.raises(AssessmentError, match="cut off"):
+        assessment_from_message(tool_message(RISK_TOOL["name"], VALID, stop_reason="max_tokens"))
+
+    text_only = SimpleNamespace(content=[SimpleNamespace(type="text", text="Risk Level: High")],
+                                stop_reason="end_turn")
+    with pytest.raises(AssessmentError, match="no record_risk_assessment tool call"):
+        assessment_from_message(text_only)
+    assert tool_use_id(text_only) is None
+
+
+def test_packed_entries_are_validated_one_by_one():
+    entries = [
+        {"patient_ref": "p1", **VALID},
+        {"patient_ref": "p2", **VALID, "risk_level": "Severe"},
+        {"patient_ref": "p3", **VALID},
+        {"patient_ref": "p3", **VALID, "risk_level": "Low"},
+        {"patient_ref": "p9", **VALID},
+        "not an entry",
+    ]
+    message = tool_message(PACKED_RISK_TOOL["name"], {"assessments": entries})
+
+    found = packed_assessments_from_message(message, ["p1", "p2", "p3", "p4"])
+
+    # p2 invalid, p3 answered twice, p4 missing, p9 never asked about
+    assert list(found) == ["p1"]
+
+
+def test_packed_reply_without_assessments_is_empty():
+    assert packed_assessments_from_message(tool_message(PACKED_RISK_TOOL["name"], {}), ["p1"]) == {}
+    assert packed_assessments_from_message(tool_message(RISK_TOOL["name"], VALID), ["p1"]) == {}
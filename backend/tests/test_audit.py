@@ -0,0 +1,164 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from app.audit import AUDIT_COLUMNS, AuditBuffer
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.pool.attempts += 1
+        if self.pool.attempts in self.pool.fail_attempts:
+            raise ConnectionError("database unavailable")
+        assert table == "audit_logs"
+        assert columns == AUDIT_COLUMNS
+        self.pool.copies.append(list(records))
+
+
+class FakePool:
+    """Stands in for the asyncpg pool; COPY attempts numbered in fail_attempts raise."""
+
+    def __init__(self, fail_attempts=()):
+        self.fail_attempts = set(fail_attempts)
+        self.attempts = 0
+        self.copies = []
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield FakeConnection(self)
+
+
+def resource_ids(rows):
+    return [row[AUDIT_COLUMNS.index("resource_id")] for row in rows]
+
+
+def test_record_drops_once_buffer_is_full():
+    audit = AuditBuffer(FakePool(), max_pending=2)
+
+    assert audit.record("READ", "patient", 1)
+    assert audit.record("READ", "patient", 2)
+    assert not audit.record("READ", "patient", 3)
+    assert audit.stats()["pending"] == 2
+    assert audit.stats()["dropped"] == 1
+
+
+def test_flush_copies_in_batches_of_flush_max_records():
+    pool = FakePool()
+    audit = AuditBuffer(pool, flush_max_records=2)
+    for resource_id in range(5):
+        audit.record("READ", "patient", resource_id, ip_address="10.0.0.1")
+
+    assert asyncio.run(audit.flush())
+    assert [len(batch) for batch in pool.copies] == [2, 2, 1]
+    assert resource_ids(row for batch in pool.copies for row in batch) == ["0", "1", "2", "3", "4"]
+    assert audit.stats()["flushed"] == 5
+    assert audit.stats()["pending"] == 0
+
+
+def test_failed_flush_requeues_batch_in_order():
+    pool = FakePool(fail_attempts={1})
+    audit = AuditBuffer(pool, flush_max_records=2)
+    for resource_id in range(3):
+        audit.record("READ", "patient", resource_id)
+
+    assert not asyncio.run(audit.flush())
+    assert pool.copies == []
+    assert audit.stats()["pending"] == 3
+    assert audit.stats()["flush_failures"] == 1
+
+    # A record queued while the database was down lands after the retried rows
+    audit.record("READ", "patient", 3)
+    assert asyncio.run(audit.flush())
+    assert resource_ids(row for batch in pool.copies for row in batch) == ["0", "1", "2", "3"]
+
+
+def test_requeue_after_failure_respects_max_pending():
+    pool = FakePool(fail_attempts={1})
+    audit = AuditBuffer(pool, flush_max_records=3, max_pending=4)
+    for resource_id in range(4):
+        audit.record("READ", "patient", resource_id)
+
+    class RecordingConnection(FakeConnection):
+        async def copy_records_to_table(self, table, records, columns):
+            # Requests keep arriving while the COPY is out
+            for resource_id in range(4, 8):
+                audit.record("READ", "patient", resource_id)
+            await super().copy_records_to_table(table, records, columns)
+
+    @asynccontextmanager
+    async def acquire():
+        yield RecordingConnection(pool)
+
+    pool.acquire = acquire
+    assert not asyncio.run(audit.flush())
+
+    # The oldest rows are kept; the newest overflow is dropped and counted
+    assert resource_ids(row for _, row in audit._pending) == ["0", "1", "2", "3"]
+    assert audit.stats()["dropped"] == 4
+
+
+def test_failure_mid_drain_keeps_only_unflushed_rows():
+    pool = FakePool(fail_attempts={2})
+    audit = AuditBuffer(pool, flush_max_records=2)
+    for resource_id in range(4):
+        audit.record("READ", "patient", resource_id)
+
+    assert not asyncio.run(audit.flush())
+    assert audit.stats()["flushed"] == 2
+    assert resource_ids(row for _, row in audit._pending) == ["2", "3"]
+
+
+def test_record_fields_and_unparseable_ip():
+    audit = AuditBuffer(FakePool())
+    audit.record("SEARCH", "patient_search", changes={"q": "smi"}, ip_address="not-an-ip")
+
+    row = dict(zip(AUDIT_COLUMNS, audit._pending[0][1]))
+    assert row["action"] == "SEARCH"
+    assert row["resource_id"] is None
+    assert row["changes"] == '{"q": "smi"}'
+    assert row["ip_address"] is None
+    assert row["phi_accessed"] is True
+
+
+def test_close_flushes_what_is_pending():
+    pool = FakePool()
+
+    async def run():
+        audit = AuditBuffer(pool, flush_interval_ms=10_000)
+        await audit.start()
+        audit.record("READ", "patient", 7)
+        await audit.close()
+        return audit
+
+    audit = asyncio.run(run())
+    assert resource_ids(pool.copies[0]) == ["7"]
+    assert audit.stats()["pending"] == 0
+
+
+def test_flushes_back_off_while_the_database_is_down():
+    pool = FakePool(fail_attempts=range(1, 1000))
+
+    async def run():
+        audit = AuditBuffer(pool, flush_interval_ms=20, flush_max_records=1, max_backoff_ms=80)
+        await audit.start()
+        # Every record wakes the flusher; a read every 5 ms for 0.4 s
+        for resource_id in range(80):
+            audit.record("READ", "patient", resource_id)
+            await asyncio.sleep(0.005)
+        failures = pool.attempts
+        backoff = audit.stats()["flush_backoff_ms"]
+
+        pool.fail_attempts = set()
+        await asyncio.sleep(0.2)
+        recovered = audit.stats()
+        await audit.close()
+        return failures, backoff, recovered
+
+    failures, backoff, recovered = asyncio.run(run())
+    # 20, 40, 80, 80, ... ms apart instead of one attempt per record
+    assert 2 <= failures <= 8
+    assert backoff == 80
+    assert recovered["pending"] == 0
+    assert recovered["flush_backoff_ms"] == 0
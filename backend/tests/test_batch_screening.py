@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from app.ai.analysis_cache import AnalysisCache
+from app.ai.batch_screening import analyze_batch, batch_custom_id
+from app.ai.claude_client import ClaudeClient, parse_analysis
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = AnalysisCache(tmp_path / "analyses.db")
+    yield cache
+    cache.close()
+
+
+def run_batch(patients, cache=None):
+    async def run():
+        async with ClaudeClient(cache=cache) as claude:
+            analyses = await analyze_batch(claude, patients, poll_interval=0.01)
+            return analyses, claude
+
+    return asyncio.run(run())
+
+
+def risk_levels(analyses):
+    return [parse_analysis(analysis)['risk_level'] for analysis in analyses]
+
+
+def test_custom_id_is_the_row_index():
+    assert batch_custom_id(7) == "row-7"
+
+
+def test_results_map_back_to_input_order(mock_api, make_patient):
+    patients = [
+        make_patient("P1", medication_adherence=0.95, appointments_missed=0),
+        make_patient("P2", medication_adherence=0.3, crisis_calls_30days=4),
+        make_patient("P3", medication_adherence=0.7),
+    ]
+
+    analyses, claude = run_batch(patients)
+
+    assert risk_levels(analyses) == ["Low", "High", "Medium"]
+    assert claude.metrics.calls == 3
+
+
+def test_duplicates_are_sent_once_and_copied(mock_api, make_patient):
+    # Same fields under different ids and names: identical summaries
+    patients = [make_patient("P1", medication_adherence=0.3), make_patient("P2"),
+                make_patient("P9", name="Someone Else", medication_adherence=0.3)]
+
+    analyses, claude = run_batch(patients)
+
+    assert claude.duplicates == 1
+    assert claude.metrics.calls == 2
+    assert analyses[2] == analyses[0]
+    assert risk_levels(analyses) == ["High", "Low", "High"]
+
+
+def test_cached_patients_skip_the_batch(mock_api, make_patient, cache):
+    patients = [make_patient("P1"), make_patient("P2", medication_adherence=0.3)]
+    first, _ = run_batch(patients, cache)
+
+    second, claude = run_batch(patients, cache)
+
+    assert second == first
+    assert claude.metrics.cache_hits == 2
+    assert claude.metrics.calls == 0
+    assert len(mock_api.state.batches) == 1
+
+
+def test_invalid_reply_gets_one_interactive_retry(mock_api, mock_server, make_patient, monkeypatch):
+    real_response = mock_server.message_response
+
+    def invalid_first_reply(params, prompt_cache=None):
+        response = real_response(params, prompt_cache)
+        if len(params["messages"]) == 1:
+            response["content"][0]["input"]["risk_level"] = "Severe"
+        return response
+
+    monkeypatch.setattr(mock_server, "message_response", invalid_first_reply)
+
+    analyses, _ = run_batch([make_patient("P1", medication_adherence=0.3)])
+
+    assert risk_levels(analyses) == ["High"]
+    assert mock_api.state.snapshot()['requests'] == 1
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from app.ai.assessment import RiskAssessment
+from app.ai.cascade import Cascade, describe_cascade
+from app.ai.claude_client import ClaudeClient, parse_analysis
+
+
+def assessment(risk_level, confidence=0.9):
+    return RiskAssessment(risk_level, "factor", "action", confidence)
+
+
+@pytest.mark.parametrize("fast, floor, reason", [
+    (assessment("High"), None, "high risk"),
+    (assessment("Medium", 0.65), None, "low confidence"),
+    (assessment("Low", 0.95), "Medium", "disagrees with rules"),
+    (assessment("Low", 0.95), "Low", None),
+    (assessment("Medium", 0.8), "Medium", None),
+    (assessment("Low", 0.95), None, None),
+])
+def test_escalation_reason(make_patient, fast, floor, reason):
+    cascade = Cascade(fast_model="fast", min_confidence=0.8, rule_floor=lambda patient: floor)
+    assert cascade.escalation_reason(make_patient(), fast) == reason
+
+
+def test_label_keeps_cascade_answers_apart():
+    assert Cascade("fast", 0.8).label("strong") == "cascade:fast>strong@0.8"
+    assert Cascade("fast", 0.7).label("strong") != Cascade("fast", 0.8).label("strong")
+
+
+def test_cascade_escalates_only_the_uncertain_and_high_risk(mock_api, make_patient):
+    patients = [
+        make_patient("LOW", medication_adherence=0.95, appointments_missed=0),
+        make_patient("HIGH", medication_adherence=0.3, crisis_calls_30days=4),
+        # One signal decides Medium, so the mock answers with 0.65 confidence
+        make_patient("UNSURE", medication_adherence=0.7, appointments_missed=0),
+        # Two signals: 0.85 confidence, kept
+        make_patient("SURE", medication_adherence=0.7, appointments_missed=3),
+    ]
+    cascade = Cascade(fast_model="fast-model", min_confidence=0.8)
+    decided_by = {}
+
+    async def run():
+        async with ClaudeClient(model="strong-model", cascade=cascade) as claude:
+            analyses = await claude.analyze_many(
+                patients, on_result=lambda index, text, model: decided_by.update({index: model})
+            )
+            return analyses, claude
+
+    analyses, claude = asyncio.run(run())
+
+    assert [parse_analysis(text)['risk_level'] for text in analyses] == ["Low", "High", "Medium", "Medium"]
+    assert decided_by == {0: "fast-model", 1: "strong-model", 2: "strong-model", 3: "fast-model"}
+    assert cascade.escalations == {"high risk": 1, "low confidence": 1}
+    assert claude.usage_by_model["fast-model"]["requests"] == 4
+    assert claude.usage_by_model["strong-model"]["requests"] == 2
+
+    summary = cascade.summary(claude)
+    assert (summary['patients'], summary['escalated']) == (4, 2)
+    assert "2/4 escalated (1 high risk, 1 low confidence)" in describe_cascade(
+        summary, "fast-model", "strong-model"
+    )
@@ -0,0 +1,163 @@
+import csv
+
+import numpy as np
+import pytest
+
+from app.screening.columns import (
+    REQUIRED_COLUMNS,
+    PatientColumns,
+    column_chunks,
+    encode_strings,
+    header_positions,
+    load_columns,
+    open_extract,
+    parse_columns,
+    row_problem,
+)
+from app.screening.records import PatientRecord
+
+
+def dictreader_records(path):
+    """What the loader replaced: csv.DictReader, row_problem(), PatientRecord.from_row()."""
+    with open(path, newline="", encoding="utf-8") as file:
+        return [PatientRecord.from_row(row) for row in csv.DictReader(file) if not row_problem(row)]
+
+
+def chunked_records(path, chunk_size, **kwargs):
+    with open_extract(path) as file:
+        chunks = list(column_chunks(file, chunk_size, **kwargs))
+    return chunks, [record for chunk in chunks for record in chunk.rows()]
+
+
+@pytest.mark.parametrize("change, problem", [
+    ({}, None),
+    ({"name": " "}, "missing name"),
+    ({"diagnosis": "", "case_manager": ""}, "missing diagnosis, case_manager"),
+    ({"medication_adherence": "high"}, "non-numeric adherence, missed appointments or crisis calls"),
+    ({"medication_adherence": "1.2"}, "medication_adherence 1.2 outside 0-1"),
+    ({"crisis_calls_30days": "-1"}, "negative or non-finite appointment or crisis-call count"),
+    ({"appointments_missed": "inf"}, "negative or non-finite appointment or crisis-call count"),
+    ({"crisis_calls_30days": "2147483647"}, None),
+    ({"appointments_missed": "3000000000"}, "appointment or crisis-call count above 2147483647"),
+])
+def test_row_problem(extract_row, change, problem):
+    row = {**dict(zip(REQUIRED_COLUMNS, extract_row(1))), **change}
+    assert row_problem(row) == problem
+
+
+def test_encode_strings_shares_distinct_values():
+    codes, distinct = encode_strings(["PTSD", "GAD", "PTSD"])
+    assert codes.dtype == np.int32
+    assert codes.tolist() == [0, 1, 0]
+    assert distinct == ["PTSD", "GAD"]
+
+
+def test_header_positions_allow_any_order_and_name_missing_columns():
+    header = list(reversed(REQUIRED_COLUMNS)) + ["extra"]
+    assert header_positions(header)["patient_id"] == len(REQUIRED_COLUMNS) - 1
+    with pytest.raises(ValueError, match="missing columns: diagnosis, case_manager"):
+        header_positions(REQUIRED_COLUMNS[:6])
+
+
+def test_chunks_match_dictreader(write_extract, extract_row):
+    path = write_extract("patients.csv", [extract_row(i) for i in range(23)])
+
+    chunks, records = chunked_records(path, 10)
+
+    assert [len(chunk) for chunk in chunks] == [10, 10, 3]
+    assert records == dictreader_records(path)
+    assert chunks[0].adherence.dtype == np.float64
+    assert chunks[0].missed.dtype == np.int32
+
+
+def test_bad_rows_are_dropped_with_their_file_row_numbers(write_extract, extract_row):
+    rows = [extract_row(i) for i in range(6)]
+    rows[1][4] = "n/a"
+    rows[4][1] = ""
+    path = write_extract("patients.csv", rows)
+    rejected = []
+
+    chunks, records = chunked_records(path, 3, on_reject=lambda number, row, reason:
+                                      rejected.append((number, row['patient_id'], reason)))
+
+    assert [record.patient_id for record in records] == ["P0000", "P0002", "P0003", "P0005"]
+    assert rejected == [
+        (3, "P0001", "non-numeric adherence, missed appointments or crisis calls"),
+        (6, "P0004", "missing name"),
+    ]
+
+
+def test_quoted_fields_switch_to_csv_reader(write_extract, extract_row):
+    rows = [extract_row(i) for i in range(7)]
+    rows[5][6] = 'Bipolar I, "current episode"\ndepressed'
+    path = write_extract("patients.csv", rows)
+
+    chunks, records = chunked_records(path, 3)
+
+    assert records == dictreader_records(path)
+    assert records[5].diagnosis == 'Bipolar I, "current episode"\ndepressed'
+
+
+def test_blank_and_short_lines(tmp_path, extract_row):
+    path = tmp_path / "patients.csv"
+    lines = [",".join(REQUIRED_COLUMNS)] + [",".join(extract_row(i)) for i in range(4)]
+    lines.insert(3, "")
+    lines.insert(5, "P9999,Short Row")
+    path.write_text("\r\n".join(lines) + "\r\n", encoding="utf-8")
+    rejected = []
+
+    _, records = chunked_records(path, 10, on_reject=lambda *reject: rejected.append(reject))
+
+    assert [record.patient_id for record in records] == ["P0000", "P0001", "P0002", "P0003"]
+    assert [row['patient_id'] for _, row, _ in rejected] == ["P9999"]
+
+
+def test_select_concat_and_triage_arrays(write_extract, extract_row):
+    path = write_extract("patients.csv", [extract_row(i) for i in range(8)])
+    chunks, records = chunked_records(path, 3)
+
+    whole = PatientColumns.concat(chunks)
+    assert whole.rows() == records
+    assert load_columns(path, chunk_size=3).rows() == records
+
+    picked = whole.select([6, 1])
+    assert picked.rows() == [records[6], records[1]]
+    adherence, missed, crisis = whole.triage_arrays([6, 1])
+    assert adherence.tolist() == [records[6].medication_adherence, records[1].medication_adherence]
+    assert missed.tolist() == [records[6].appointments_missed, records[1].appointments_missed]
+
+    empty = PatientColumns.concat([])
+    assert len(empty) == 0 and empty.rows() == []
+
+
+def test_parse_columns_keeps_numbers_typed(extract_row):
+    text = {name: [value] for name, value in zip(REQUIRED_COLUMNS, extract_row(3))}
+    text["appointments_missed"] = ["2.0"]
+
+    record = parse_columns(text).rows()[0]
+
+    assert record.appointments_missed == 2
+    assert isinstance(record.appointments_missed, int)
+    assert isinstance(record.medication_adherence, float)
+
+
+def test_parse_columns_rejects_whitespace_only_fields(extract_row):
+    text = {name: [value, value] for name, value in zip(REQUIRED_COLUMNS, extract_row(3))}
+    text["case_manager"] = ["Dr. Lee", "  "]
+    rejected = []
+
+    columns = parse_columns(text, on_reject=lambda number, row, reason: rejected.append((number, reason)))
+
+    assert len(columns) == 1
+    assert rejected == [(3, "missing case_manager")]
+
+
+def test_parse_columns_rejects_counts_that_overflow_int32(extract_row):
+    text = {name: [value, value] for name, value in zip(REQUIRED_COLUMNS, extract_row(3))}
+    text["appointments_missed"] = ["2147483647", "3000000000"]
+    rejected = []
+
+    columns = parse_columns(text, on_reject=lambda number, row, reason: rejected.append((number, reason)))
+
+    assert columns.missed.tolist() == [2147483647]
+    assert rejected == [(3, "appointment or crisis-call count above 2147483647")]
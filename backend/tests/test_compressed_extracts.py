@@ -0,0 +1,95 @@
+import gzip
+
+import pytest
+import zstandard
+
+from app.screening.columns import (
+    REQUIRED_COLUMNS,
+    is_compressed,
+    mapped_column_chunks,
+    open_extract,
+    read_column_chunks,
+)
+
+
+def records(chunks):
+    return [record for chunk in chunks for record in chunk.rows()]
+
+
+@pytest.fixture
+def extract(write_extract, extract_row):
+    rows = [extract_row(i) for i in range(23)]
+    # Row lengths far from the average, so the first cut guess is wrong
+    rows[2][6] = "Schizoaffective Disorder bipolar type with catatonia " * 5
+    rows[3][6] = "X"
+    return write_extract("patients.csv", rows)
+
+
+def test_is_compressed():
+    assert is_compressed("incoming/patients.csv.gz")
+    assert is_compressed("PATIENTS.CSV.ZST")
+    assert not is_compressed("patients.csv")
+
+
+def test_gzip_and_zstd_read_like_the_plain_file(extract, tmp_path):
+    data = extract.read_bytes()
+    gz = tmp_path / "patients.csv.gz"
+    gz.write_bytes(gzip.compress(data))
+    zst = tmp_path / "patients.csv.zst"
+    # Two frames, as a concatenated or appended extract would have
+    middle = len(data) // 2
+    compressor = zstandard.ZstdCompressor()
+    zst.write_bytes(compressor.compress(data[:middle]) + compressor.compress(data[middle:]))
+
+    plain = records(read_column_chunks(extract, 5))
+
+    assert records(read_column_chunks(gz, 5)) == plain
+    assert records(read_column_chunks(zst, 5)) == plain
+    # Compressed extracts can't be split by byte range, so workers are ignored
+    assert records(read_column_chunks(gz, 5, workers=2)) == plain
+    with open_extract(zst) as file:
+        assert file.read() == data.decode()
+
+
+def test_mapped_chunks_are_exactly_chunk_size(extract):
+    chunks = list(mapped_column_chunks(extract, 7))
+
+    assert [len(chunk) for chunk in chunks] == [7, 7, 7, 2]
+    with open_extract(extract) as file:
+        assert [record.patient_id for record in records(chunks)] == [
+            line.split(",", 1)[0] for line in file.read().splitlines()[1:]
+        ]
+
+
+@pytest.mark.parametrize("newline, trailing", [("\n", True), ("\n", False), ("\r\n", True)])
+def test_mapped_chunks_line_endings(tmp_path, extract_row, newline, trailing):
+    path = tmp_path / "patients.csv"
+    lines = [",".join(REQUIRED_COLUMNS)] + [",".join(extract_row(i)) for i in range(10)]
+    path.write_bytes((newline.join(lines) + (newline if trailing else "")).encode())
+
+    chunks = list(mapped_column_chunks(path, 4))
+
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    assert records(chunks)[-1].case_manager == extract_row(9)[7]
+
+
+def test_mapped_chunks_hand_over_to_csv_reader_at_first_quote(write_extract, extract_row):
+    rows = [extract_row(i) for i in range(12)]
+    rows[9][6] = 'Bipolar I,\n"current episode" depressed'
+    rows[10][4] = "2.5"
+    path = write_extract("patients.csv", rows)
+    rejected = []
+
+    chunks = list(mapped_column_chunks(path, 4, on_reject=lambda number, row, reason:
+                                       rejected.append((number, row['patient_id']))))
+
+    assert [record.patient_id for record in records(chunks)] == [row[0] for row in rows if row[0] != "P0010"]
+    assert records(chunks)[9].diagnosis == 'Bipolar I,\n"current episode" depressed'
+    assert rejected == [(12, "P0010")]
+
+
+def test_empty_extract_has_no_header(tmp_path):
+    path = tmp_path / "patients.csv"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError, match="missing columns"):
+        list(read_column_chunks(path, 10))
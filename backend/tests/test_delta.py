@@ -0,0 +1,54 @@
+from app.screening.delta import ScreeningState, screening_fingerprint
+from app.screening.screener import screen_patients
+
+
+def test_fingerprint_covers_fields_rules_and_model(make_patient):
+    patient = make_patient()
+    fingerprint = screening_fingerprint(patient, "rules-v1", "model-a")
+
+    # Name and ID never reach the model, so they don't change the result
+    renamed = make_patient("P999", name="Renamed")
+    assert screening_fingerprint(renamed, "rules-v1", "model-a") == fingerprint
+    changed = make_patient(medication_adherence=0.5)
+    assert screening_fingerprint(changed, "rules-v1", "model-a") != fingerprint
+    assert screening_fingerprint(patient, "rules-v2", "model-a") != fingerprint
+    assert screening_fingerprint(patient, "rules-v1", "model-b") != fingerprint
+
+
+def test_state_loads_only_the_requested_patients(tmp_path):
+    state = ScreeningState(tmp_path / "state.db")
+    try:
+        state.save_many([("P1", "f1", "Risk Level: Low", "Rules"),
+                         ("P2", "f2", "Risk Level: High", "Rules")])
+        state.save_many([("P1", "f1b", "Risk Level: Medium", "Claude (model-a)")])
+
+        loaded = state.load(["P1", "P3", "P1"])
+        assert list(loaded) == ["P1"]
+        assert loaded["P1"]["fingerprint"] == "f1b"
+        assert loaded["P1"]["decided_by"] == "Claude (model-a)"
+        assert set(state.load_all()) == {"P1", "P2"}
+    finally:
+        state.close()
+
+
+def test_delta_run_reuses_unchanged_patients(mock_api, isolated_state, make_patient):
+    patients = [make_patient(f"P{i}", medication_adherence=0.55 + i / 20) for i in range(4)]
+    first = screen_patients(patients, delta=True, cascade=False)
+    assert not any(result['reused_from'] for result in first)
+
+    patients[2] = make_patient("P2", medication_adherence=0.3)
+    second = screen_patients(patients, delta=True, cascade=False)
+
+    assert [bool(result['reused_from']) for result in second] == [True, True, False, True]
+    assert second[0]['analysis'] == first[0]['analysis']
+
+
+def test_switching_the_cascade_rescreens_everyone(mock_api, isolated_state, make_patient):
+    patients = [make_patient(f"P{i}", medication_adherence=0.6 + i / 20) for i in range(3)]
+    screen_patients(patients, delta=True, cascade=False)
+
+    with_cascade = screen_patients(patients, delta=True, cascade=True)
+    again = screen_patients(patients, delta=True, cascade=True)
+
+    assert not any(result['reused_from'] for result in with_cascade)
+    assert all(result['reused_from'] for result in again)
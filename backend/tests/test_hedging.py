@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+
+from app.ai.claude_client import ClaudeClient, deadline_expired, parse_analysis
+from app.ai.hedging import LatencyTracker, first_success
+
+
+def test_threshold_waits_for_enough_samples():
+    tracker = LatencyTracker(percentile=0.95, min_samples=20)
+    for seconds in range(19):
+        tracker.observe(seconds)
+    assert tracker.threshold() is None
+
+    tracker.observe(19)
+    assert tracker.threshold() == 19
+
+
+def test_threshold_is_the_percentile_of_the_window():
+    tracker = LatencyTracker(percentile=0.9, window=100, min_samples=1)
+    for seconds in range(1000):
+        tracker.observe(seconds / 1000)
+    # Only the last 100 samples (0.900 .. 0.999) count
+    assert tracker.threshold() == pytest.approx(0.99)
+
+
+def calls(*plans):
+    """send() whose n-th call sleeps plans[n][0] then returns or raises plans[n][1]."""
+    plans = list(plans)
+
+    async def send():
+        delay, outcome = plans.pop(0)
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return send
+
+
+def test_fast_call_is_not_hedged():
+    hedged = []
+    result = asyncio.run(first_success(calls((0, "primary")), 0.1, on_hedge=lambda: hedged.append(1)))
+    assert result == ("primary", False, False)
+    assert hedged == []
+
+
+def test_slow_call_is_raced_and_the_duplicate_can_win():
+    hedged = []
+    result = asyncio.run(first_success(calls((1.0, "primary"), (0, "hedge")), 0.02,
+                                       on_hedge=lambda: hedged.append(1)))
+    assert result == ("hedge", True, True)
+    assert hedged == [1]
+
+
+def test_primary_can_still_win_after_hedging():
+    result = asyncio.run(first_success(calls((0.05, "primary"), (1.0, "hedge")), 0.01))
+    assert result == ("primary", True, False)
+
+
+def test_one_failure_falls_back_to_the_other_call():
+    result = asyncio.run(first_success(calls((0.05, ConnectionError("reset")), (0.1, "hedge")), 0.01))
+    assert result == ("hedge", True, True)
+
+
+def test_both_failing_raises_the_first_error():
+    with pytest.raises(ConnectionError):
+        asyncio.run(first_success(calls((0.05, ConnectionError("first")), (0.1, TimeoutError("second"))),
+                                  0.01))
+
+
+def test_loser_is_cancelled():
+    started = []
+    cancelled = []
+
+    async def send():
+        # The first call is slow; the hedge returns at once
+        call = len(started)
+        started.append(call)
+        try:
+            await asyncio.sleep(1.0 if call == 0 else 0)
+        except asyncio.CancelledError:
+            cancelled.append(call)
+            raise
+        return "done"
+
+    async def run():
+        result = await first_success(send, 0.01)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == ("done", True, True)
+    # The slow primary, once the hedge had won
+    assert cancelled == [0]
+
+
+def test_run_deadline_fails_only_the_unscreened(mock_api, mock_server, make_patient):
+    mock_api.state.config = mock_server.MockConfig(latency="fixed:0.3")
+    patients = [make_patient(f"P{i}", medication_adherence=0.5 + i / 100) for i in range(6)]
+
+    async def run():
+        async with ClaudeClient(concurrency=1, hedge=False, deadline=0.5) as claude:
+            started = time.monotonic()
+            analyses = await claude.analyze_many(patients)
+            return analyses, time.monotonic() - started
+
+    analyses, elapsed = asyncio.run(run())
+
+    expired = [deadline_expired(text) for text in analyses]
+    assert elapsed < 1.0
+    assert expired[0] is False
+    assert any(expired)
+    assert all(parse_analysis(text)['risk_level'] == "Unknown" for text, gone in zip(analyses, expired) if gone)
@@ -0,0 +1,65 @@
+from app.screening.journal import RunJournal
+from app.screening.screener import screen_patients
+
+
+def journaled(index):
+    return {'analysis': f"Risk Level: Medium\nPrimary Factor: Journaled {index}\nAction: Follow up",
+            'decided_by': "Claude (model-a)", 'reused_from': None}
+
+
+def test_torn_last_line_is_skipped_and_terminated(tmp_path, make_patient):
+    journal = RunJournal("run1", runs_dir=tmp_path)
+    journal.record(0, make_patient("P0"), journaled(0))
+    journal.record(1, make_patient("P1"), journaled(1))
+    journal.close()
+    # A crash mid-write leaves half a line behind
+    with open(tmp_path / "run1.jsonl", 'a', encoding='utf-8') as file:
+        file.write('{"index": 2, "patient_id": "P2", "res')
+
+    resumed = RunJournal("run1", runs_dir=tmp_path)
+    assert resumed.torn
+    assert sorted(resumed.completed) == [0, 1]
+    resumed.record(2, make_patient("P2"), journaled(2))
+    resumed.close()
+
+    again = RunJournal("run1", runs_dir=tmp_path)
+    try:
+        assert not again.torn
+        assert again.lookup(2, make_patient("P2")) == journaled(2)
+    finally:
+        again.close()
+
+
+def test_lookup_requires_the_same_patient_id(tmp_path, make_patient):
+    journal = RunJournal("run1", runs_dir=tmp_path)
+    try:
+        journal.record(0, make_patient("P0"), journaled(0))
+
+        assert journal.lookup(0, make_patient("P0")) == journaled(0)
+        # Same row number in a different extract
+        assert journal.lookup(0, make_patient("Q0")) is None
+        assert journal.lookup(1, make_patient("P0")) is None
+    finally:
+        journal.close()
+
+
+def test_resume_skips_journaled_patients(mock_api, isolated_state, tmp_path, make_patient):
+    patients = [make_patient(f"P{i}", medication_adherence=0.55 + i / 20) for i in range(4)]
+    journal = RunJournal("run1", runs_dir=tmp_path)
+    journal.record(0, patients[0], journaled(0))
+    journal.record(1, patients[1], journaled(1))
+    journal.close()
+
+    resumed = RunJournal("run1", runs_dir=tmp_path)
+    try:
+        results = screen_patients(patients, journal=resumed, cascade=False)
+    finally:
+        resumed.close()
+
+    assert results[:2] == [journaled(0), journaled(1)]
+    assert all(result['decided_by'].startswith("Claude") for result in results[2:])
+    assert mock_api.state.snapshot()['requests'] == 2
+    # The new results were journaled too
+    again = RunJournal("run1", runs_dir=tmp_path)
+    again.close()
+    assert sorted(again.completed) == [0, 1, 2, 3]
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import random
+import socket
+import struct
+import time
+import urllib.request
+
+import pytest
+
+from app.ai.claude_client import ClaudeClient, parse_analysis
+
+
+@pytest.mark.parametrize("spec, low, high", [
+    ("fixed:0.25", 0.25, 0.25),
+    ("uniform:0.1,0.3", 0.1, 0.3),
+    ("normal:0.5,0.1", 0.0, 2.0),
+    ("lognormal:0.8,0.4", 0.0, 100.0),
+])
+def test_parse_latency(mock_server, spec, low, high):
+    sample = mock_server.parse_latency(spec)
+    rng = random.Random(1)
+    assert all(low <= sample(rng) <= high for _ in range(100))
+
+
+@pytest.mark.parametrize("spec", ["fixed", "uniform:1", "pareto:1,2", "fixed:fast"])
+def test_parse_latency_rejects_bad_specs(mock_server, spec):
+    with pytest.raises(ValueError):
+        mock_server.parse_latency(spec)
+
+
+@pytest.mark.parametrize("prompt, level, confidence", [
+    ("adherence: 95%\nmissed_appts_6mo: 0\ncrisis_calls_30d: 0", "Low", 0.9),
+    ("adherence: 45%\nmissed_appts_6mo: 0\ncrisis_calls_30d: 0", "High", 0.95),
+    ("adherence: 95%\nmissed_appts_6mo: 0\ncrisis_calls_30d: 3", "High", 0.95),
+    ("adherence: 70%\nmissed_appts_6mo: 0\ncrisis_calls_30d: 0", "Medium", 0.65),
+    ("adherence: 70%\nmissed_appts_6mo: 2\ncrisis_calls_30d: 0", "Medium", 0.85),
+])
+def test_canned_answers_follow_the_prompt(mock_server, prompt, level, confidence):
+    assert mock_server.canned_fields(prompt)[0] == level
+    assert mock_server.canned_confidence(prompt) == confidence
+
+
+def test_fault_injection_is_seeded_and_rpm_limited(mock_server):
+    def fates(config):
+        state = mock_server.MockState(config)
+        return [state.admit()[0] for _ in range(200)]
+
+    config = mock_server.MockConfig(rate_429=0.1, rate_529=0.05, seed=7)
+    first = fates(config)
+    assert first == fates(config)
+    assert 5 < first.count(429) < 40
+    assert 0 < first.count(529) < 25
+
+    limited = mock_server.MockState(mock_server.MockConfig(rpm=3))
+    assert [limited.admit()[0] for _ in range(5)] == [None, None, None, 429, 429]
+    assert limited.snapshot()['rate_limited_429'] == 2
+
+
+def test_client_rides_out_injected_overloads(mock_api, mock_server, make_patient):
+    mock_api.state.config = mock_server.MockConfig(rate_429=0.3, rate_529=0.2, retry_after=0.01,
+                                                   seed=3)
+    patients = [make_patient(f"P{i}", medication_adherence=0.5 + i / 100) for i in range(12)]
+
+    async def run():
+        async with ClaudeClient(hedge=False) as claude:
+            return await claude.analyze_many(patients), claude
+
+    analyses, claude = asyncio.run(run())
+    stats = json.load(urllib.request.urlopen(f"http://127.0.0.1:{mock_api.server_port}/v1/mock/stats"))
+
+    assert all(parse_analysis(text)['risk_level'] != "Unknown" for text in analyses)
+    assert stats['succeeded'] == 12
+    assert stats['rate_limited_429'] + stats['overloaded_529'] == claude.retries > 0
+    assert claude.limiter.throttled == claude.retries
+    assert stats['config']['rate_429'] == 0.3
+
+
+def test_client_hanging_up_mid_response_is_ignored(mock_api, mock_server, capfd):
+    mock_api.state.config = mock_server.MockConfig(latency="fixed:0.2")
+    body = json.dumps({"model": "m", "max_tokens": 10,
+                       "messages": [{"role": "user", "content": "adherence: 50%"}]}).encode()
+    request = (f"POST /v1/messages HTTP/1.1\r\nHost: localhost\r\n"
+               f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode()
+
+    for _ in range(3):
+        with socket.create_connection(("127.0.0.1", mock_api.server_port)) as sock:
+            # Close with a reset, like a cancelled hedge or a killed client
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+            sock.sendall(request + body)
+    # Let the server try to answer the closed connections
+    time.sleep(0.5)
+    stats = json.load(urllib.request.urlopen(f"http://127.0.0.1:{mock_api.server_port}/v1/mock/stats"))
+
+    assert stats['requests'] == 3
+    assert "Traceback" not in capfd.readouterr().err
+
+
+def test_cache_minimum_depends_on_the_model(mock_server):
+    system = [{"type": "text", "text": "x" * 4 * 1500, "cache_control": {"type": "ephemeral"}}]
+    cache = set()
+
+    for model, written in [("claude-sonnet-4-20250514", 1500), ("claude-3-5-haiku-20241022", 0)]:
+        usage = mock_server.prompt_usage({"model": model, "system": system}, "hi", cache)
+        assert usage["cache_creation_input_tokens"] == written
+        assert usage["input_tokens"] == 1 + 1500 - written
+
+    # Sonnet's entry doesn't serve Haiku, and a second Sonnet call reads it
+    assert mock_server.prompt_usage({"model": "claude-sonnet-4-20250514", "system": system},
+                                    "hi", cache)["cache_read_input_tokens"] == 1500
@@ -0,0 +1,117 @@
+import os
+
+import pytest
+
+from app.screening.columns import (
+    line_ranges,
+    mapped_column_chunks,
+    parallel_column_chunks,
+    parse_range,
+    read_column_chunks,
+    spans_lines,
+)
+
+
+def records(chunks):
+    return [record for chunk in chunks for record in chunk.rows()]
+
+
+def header_length(path):
+    with open(path, 'rb') as file:
+        return len(file.readline())
+
+
+@pytest.fixture
+def extract(write_extract, extract_row):
+    rows = [extract_row(i) for i in range(40)]
+    rows[7][4] = "n/a"
+    rows[31][3] = "-2"
+    return write_extract("patients.csv", rows)
+
+
+@pytest.mark.parametrize("range_bytes", [1, 60, 250, 10**6])
+def test_line_ranges_cover_the_file_at_line_boundaries(extract, range_bytes):
+    data = extract.read_bytes()
+    start = header_length(extract)
+
+    ranges = list(line_ranges(extract, start, range_bytes))
+
+    assert ranges[0][0] == start
+    assert ranges[-1][1] == len(data)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    assert all(data[end - 1:end] == b"\n" for _, end in ranges)
+    assert all(end - begin >= min(range_bytes, len(data) - begin) for begin, end in ranges)
+
+
+def test_line_ranges_without_trailing_newline(tmp_path):
+    path = tmp_path / "patients.csv"
+    path.write_bytes(b"header\nrow one\nrow two")
+
+    assert list(line_ranges(path, 7, range_bytes=3)) == [(7, 15), (15, 22)]
+
+
+@pytest.mark.parametrize("text, spans", [
+    ("P1,Pat,2026-01-01\n", False),
+    ('P1,"Pat, Jr.",2026-01-01\n', False),
+    ('P1,"Pat\n Jr.",2026-01-01\n', True),
+    ('P1,Pat,"Bipolar\n', True),
+])
+def test_spans_lines(text, spans):
+    assert spans_lines(text) == spans
+
+
+def test_parse_range_reports_rows_relative_to_the_range(extract):
+    data = extract.read_bytes()
+    header = data.split(b"\n", 1)[0].decode().split(",")
+    # The range holding P0007 and its invalid adherence
+    start, end = next((begin, end) for begin, end in line_ranges(extract, header_length(extract), 300)
+                      if b"P0007" in data[begin:end])
+    lines = data[start:end].splitlines()
+
+    chunks, rejects, rows = parse_range(extract, start, end, header, chunk_size=4)
+
+    assert rows == len(lines)
+    assert sum(map(len, chunks)) == rows - 1
+    assert all(len(chunk) <= 4 for chunk in chunks)
+    [(offset, row, reason)] = rejects
+    assert row['patient_id'] == "P0007"
+    assert lines[offset].startswith(b"P0007,")
+
+
+def test_parse_range_declines_a_quoted_field_cut_by_the_range(tmp_path):
+    path = tmp_path / "patients.csv"
+    path.write_text('P1,"Bipolar\n', encoding="utf-8")
+    assert parse_range(path, 0, os.path.getsize(path), ["patient_id", "diagnosis"], 10) is None
+
+
+def test_parallel_matches_sequential_with_file_row_numbers(extract):
+    sequential_rejects, parallel_rejects = [], []
+    sequential = records(mapped_column_chunks(extract, 6,
+                                              on_reject=lambda *r: sequential_rejects.append(r)))
+
+    chunks = list(parallel_column_chunks(extract, 6, workers=2, range_bytes=250,
+                                         on_reject=lambda *r: parallel_rejects.append(r)))
+
+    assert records(chunks) == sequential
+    assert all(len(chunk) <= 6 for chunk in chunks)
+    assert [(number, row['patient_id']) for number, row, _ in parallel_rejects] == [(9, "P0007"),
+                                                                                   (33, "P0031")]
+    assert parallel_rejects == sequential_rejects
+
+
+def test_quoted_newline_falls_back_to_sequential_parsing(write_extract, extract_row):
+    rows = [extract_row(i) for i in range(40)]
+    rows[20][6] = "Bipolar I,\ncurrent episode depressed"
+    rows[35][1] = ""
+    path = write_extract("patients.csv", rows)
+    rejects = []
+
+    parallel = records(read_column_chunks(path, 6, workers=2,
+                                          on_reject=lambda number, row, reason: rejects.append(number)))
+    parallel_small_ranges = records(parallel_column_chunks(path, 6, workers=2, range_bytes=100))
+
+    sequential = records(read_column_chunks(path, 6))
+    assert parallel == sequential
+    assert parallel_small_ranges == sequential
+    assert sequential[20].diagnosis == "Bipolar I,\ncurrent episode depressed"
+    assert rejects == [37]
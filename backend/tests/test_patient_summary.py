@@ -0,0 +1,60 @@
+from datetime import date
+
+import pytest
+
+from app.ai.claude_client import build_packed_prompt, build_risk_prompt, risk_system_blocks
+from app.ai.patient_summary import appointment_recency, build_patient_summary
+
+TODAY = date(2026, 10, 19)
+
+
+@pytest.mark.parametrize("last_appointment, band", [
+    ("2026-10-19", "within 30 days"),
+    ("2026-09-19", "within 30 days"),
+    ("2026-09-18", "31-90 days ago"),
+    ("2026-07-21", "31-90 days ago"),
+    ("2026-07-20", "over 90 days ago"),
+    (" 2026-10-01 ", "within 30 days"),
+    ("10/01/2026", "unknown"),
+    ("", "unknown"),
+])
+def test_appointment_recency_bands(last_appointment, band):
+    assert appointment_recency(last_appointment, TODAY) == band
+
+
+def test_summary_leaves_out_identifying_fields(make_patient):
+    patient = make_patient("MRN-0042", name="Jane Q. Public", case_manager="Dr. Smith",
+                           last_appointment="2026-08-01", medication_adherence=0.456,
+                           appointments_missed=2, crisis_calls_30days=1,
+                           diagnosis=" Major Depressive Disorder ")
+
+    summary = build_patient_summary(patient, TODAY)
+
+    assert summary == (
+        "adherence: 46%\n"
+        "missed_appts_6mo: 2\n"
+        "crisis_calls_30d: 1\n"
+        "last_appt: 31-90 days ago\n"
+        "diagnosis: Major Depressive Disorder"
+    )
+    for phi in ("MRN-0042", "Jane", "Smith", "2026-08-01"):
+        assert phi not in summary
+
+
+def test_summary_is_stable_within_a_band(make_patient):
+    patient = make_patient(last_appointment="2026-10-10")
+    assert build_patient_summary(patient, TODAY) == build_patient_summary(patient, date(2026, 10, 30))
+
+
+def test_instructions_are_cached_and_prompts_carry_only_the_summary(make_patient):
+    first = make_patient("P1", name="Jane Q. Public")
+    second = make_patient("P2", medication_adherence=0.3)
+
+    blocks = risk_system_blocks()
+    assert blocks[0]["cache_control"] == {"type": "ephemeral"}
+    assert build_risk_prompt(first) == f"PATIENT:\n{build_patient_summary(first)}"
+    assert build_packed_prompt([first, second]) == (
+        f"PATIENT p1:\n{build_patient_summary(first)}\n\n"
+        f"PATIENT p2:\n{build_patient_summary(second)}"
+    )
+    assert "Jane" not in build_packed_prompt([first, second])
@@ -0,0 +1,149 @@
+import threading
+
+import pytest
+
+from app.ai.analysis_run import AnalysisRun, RunCancelled
+from app.ai.claude_client import parse_analysis
+from app.screening.columns import read_column_chunks
+from app.screening.pipeline import LineSpool, RiskTally, prefetch, screen_stream
+from app.screening.screener import screen_patients
+
+
+@pytest.fixture
+def extract(write_extract, extract_row):
+    return write_extract("patients.csv", [extract_row(i) for i in range(25)])
+
+
+def risk_levels(results):
+    return [parse_analysis(result['analysis'])['risk_level'] for result in results]
+
+
+def test_stream_matches_one_cohort_in_input_order(mock_api, isolated_state, extract):
+    streamed = []
+    landed = []
+    stream = screen_stream(read_column_chunks(extract, 10), cascade=False,
+                           on_result=lambda patient, result: landed.append(patient.patient_id))
+    for patient, result in stream:
+        streamed.append((patient, result))
+
+    patients = [patient for patient, _ in streamed]
+    whole = screen_patients(patients, cascade=False)
+
+    assert [p.patient_id for p in patients] == [f"P{i:04d}" for i in range(25)]
+    assert risk_levels(result for _, result in streamed) == risk_levels(whole)
+    assert sorted(landed) == sorted(p.patient_id for p in patients)
+    assert any(r['decided_by'].startswith("Claude") for _, r in streamed)
+
+
+def test_progress_counts_across_the_whole_run(mock_api, isolated_state, extract):
+    seen = []
+    list(screen_stream(read_column_chunks(extract, 10), cascade=False,
+                       progress=lambda done, patient: seen.append(done)))
+    assert seen == list(range(1, len(seen) + 1))
+
+
+def test_batch_mode_sends_every_chunk_in_one_message_batch(mock_api, isolated_state, extract):
+    results = list(screen_stream(read_column_chunks(extract, 10), batch=True))
+
+    assert len(results) == 25
+    assert len(mock_api.state.batches) == 1
+
+
+def test_batch_window_is_flushed_once_it_holds_max_buffered_rows(mock_api, isolated_state,
+                                                                 extract):
+    results = list(screen_stream(read_column_chunks(extract, 10), batch=True,
+                                 max_buffered_rows=15))
+
+    assert [patient.patient_id for patient, _ in results] == [f"P{i:04d}" for i in range(25)]
+    # Holding at most two chunks, the run can't gather all three into one batch
+    assert len(mock_api.state.batches) > 1
+
+
+def test_cohorts_on_one_run_share_calls_for_identical_patients(mock_api, isolated_state,
+                                                              make_patient):
+    first = [make_patient("A1", medication_adherence=0.6), make_patient("A2", medication_adherence=0.7)]
+    # Same summaries as the first cohort, different rows
+    second = [make_patient("B1", medication_adherence=0.6), make_patient("B2", medication_adherence=0.7)]
+
+    with AnalysisRun() as run:
+        pending = [run.submit(first), run.submit(second)]
+        first_analyses, second_analyses = (run.result(future) for future in pending)
+        duplicates = run.claude.duplicates
+
+    assert second_analyses == first_analyses
+    assert duplicates == 2
+    assert mock_api.state.snapshot()['requests'] == 2
+
+
+def test_cancel_stops_the_run_and_its_outstanding_calls(mock_api, mock_server, isolated_state,
+                                                       make_patient):
+    mock_api.state.config = mock_server.MockConfig(latency="fixed:0.5")
+    # Distinct adherence, so no two patients share a call
+    patients = [make_patient(f"P{i:02d}", medication_adherence=0.5 + i / 100) for i in range(40)]
+    cancel = threading.Event()
+    landed = []
+
+    def on_result(index, result):
+        landed.append(index)
+        cancel.set()
+
+    with pytest.raises(RunCancelled):
+        screen_patients(patients, cascade=False, on_result=on_result, cancel=cancel)
+
+    assert 0 < len(landed) < len(patients)
+    assert mock_api.state.snapshot()['requests'] < len(patients)
+
+
+def test_prefetch_reraises_reader_errors():
+    def chunks():
+        yield 1
+        raise ValueError("bad extract")
+
+    received = []
+    with pytest.raises(ValueError, match="bad extract"):
+        for chunk in prefetch(chunks()):
+            received.append(chunk)
+    assert received == [1]
+
+
+def test_prefetch_stops_the_reader_when_the_consumer_does():
+    finished = threading.Event()
+
+    def chunks():
+        try:
+            for i in range(1000):
+                yield i
+        finally:
+            finished.set()
+
+    stream = prefetch(chunks(), maxsize=2)
+    assert next(stream) == 0
+    stream.close()
+    assert finished.wait(timeout=2)
+
+
+def test_risk_tally_counts_review_and_rule_decisions():
+    tally = RiskTally()
+    tally.add("High", "Rule engine (rules-v1)")
+    tally.add("Medium", "Claude (model)")
+    tally.add("Unknown", "Claude (model)")
+    tally.add("High", "Claude (model)")
+
+    assert tally.stats() == {'total': 4, 'high_risk': 2, 'medium_risk': 1, 'low_risk': 0,
+                             'needs_review': 1, 'rejected': 0}
+    assert tally.rule_decided == 1
+    assert tally.share("High") == 50.0
+    assert RiskTally().share("High") == 0.0
+
+
+def test_line_spool_replays_lines_and_keeps_appending():
+    spool = LineSpool()
+    try:
+        spool.append("  • Pat 1")
+        spool.append("  • Pat 2")
+        assert list(spool) == ["  • Pat 1", "  • Pat 2"]
+        spool.append("  • Pat 3")
+        assert len(spool) == 3
+        assert list(spool)[-1] == "  • Pat 3"
+    finally:
+        spool.close()
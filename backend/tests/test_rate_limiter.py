@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+import pytest
+
+from app.ai.rate_limiter import AIMDConcurrency, RateLimiter, TokenBucket, estimate_tokens
+
+
+def test_estimate_tokens_is_about_four_characters_per_token():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("x" * 400) == 101
+
+
+def test_token_bucket_takes_and_refunds_without_waiting():
+    async def run():
+        bucket = TokenBucket(per_minute=600)
+        await bucket.acquire(500)
+        taken = bucket.tokens
+        bucket.adjust(-200)
+        return taken, bucket.tokens
+
+    taken, refunded = asyncio.run(run())
+    assert taken == pytest.approx(100, abs=1)
+    assert refunded == pytest.approx(300, abs=1)
+
+
+def test_token_bucket_never_exceeds_capacity():
+    bucket = TokenBucket(per_minute=60, burst=10)
+    bucket.adjust(-1000)
+    assert bucket.tokens == 10
+
+
+def test_token_bucket_waits_for_refill():
+    async def run():
+        # 6000/minute = 100/second
+        bucket = TokenBucket(per_minute=6000, burst=10)
+        await bucket.acquire(10)
+        started = time.monotonic()
+        await bucket.acquire(5)
+        return time.monotonic() - started
+
+    assert 0.03 <= asyncio.run(run()) < 0.5
+
+
+def test_token_bucket_clamps_oversized_requests_to_capacity():
+    async def run():
+        bucket = TokenBucket(per_minute=60, burst=10)
+        await asyncio.wait_for(bucket.acquire(1000), timeout=1)
+        return bucket.tokens
+
+    assert asyncio.run(run()) == pytest.approx(0, abs=0.1)
+
+
+def test_aimd_grows_by_about_one_per_window_of_successes():
+    concurrency = AIMDConcurrency(initial=4, maximum=32)
+    for _ in range(4):
+        concurrency.on_success()
+    assert 4.9 < concurrency.limit < 5.0
+
+    concurrency = AIMDConcurrency(initial=4, maximum=4)
+    concurrency.on_success()
+    assert concurrency.limit == 4
+
+
+def test_aimd_halves_once_per_congestion_event():
+    concurrency = AIMDConcurrency(initial=16, minimum=2)
+    started_before = time.monotonic()
+
+    concurrency.on_overload(started_before)
+    assert concurrency.limit == 8
+    # Another call from the same congested window doesn't halve again
+    concurrency.on_overload(started_before)
+    assert concurrency.limit == 8
+
+    for _ in range(5):
+        concurrency.on_overload(time.monotonic())
+    assert concurrency.limit == 2
+
+
+def test_aimd_initial_is_clamped():
+    assert AIMDConcurrency(initial=100, maximum=8).limit == 8
+    assert AIMDConcurrency(initial=0, minimum=1).limit == 1
+
+
+def test_aimd_admits_at_most_limit_calls():
+    async def run():
+        concurrency = AIMDConcurrency(initial=2)
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            await concurrency.acquire()
+            peak = max(peak, concurrency.in_flight)
+            await asyncio.sleep(0.01)
+            await concurrency.release()
+
+        await asyncio.gather(*(call() for _ in range(6)))
+        return peak, concurrency.in_flight
+
+    assert asyncio.run(run()) == (2, 0)
+
+
+def test_slot_settles_tokens_against_real_usage():
+    async def run():
+        limiter = RateLimiter(rpm=600, tpm=10_000)
+        async with limiter.slot(estimated_tokens=1_000) as slot:
+            slot.settle(400)
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter.tokens.tokens == pytest.approx(9_600, abs=5)
+    assert limiter.requests.tokens == pytest.approx(599, abs=1)
+    assert limiter.concurrency.limit > 4
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_overloaded_slot_refunds_tokens_and_pauses():
+    async def run():
+        limiter = RateLimiter(rpm=600, tpm=10_000, initial_concurrency=8)
+        async with limiter.slot(estimated_tokens=1_000) as slot:
+            slot.overloaded(retry_after=0.1)
+        started = time.monotonic()
+        async with limiter.slot(estimated_tokens=10):
+            waited = time.monotonic() - started
+        return limiter, waited
+
+    limiter, waited = asyncio.run(run())
+    assert limiter.stats() == {"concurrency_limit": 4, "in_flight": 0, "throttled": 1}
+    assert limiter.tokens.tokens == pytest.approx(9_990, abs=5)
+    assert waited >= 0.05
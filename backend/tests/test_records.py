@@ -0,0 +1,54 @@
+import pytest
+
+from app.screening.records import PatientAnalysis, PatientRecord
+
+ROW = {
+    'patient_id': "P001", 'name': "Pat One", 'last_appointment': "2026-09-01",
+    'appointments_missed': "2.0", 'medication_adherence': "0.45", 'crisis_calls_30days': "3",
+    'diagnosis': "PTSD", 'case_manager': "Dr. Lee",
+}
+
+
+def test_from_row_parses_numbers_once():
+    patient = PatientRecord.from_row(ROW)
+
+    assert patient == PatientRecord("P001", "Pat One", "2026-09-01", 2, 0.45, 3, "PTSD", "Dr. Lee")
+    assert isinstance(patient.appointments_missed, int)
+
+
+def test_from_row_takes_database_numbers():
+    row = {**ROW, 'appointments_missed': 2, 'medication_adherence': 0.45, 'crisis_calls_30days': 3.0}
+    assert PatientRecord.from_row(row) == PatientRecord.from_row(ROW)
+
+
+def test_from_row_rejects_missing_or_non_numeric_fields():
+    with pytest.raises(KeyError):
+        PatientRecord.from_row({k: v for k, v in ROW.items() if k != 'diagnosis'})
+    with pytest.raises(ValueError):
+        PatientRecord.from_row({**ROW, 'medication_adherence': "n/a"})
+
+
+def test_records_are_slotted():
+    patient = PatientRecord.from_row(ROW)
+    assert not hasattr(patient, "__dict__")
+    with pytest.raises(AttributeError):
+        patient.nickname = "Pat"
+
+
+@pytest.mark.parametrize("reused_from, decided_by", [
+    (None, "Claude (model-a)"),
+    ("2026-10-18T02:00:00", "Claude (model-a) - reused from 2026-10-18T02:00:00"),
+])
+def test_analysis_from_result(reused_from, decided_by):
+    patient = PatientRecord.from_row(ROW)
+    result = {
+        'analysis': "Risk Level: High\nPrimary Factor: 3 crisis calls\nAction: Same-day outreach",
+        'decided_by': "Claude (model-a)",
+        'reused_from': reused_from,
+    }
+
+    analysis = PatientAnalysis.from_result(patient, result)
+
+    assert analysis == PatientAnalysis(patient, "High", "3 crisis calls", "Same-day outreach",
+                                       decided_by)
+    assert not hasattr(analysis, "__dict__")
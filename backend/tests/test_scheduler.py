@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from app.ai.scheduler import CallScheduler
+
+
+def job(log, name, delay=0.0, error=None):
+    async def run():
+        log.append(name)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+    return run
+
+
+def test_most_urgent_call_goes_first_ties_in_submit_order():
+    log = []
+
+    async def run():
+        scheduler = CallScheduler(workers=1)
+        done = [scheduler.submit(job(log, name), priority)
+                for name, priority in [("routine", 1), ("urgent", 5), ("middle", 3), ("urgent-2", 5)]]
+        await asyncio.gather(*done)
+        await scheduler.close()
+
+    asyncio.run(run())
+    assert log == ["urgent", "urgent-2", "middle", "routine"]
+
+
+def test_warm_up_call_runs_alone_before_the_fan_out():
+    log = []
+
+    async def run():
+        scheduler = CallScheduler(workers=4)
+        first = scheduler.submit(job(log, "warm-up", delay=0.05), priority=9)
+        others = [scheduler.submit(job(log, f"call-{i}"), priority=1) for i in range(3)]
+        await asyncio.sleep(0.02)
+        started_during_warm_up = list(log)
+        await asyncio.gather(first, *others)
+        await scheduler.close()
+        return started_during_warm_up
+
+    assert asyncio.run(run()) == ["warm-up"]
+    assert sorted(log) == ["call-0", "call-1", "call-2", "warm-up"]
+
+
+def test_cancel_skips_queued_and_stops_running_calls():
+    log = []
+
+    async def run():
+        scheduler = CallScheduler(workers=1)
+        running = scheduler.submit(job(log, "running", delay=10), priority=3)
+        queued = scheduler.submit(job(log, "queued"), priority=2)
+        after = scheduler.submit(job(log, "after"), priority=1)
+        await asyncio.sleep(0.01)
+        scheduler.cancel([running, queued])
+        # The worker carries on with the next call
+        await asyncio.wait_for(after, timeout=1)
+        await scheduler.close()
+        return running, queued
+
+    running, queued = asyncio.run(run())
+    assert running.cancelled() and queued.cancelled()
+    assert log == ["running", "after"]
+
+
+def test_job_error_reaches_the_caller():
+    async def run():
+        scheduler = CallScheduler(workers=1)
+        failing = scheduler.submit(job([], "failing", error=ConnectionError("reset")))
+        fine = scheduler.submit(job([], "fine"))
+        try:
+            with pytest.raises(ConnectionError):
+                await failing
+            await fine
+        finally:
+            await scheduler.close()
+
+    asyncio.run(run())
+
+
+def test_close_stops_the_workers():
+    async def run():
+        scheduler = CallScheduler(workers=2)
+        await scheduler.submit(job([], "only"))
+        await asyncio.sleep(0)
+        workers = list(scheduler.tasks)
+        await scheduler.close()
+        return workers
+
+    workers = asyncio.run(run())
+    assert len(workers) == 3
+    assert all(task.done() for task in workers)
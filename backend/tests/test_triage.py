@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from app.ai.claude_client import parse_analysis
+from app.screening.screener import screen_patients
+from app.screening.triage import (
+    NEEDS_MODEL,
+    RULE_HIGH,
+    RULE_LOW,
+    fallback_analysis,
+    priority_scores,
+    rule_floor,
+    triage_codes,
+)
+
+
+@pytest.mark.parametrize("adherence, missed, crisis, code", [
+    (0.9, 0, 0, RULE_LOW),
+    (0.89, 0, 0, NEEDS_MODEL),
+    (1.0, 1, 0, NEEDS_MODEL),
+    (1.0, 0, 1, NEEDS_MODEL),
+    (0.3, 4, 2, NEEDS_MODEL),
+    (0.3, 4, 3, RULE_HIGH),
+    (1.0, 0, 3, RULE_HIGH),
+])
+def test_triage_code_boundaries(adherence, missed, crisis, code):
+    codes = triage_codes(np.array([adherence]), np.array([float(missed)]), np.array([float(crisis)]))
+    assert codes.tolist() == [code]
+
+
+def test_only_the_ambiguous_middle_goes_to_claude():
+    adherence = np.array([0.95, 0.9, 0.89, 0.5, 0.5, 1.0])
+    missed = np.array([0.0, 0.0, 0.0, 2.0, 2.0, 0.0])
+    crisis = np.array([0.0, 0.0, 0.0, 2.0, 3.0, 5.0])
+
+    codes = triage_codes(adherence, missed, crisis)
+
+    assert codes.tolist() == [RULE_LOW, RULE_LOW, NEEDS_MODEL, NEEDS_MODEL, RULE_HIGH, RULE_HIGH]
+    assert codes.dtype == np.int8
+
+
+def test_custom_rules_move_the_thresholds():
+    rules = {"version": "test", "low": {"min_adherence": 0.8, "max_missed": 1, "max_crisis": 0},
+             "high": {"min_crisis": 2}}
+    codes = triage_codes(np.array([0.85, 0.85, 0.85]), np.array([1.0, 2.0, 0.0]),
+                         np.array([0.0, 0.0, 2.0]), rules=rules)
+    assert codes.tolist() == [RULE_LOW, NEEDS_MODEL, RULE_HIGH]
+
+
+@pytest.mark.parametrize("fields, floor", [
+    ({"crisis_calls_30days": 3}, "High"),
+    ({"crisis_calls_30days": 2}, "Medium"),
+    ({"crisis_calls_30days": 1, "medication_adherence": 1.0, "appointments_missed": 0}, "Medium"),
+    ({"medication_adherence": 0.9, "appointments_missed": 0}, "Low"),
+    ({"medication_adherence": 0.89, "appointments_missed": 0}, None),
+    ({"medication_adherence": 1.0, "appointments_missed": 1}, None),
+])
+def test_rule_floor(make_patient, fields, floor):
+    assert rule_floor(make_patient(**fields)) == floor
+
+
+def test_priority_scores_weigh_each_signal():
+    scores = priority_scores(np.array([0.4, 1.0, 1.5, -0.5]), np.array([3.0, 0.0, 0.0, 0.0]),
+                             np.array([5.0, 0.0, 0.0, 0.0]))
+
+    # 3*5 + 4*0.6 + 1*3; adherence outside 0-1 is clipped
+    assert scores.tolist() == pytest.approx([20.4, 0.0, 0.0, 4.0])
+
+
+def test_priority_scores_order_crisis_calls_first():
+    scores = priority_scores(np.array([0.5, 1.0]), np.array([1.0, 0.0]), np.array([0.0, 2.0]))
+    assert scores[1] > scores[0]
+
+
+@pytest.mark.parametrize("fields, level", [
+    # 3*2 + 4*0 + 0 = 6.0, exactly FALLBACK_HIGH_SCORE (crisis calls 2, not 3,
+    # so the rules alone would only say Medium)
+    ({"crisis_calls_30days": 2, "medication_adherence": 1.0, "appointments_missed": 0}, "High"),
+    # 3*1 + 4*0.5 = 5.0: below the score, so the rule floor (Medium)
+    ({"crisis_calls_30days": 1, "medication_adherence": 0.5, "appointments_missed": 0}, "Medium"),
+    # No rule opinion falls back to Medium
+    ({"crisis_calls_30days": 0, "medication_adherence": 0.7, "appointments_missed": 1}, "Medium"),
+    ({"crisis_calls_30days": 0, "medication_adherence": 1.0, "appointments_missed": 0}, "Low"),
+])
+def test_fallback_analysis_levels(make_patient, fields, level):
+    parsed = parse_analysis(fallback_analysis(make_patient(**fields)))
+
+    assert parsed['risk_level'] == level
+    assert "deadline" in parsed['primary_factor']
+    assert parsed['action'].startswith("Clinician review")
+
+
+
+def test_screening_sends_only_undecided_patients_to_claude(mock_api, isolated_state, make_patient):
+    patients = [
+        make_patient("LOW", medication_adherence=0.9, appointments_missed=0),
+        make_patient("EDGE", medication_adherence=0.89, appointments_missed=0),
+        make_patient("TWO", crisis_calls_30days=2),
+        make_patient("THREE", crisis_calls_30days=3),
+    ]
+
+    results = screen_patients(patients, cascade=False)
+
+    decided_by = [result['decided_by'].split(" (")[0] for result in results]
+    assert decided_by == ["Rule engine", "Claude", "Claude", "Rule engine"]
+    assert mock_api.state.snapshot()['requests'] == 2
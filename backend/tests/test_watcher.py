@@ -0,0 +1,233 @@
+import csv
+import io
+import os
+
+import pytest
+import zstandard
+
+from app.screening.columns import REQUIRED_COLUMNS
+from app.screening.watcher import (
+    ANCHOR_BYTES,
+    FilePosition,
+    IngestBatch,
+    IngestState,
+    complete_rows_end,
+    extract_files,
+    ingest_batches,
+    read_new_rows,
+    skip_to,
+    watch_folder,
+)
+
+HEADER = ",".join(REQUIRED_COLUMNS)
+
+
+def csv_lines(rows):
+    out = io.StringIO()
+    csv.writer(out, lineterminator="\n").writerows(rows)
+    return out.getvalue()
+
+
+@pytest.fixture
+def state(tmp_path):
+    state = IngestState(tmp_path / "ingest_state.db")
+    yield state
+    state.close()
+
+
+@pytest.fixture
+def folder(tmp_path):
+    folder = tmp_path / "incoming"
+    folder.mkdir()
+    return folder
+
+
+def ingest_once(folder, state):
+    """One folder scan; commits each batch as watch_folder() would after screening."""
+    batches = list(ingest_batches(folder, state, chunk_size=4, once=True))
+    for batch in batches:
+        state.commit(batch)
+    return [patient.patient_id for batch in batches if batch.columns is not None
+            for patient in batch.columns.rows()]
+
+
+@pytest.mark.parametrize("data, end", [
+    (b"", 0),
+    (b"no newline yet", 0),
+    (b"row 1\nrow 2\nrow", 12),
+    (b"row 1\r\nrow 2\r\n", 14),
+    (b'row 1\nP1,"Bipolar I\ncurrent', 6),
+    (b'row 1\nP1,"Bipolar I\ncurrent"\nrow 3', 29),
+    (b'P1,"say ""hi""",x\npartial', 18),
+])
+def test_complete_rows_end(data, end):
+    assert complete_rows_end(data) == end
+
+
+def test_partial_last_row_waits_for_the_next_read(tmp_path, extract_row):
+    path = tmp_path / "admissions.csv"
+    complete = HEADER + "\n" + csv_lines([extract_row(0), extract_row(1)])
+    partial = csv_lines([extract_row(2)])
+    path.write_text(complete + partial[:10])
+    position = FilePosition()
+
+    first = [text for text, _ in read_new_rows(path, position)]
+
+    assert first == [csv_lines([extract_row(0), extract_row(1)])]
+    assert position.header == HEADER
+    assert position.offset == len(complete)
+    assert position.anchor == complete.encode()[-ANCHOR_BYTES:]
+
+    with open(path, "a") as file:
+        file.write(partial[10:] + csv_lines([extract_row(3)]))
+    second = "".join(text for text, _ in read_new_rows(path, position))
+
+    assert second == csv_lines([extract_row(2), extract_row(3)])
+    assert position.offset == os.path.getsize(path)
+
+
+def test_small_blocks_carry_partial_rows_over(tmp_path, extract_row):
+    path = tmp_path / "admissions.csv"
+    rows = [extract_row(i) for i in range(5)]
+    rows[2][6] = "Bipolar I,\ncurrent episode depressed"
+    path.write_text(HEADER + "\n" + csv_lines(rows))
+
+    blocks = [text for text, _ in read_new_rows(path, FilePosition(), block_bytes=7)]
+
+    assert "".join(blocks) == csv_lines(rows)
+    # No block ends inside the quoted newline
+    assert all(complete_rows_end(block.encode()) == len(block.encode()) for block in blocks)
+
+
+def test_rewritten_file_is_read_again_from_the_start(tmp_path, extract_row):
+    path = tmp_path / "admissions.csv"
+    path.write_text(HEADER + "\n" + csv_lines([extract_row(0), extract_row(1)]))
+    position = FilePosition()
+    list(read_new_rows(path, position))
+    position.rows = 2
+
+    # Same length or longer, different bytes before the old offset
+    rewritten = HEADER + "\n" + csv_lines([extract_row(5), extract_row(6), extract_row(7)])
+    path.write_text(rewritten)
+    texts = [text for text, _ in read_new_rows(path, position)]
+
+    assert "".join(texts) == csv_lines([extract_row(5), extract_row(6), extract_row(7)])
+    assert position.header == HEADER
+    assert position.rows == 0
+    assert position.offset == len(rewritten)
+
+
+def test_appended_zstd_frame_is_read_past_the_offset(tmp_path, extract_row):
+    path = tmp_path / "admissions.csv.zst"
+    compressor = zstandard.ZstdCompressor()
+    path.write_bytes(compressor.compress((HEADER + "\n" + csv_lines([extract_row(0)])).encode()))
+    position = FilePosition()
+    list(read_new_rows(path, position))
+
+    with open(path, "ab") as file:
+        file.write(compressor.compress(csv_lines([extract_row(1)]).encode()))
+    texts = [text for text, _ in read_new_rows(path, position)]
+
+    assert texts == [csv_lines([extract_row(1)])]
+
+
+def test_skip_to_reads_forward_on_unseekable_streams():
+    class Stream(io.RawIOBase):
+        def __init__(self, data):
+            self.data = io.BytesIO(data)
+
+        def readable(self):
+            return True
+
+        def readinto(self, buffer):
+            chunk = self.data.read(len(buffer))
+            buffer[:len(chunk)] = chunk
+            return len(chunk)
+
+    stream = Stream(b"0123456789")
+    skip_to(stream, 7, block_bytes=3)
+    assert stream.read(3) == b"789"
+
+
+def test_ingest_state_tracks_the_latest_fingerprint_per_patient(state, tmp_path):
+    state.hold([("P1", "a"), ("P2", "b")])
+    assert state.latest(["P1", "P2", "P3"]) == {"P1": "a", "P2": "b"}
+
+    # P1 changed again before its first batch was committed
+    state.hold([("P1", "a2")])
+    position = FilePosition(inode=1, size=10, mtime_ns=5, offset=10, rows=1, header=HEADER,
+                            anchor=b"xyz")
+    state.commit(IngestBatch(tmp_path / "a.csv", None, [("P1", "a"), ("P2", "b")], position))
+
+    assert state.pending == {"P1": "a2"}
+    assert state.latest(["P1", "P2"]) == {"P1": "a2", "P2": "b"}
+
+    reopened = IngestState(state.path)
+    try:
+        assert reopened.latest(["P1", "P2"]) == {"P1": "a", "P2": "b"}
+        assert reopened.position(tmp_path / "a.csv") == position
+        assert reopened.position(tmp_path / "missing.csv") == FilePosition()
+    finally:
+        reopened.close()
+
+
+def test_extract_files_skips_hidden_and_other_files(folder):
+    for name in ("b.csv", "a.csv.gz", ".partial.csv", "notes.txt", "c.csv.zst"):
+        (folder / name).write_bytes(b"")
+    os.utime(folder / "b.csv", ns=(1, 1))
+
+    assert [path.name for path in extract_files(folder)] == ["b.csv", "a.csv.gz", "c.csv.zst"]
+
+
+def test_only_unseen_rows_are_ingested(folder, state, extract_row):
+    path = folder / "admissions.csv"
+    path.write_text(HEADER + "\n" + csv_lines([extract_row(i) for i in range(6)]))
+    assert ingest_once(folder, state) == [f"P{i:04d}" for i in range(6)]
+    assert ingest_once(folder, state) == []
+
+    with open(path, "a") as file:
+        file.write(csv_lines([extract_row(6)]))
+    assert ingest_once(folder, state) == ["P0006"]
+
+    # Re-exported under a new name: only the changed patient is new
+    changed = [extract_row(i) for i in range(7)]
+    changed[3][3] = "9"
+    (folder / "admissions_reexport.csv").write_text(HEADER + "\n" + csv_lines(changed))
+    assert ingest_once(folder, state) == ["P0003"]
+
+
+def test_a_row_that_changes_back_is_ingested_again(folder, state, extract_row):
+    original = extract_row(0)
+    changed = list(original)
+    changed[4] = "0.10"
+
+    for name, row in [("day1.csv", original), ("day2.csv", changed), ("day3.csv", original)]:
+        (folder / name).write_text(HEADER + "\n" + csv_lines([row]))
+        assert ingest_once(folder, state) == ["P0000"]
+
+
+def test_invalid_rows_are_reported_with_file_row_numbers(folder, state, extract_row):
+    rows = [extract_row(i) for i in range(3)]
+    rows[1][4] = "n/a"
+    (folder / "admissions.csv").write_text(HEADER + "\n" + csv_lines(rows))
+    rejected = []
+
+    batches = list(ingest_batches(folder, state, chunk_size=10, once=True,
+                                  on_reject=lambda path, number, row, reason:
+                                  rejected.append((path.name, number))))
+
+    assert rejected == [("admissions.csv", 3)]
+    assert batches[-1].position.rows == 3
+
+
+def test_watch_folder_screens_new_rows_once(mock_api, isolated_state, folder, state, extract_row):
+    (folder / "admissions.csv").write_text(HEADER + "\n" + csv_lines([extract_row(i) for i in range(8)]))
+    results = []
+
+    screened = watch_folder(folder, state, on_result=lambda patient, result:
+                            results.append(patient.patient_id), chunk_size=4, once=True,
+                            cascade=False)
+
+    assert screened == 8
+    assert sorted(results) == [f"P{i:04d}" for i in range(8)]
+    assert watch_folder(folder, state, chunk_size=4, once=True, cascade=False) == 0
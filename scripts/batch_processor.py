@@ -1,11 +1,16 @@
-import anthropic
-import os
 import csv
+import sys
+from pathlib import Path
 
-def analyze_patient(patient_data, client):
-    """Analyze a single patient"""
+# Shared Claude client lives in the backend package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from app.ai.claude_client import complete_prompts, parse_analysis
+from app.screening.pipeline import RiskTally
+
+def build_prompt(patient_data):
+    """Build the extraction prompt for a single patient"""
     
-    prompt = f"""
+    return f"""
 You are a clinical documentation assistant.
 
 Extract risk level from patient data:
@@ -14,42 +19,38 @@ Extract risk level from patient data:
 
 Return ONLY:
 Risk Level: [Low/Medium/High]
-Key Factor: [Primary concern]
+Primary Factor: [Primary concern]
 """
-    
-    message = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=200,
-        messages=[{"role": "user", "content": prompt}]
-    )
-    
-    return message.content[0].text
 
 def process_batch(patient_list):
     """Process multiple patients"""
     
-    client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
-    
     results = []
+    tally = RiskTally()
     
     print("Starting batch analysis...")
     print(f"Total patients: {len(patient_list)}\n")
     
-    for i, patient in enumerate(patient_list, 1):
-        print(f"Analyzing patient {i}/{len(patient_list)}...")
-        
-        # Analyze this patient
-        result = analyze_patient(patient, client)
+    def show_progress(done, total, index):
+        print(f"✓ Analyzed patient {done}/{total}")
+    
+    # All patients go out concurrently through the shared client
+    prompts = [build_prompt(patient) for patient in patient_list]
+    analyses = complete_prompts(prompts, max_tokens=200, progress=show_progress)
+    
+    for patient, result in zip(patient_list, analyses):
+        # Read the labelled line; anything but Low/Medium/High needs review
+        risk_level = parse_analysis(result)['risk_level']
+        tally.add(risk_level, "Claude")
         
         # Store result
         results.append({
             'patient_data': patient,
+            'risk_level': risk_level,
             'analysis': result
         })
-        
-        print(f"✓ Complete\n")
     
-    return results
+    return results, tally
 
 # Test with 5 patients
 test_patients = [
@@ -61,7 +62,7 @@ test_patients = [
 ]
 
 # Process all patients
-results = process_batch(test_patients)
+results, tally = process_batch(test_patients)
 
 # Display results
 print("\n" + "="*50)
@@ -71,4 +72,7 @@ print("="*50 + "\n")
 for i, result in enumerate(results, 1):
     print(f"Patient {i}:")
     print(result['analysis'])
-    print("-" * 50)
\ No newline at end of file
+    print("-" * 50)
+
+print(f"High: {tally.count('High')}, Medium: {tally.count('Medium')}, "
+      f"Low: {tally.count('Low')}, Needs review: {tally.needs_review}")
@@ -0,0 +1,149 @@
+"""
+Benchmark the columnar patient loader against csv.DictReader.
+
+Writes a synthetic patients.csv (1M rows by default), then times both
+ways of getting from the file to triage codes and rendered report
+values:
+
+    dictreader: list(csv.DictReader) -> per-row column lists -> triage,
+                then float()/int() per row while rendering
+    columnar:   load_columns() -> triage on the arrays, rendering from
+                the typed arrays with no per-row parsing
+    parallel:   the columnar path with --workers parse processes
+                (only run when --workers is given)
+
+No API calls are made. Results go to reports/benchmark_loader_<ts>.json.
+
+Usage:
+    python scripts/benchmark_loader.py
+    python scripts/benchmark_loader.py --rows 200000 --memory
+    python scripts/benchmark_loader.py --rows 5000000 --workers 8
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from benchmark_pipeline import synthetic_rows
+
+# Shared screening modules live in the backend package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from app.screening.columns import REQUIRED_COLUMNS, load_columns
+from app.screening.triage import priority_scores, triage_codes
+
+def write_cohort(path, rows, seed):
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=REQUIRED_COLUMNS)
+        writer.writeheader()
+        writer.writerows(synthetic_rows(rows, seed))
+
+def run_dictreader(path):
+    timings = {}
+    started = time.perf_counter()
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        patients = list(csv.DictReader(file))
+    timings['parse'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    arrays = tuple(np.array([float(p[name]) for p in patients])
+                   for name in ('medication_adherence', 'appointments_missed', 'crisis_calls_30days'))
+    codes = triage_codes(*arrays)
+    priority_scores(*arrays)
+    timings['triage'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for patient in patients:
+        (f"{float(patient['medication_adherence'])*100:.0f}%",
+         int(float(patient['appointments_missed'])), int(float(patient['crisis_calls_30days'])))
+    timings['render'] = time.perf_counter() - started
+    return timings, codes
+
+def run_columnar(path, workers=0):
+    timings = {}
+    started = time.perf_counter()
+    columns = load_columns(path, workers=workers)
+    timings['parse'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    arrays = columns.triage_arrays()
+    codes = triage_codes(*arrays)
+    priority_scores(*arrays)
+    timings['triage'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for adherence, missed, crisis in zip(columns.adherence.tolist(), columns.missed.tolist(),
+                                         columns.crisis.tolist()):
+        (f"{adherence*100:.0f}%", missed, crisis)
+    timings['render'] = time.perf_counter() - started
+    return timings, codes
+
+def measure(run, path, memory):
+    if memory:
+        tracemalloc.start()
+    timings, codes = run(path)
+    timings['total'] = sum(timings.values())
+    result = {'seconds': {stage: round(value, 3) for stage, value in timings.items()}}
+    if memory:
+        result['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+        tracemalloc.stop()
+    return result, codes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the columnar loader against csv.DictReader")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Also time the columnar loader with this many parse processes")
+    parser.add_argument("--memory", action="store_true",
+                        help="Also record peak Python memory (tracemalloc; slows both runs)")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("PATIENT LOADER BENCHMARK")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = Path(workdir) / "patients.csv"
+        started = time.perf_counter()
+        write_cohort(path, args.rows, args.seed)
+        size_mb = path.stat().st_size / 2**20
+        print(f"✓ Wrote {args.rows:,} synthetic rows ({size_mb:.0f} MB) in "
+              f"{time.perf_counter() - started:.1f}s\n")
+
+        results = {}
+        codes = {}
+        runs = [("dictreader", run_dictreader), ("columnar", run_columnar)]
+        if args.workers:
+            runs.append(("parallel", lambda path: run_columnar(path, args.workers)))
+        for name, run in runs:
+            results[name], codes[name] = measure(run, path, args.memory)
+            seconds = results[name]['seconds']
+            memory = f", peak {results[name]['peak_mb']} MB" if args.memory else ""
+            print(f"⏱️  {name:<10}  parse {seconds['parse']:.2f}s  triage {seconds['triage']:.2f}s  "
+                  f"render {seconds['render']:.2f}s  total {seconds['total']:.2f}s{memory}")
+
+    same = all(bool((codes['dictreader'] == other).all()) for other in codes.values())
+    speedup = results['dictreader']['seconds']['total'] / results['columnar']['seconds']['total']
+    print(f"\n🚀 Columnar is {speedup:.1f}x faster end to end")
+    if args.workers:
+        parse_speedup = results['columnar']['seconds']['parse'] / results['parallel']['seconds']['parse']
+        print(f"🧵 {args.workers} parse workers: parse {parse_speedup:.1f}x vs one process "
+              f"({os.cpu_count()} CPUs here)")
+    print(f"{'✅' if same else '❌'} Triage codes {'match' if same else 'differ'}")
+
+    output_file = f"reports/benchmark_loader_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output_file, 'w', encoding='utf-8') as file:
+        json.dump({'args': vars(args), 'file_mb': round(size_mb, 1), 'results': results,
+                   'speedup': round(speedup, 2), 'codes_match': same,
+                   'cpus': os.cpu_count()}, file, indent=2)
+    print(f"\n📄 Results saved: {output_file}")
+
+    sys.exit(0 if same else 1)
@@ -0,0 +1,141 @@
+"""
+Offline throughput and retry benchmark for the shared Claude client.
+
+Starts scripts/mock_anthropic_server.py in-process with the given
+latency distribution and fault rates, screens a cohort through
+ClaudeClient.analyze_many() against it, and reports throughput,
+retries, 429/529 handling and token usage. No API key, no cost, so it
+can run in CI.
+
+Usage:
+    python scripts/benchmark_pipeline.py --patients 500 --latency lognormal:0.6,0.5 --rate-429 0.05
+    python scripts/benchmark_pipeline.py --input patients.csv --rate-529 0.1 --rpm 600
+
+The analysis cache is bypassed. Exits non-zero if any patient ended up
+with a failed analysis, so CI notices when retries stop recovering.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import random
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from mock_anthropic_server import MockConfig, start_server
+
+# Shared Claude client lives in the backend package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from app.ai.claude_client import (
+    CLAUDE_RPM,
+    CLAUDE_TPM,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_PACK_SIZE,
+    ClaudeClient,
+    analysis_failed,
+)
+from app.screening.columns import open_extract
+from app.screening.records import PatientRecord
+
+DIAGNOSES = [
+    "Major Depressive Disorder", "Generalized Anxiety Disorder", "Bipolar I Disorder",
+    "Schizophrenia", "PTSD", "Opioid Use Disorder"
+]
+
+def synthetic_rows(count, seed=0):
+    """Deterministic patients.csv-shaped rows for load tests, one at a time."""
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            'patient_id': f"S{i:06d}",
+            'name': f"Synthetic Patient {i}",
+            'last_appointment': f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            'appointments_missed': str(rng.choice([0, 0, 1, 2, 3, 5])),
+            'medication_adherence': f"{rng.uniform(0.2, 1.0):.2f}",
+            'crisis_calls_30days': str(rng.choice([0, 0, 0, 1, 2, 4])),
+            'diagnosis': rng.choice(DIAGNOSES),
+            'case_manager': "Benchmark"
+        }
+
+def synthetic_patients(count, seed=0):
+    """Deterministic PatientRecords for load tests."""
+    return [PatientRecord.from_row(row) for row in synthetic_rows(count, seed)]
+
+async def run_benchmark(patients, base_url, concurrency, pack_size, rpm, tpm):
+    async with ClaudeClient(base_url=base_url, api_key="mock", concurrency=concurrency,
+                            rpm=rpm, tpm=tpm) as claude:
+        started = time.perf_counter()
+        analyses = await claude.analyze_many(patients, pack_size=pack_size)
+        elapsed = time.perf_counter() - started
+        return {
+            'patients': len(patients),
+            'seconds': elapsed,
+            'patients_per_second': len(patients) / elapsed if elapsed else 0.0,
+            'failed': sum(analysis_failed(a) for a in analyses),
+            'requests': claude.usage['requests'],
+            'retries': claude.retries,
+            'hedges': claude.hedges,
+            'hedge_wins': claude.hedge_wins,
+            'requeued': claude.requeued,
+            'limiter': claude.limiter.stats(),
+            'usage': dict(claude.usage)
+        }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the screening client against a local mock API")
+    parser.add_argument("--input", help="patients.csv to screen (default: synthetic cohort)")
+    parser.add_argument("--patients", type=int, default=200, help="Synthetic cohort size")
+    parser.add_argument("--latency", default="lognormal:0.5,0.4",
+                        help="Mock latency spec (see mock_anthropic_server.parse_latency)")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-529", type=float, default=0.0)
+    parser.add_argument("--mock-rpm", type=int, default=0, help="Mock answers 429 above this RPM")
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--pack-size", type=int, default=DEFAULT_PACK_SIZE)
+    parser.add_argument("--rpm", type=int, default=CLAUDE_RPM, help="Client-side RPM limit")
+    parser.add_argument("--tpm", type=int, default=CLAUDE_TPM, help="Client-side TPM limit")
+    args = parser.parse_args()
+
+    if args.input:
+        with open_extract(args.input) as file:
+            patients = [PatientRecord.from_row(row) for row in csv.DictReader(file)]
+    else:
+        patients = synthetic_patients(args.patients, args.seed)
+
+    config = MockConfig(latency=args.latency, rate_429=args.rate_429, rate_529=args.rate_529,
+                        rpm=args.mock_rpm, retry_after=args.retry_after, seed=args.seed)
+    server = start_server(config=config)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    print("=" * 70)
+    print("SCREENING PIPELINE BENCHMARK (mock API)")
+    print("=" * 70)
+    print(f"✓ {len(patients)} patients, latency {args.latency}, "
+          f"429 rate {args.rate_429:.0%}, 529 rate {args.rate_529:.0%}\n")
+
+    try:
+        result = asyncio.run(run_benchmark(patients, base_url, args.concurrency, args.pack_size,
+                                           args.rpm, args.tpm))
+    finally:
+        server.shutdown()
+    mock = server.state.snapshot()
+
+    print(f"⏱️  {result['seconds']:.1f}s, {result['patients_per_second']:.2f} patients/s")
+    print(f"📨 {result['requests']} successful requests, {result['retries']} retries "
+          f"({mock['rate_limited_429']} × 429, {mock['overloaded_529']} × 529 served)")
+    print(f"🪃 {result['hedges']} hedged calls, {result['hedge_wins']} won by the duplicate")
+    print(f"🎚️  Final concurrency limit: {result['limiter']['concurrency_limit']}")
+    print(f"🔢 Tokens: {result['usage']['input_tokens']} in, {result['usage']['output_tokens']} out, "
+          f"{result['usage']['cache_read_input_tokens']} cache reads")
+    print(f"{'✅' if not result['failed'] else '❌'} {result['failed']} failed analyses")
+
+    output_file = f"reports/benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output_file, 'w', encoding='utf-8') as file:
+        json.dump({'args': vars(args), 'client': result, 'mock': mock}, file, indent=2)
+    print(f"\n📄 Results saved: {output_file}")
+
+    sys.exit(1 if result['failed'] else 0)
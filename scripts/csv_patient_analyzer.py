@@ -1,176 +1,230 @@
-import anthropic
-import os
-import csv
+import argparse
+import sys
 from datetime import datetime
+from pathlib import Path
 
-def analyze_patient_from_csv(patient_row, client):
-    """Analyze a patient from CSV data"""
-    
-    # Build patient summary from CSV row
-    patient_summary = f"""
-Patient ID: {patient_row['patient_id']}
-Name: {patient_row['name']}
-Last Appointment: {patient_row['last_appointment']}
-Appointments Missed (last 6 months): {patient_row['appointments_missed']}
-Medication Adherence: {float(patient_row['medication_adherence'])*100:.0f}%
-Crisis Calls (30 days): {patient_row['crisis_calls_30days']}
-Diagnosis: {patient_row['diagnosis']}
-Case Manager: {patient_row['case_manager']}
-"""
-    
-    # Use Claude to analyze
-    prompt = f"""
-You are a clinical risk assessment assistant.
+# Shared screening and Claude modules live in the backend package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from app.ai.cascade import CASCADE_ENABLED
+from app.ai.claude_client import DEFAULT_PACK_SIZE, DEFAULT_RUN_DEADLINE_S, parse_analysis
+from app.ai.run_metrics import RunMetrics
+from app.screening.columns import DEFAULT_PARSE_WORKERS, read_column_chunks
+from app.screening.journal import RunJournal
+from app.screening.live_feed import LiveFeed
+from app.screening.pipeline import (
+    DEFAULT_CHUNK_SIZE,
+    LineSpool,
+    RiskTally,
+    screen_stream,
+)
+from app.screening.screener import describe_provenance
 
-Analyze this patient and provide:
-1. Risk Level (Low/Medium/High)
-2. Primary Risk Factor
-3. Recommended Action
-
-PATIENT DATA:
-{patient_summary}
-
-Return in this exact format:
-Risk Level: [level]
-Primary Factor: [factor]
-Action: [action]
-"""
-    
-    message = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=300,
-        messages=[{"role": "user", "content": prompt}]
-    )
-    
-    return message.content[0].text
-
-def process_csv_patients(input_csv, output_report):
-    """Read CSV, analyze all patients, generate report"""
-    
-    client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
-    
-    # Read CSV file
-    print(f"Reading patient data from: {input_csv}")
-    patients = []
-    
-    with open(input_csv, 'r', encoding='utf-8') as file:
-        csv_reader = csv.DictReader(file)
-        for row in csv_reader:
-            patients.append(row)
-    
-    print(f"✓ Loaded {len(patients)} patients\n")
-    
-    # Start building report
-    report_lines = []
-    report_lines.append("=" * 70)
-    report_lines.append("OAKWOOD BEHAVIORAL HEALTH - DAILY RISK SCREENING REPORT")
-    report_lines.append(f"Generated: {datetime.now().strftime('%A, %B %d, %Y at %I:%M %p')}")
-    report_lines.append("=" * 70)
-    report_lines.append("")
-    
-    # Track statistics
-    high_risk_patients = []
-    medium_risk_patients = []
-    low_risk_patients = []
+def process_csv_patients(input_csv, output_report, batch=False, delta=False, run_id=None,
+                         pack_size=DEFAULT_PACK_SIZE, cascade=CASCADE_ENABLED,
+                         deadline=DEFAULT_RUN_DEADLINE_S, chunk_size=DEFAULT_CHUNK_SIZE,
+                         parse_workers=DEFAULT_PARSE_WORKERS):
+    """Read CSV, analyze all patients, generate report
+    
+    batch=True sends the cohort through the Message Batches API instead
+    of interactive calls (cheaper, for nightly runs). delta=True only
+    analyzes patients whose inputs changed since the last run. With a
+    run_id, finished analyses are journaled under it and a re-run with
+    the same id picks up where the last one stopped, and results are
+    streamed most-urgent-first to reports/live_screening_<run_id>.txt
+    as they are decided. A run summary (tokens, cost, latency, retries)
+    is written next to the report. pack_size sends
+    that many patients per Claude request. cascade=True screens on the
+    fast model first and escalates only uncertain or high-risk patients.
+    deadline bounds the Claude stage; whoever it didn't reach in time gets
+    a rule-score fallback.
+    
+    The CSV is streamed chunk_size rows at a time and each patient is
+    written to the report as soon as its chunk is screened, so memory
+    stays flat however large the extract is. Rows that can't be screened
+    (missing or non-numeric fields) are skipped with a warning. With
+    parse_workers, the CSV is parsed in that many processes ahead of
+    screening.
+    """
+    
+    print(f"Reading patient data from: {input_csv} ({chunk_size} rows per chunk)")
+    
+    # Track statistics as results go by; rosters are spooled to disk
+    tally = RiskTally()
+    high_roster = LineSpool()
+    medium_roster = LineSpool()
+    review_roster = LineSpool()
+    
+    def reject(line_number, row, reason):
+        tally.rejected += 1
+        print(f"⚠️  Skipping row {line_number} (ID: {row.get('patient_id') or '?'}): {reason}")
     
     # Analyze each patient
     print("Analyzing patients...\n")
     
-    for i, patient in enumerate(patients, 1):
-        print(f"[{i}/{len(patients)}] Analyzing {patient['name']} (ID: {patient['patient_id']})...")
+    def show_progress(done, patient):
+        print(f"[{done}] Analyzed {patient.name} (ID: {patient.patient_id})")
+    
+    journal = None
+    live_feed = None
+    if run_id:
+        journal = RunJournal(run_id)
+        live_feed = LiveFeed(f"reports/live_screening_{run_id}.txt")
+        print(f"💾 Checkpointing to {journal.path}")
+        print(f"   If interrupted, re-run with: --resume {run_id}")
+        print(f"📡 Live results (most urgent first): tail -f {live_feed.path}\n")
+    
+    def emit(patient, result):
+        if live_feed:
+            live_feed.emit(patient, result)
+    
+    # Rule triage first; only ambiguous patients go to Claude
+    metrics = RunMetrics(run_id)
+    report = open(output_report, 'w', encoding='utf-8')
+    try:
+        report.write("=" * 70 + "\n")
+        report.write("OAKWOOD BEHAVIORAL HEALTH - DAILY RISK SCREENING REPORT\n")
+        report.write(f"Generated: {datetime.now().strftime('%A, %B %d, %Y at %I:%M %p')}\n")
+        report.write("=" * 70 + "\n")
+        report.write("\n")
         
-        # Get analysis
-        analysis = analyze_patient_from_csv(patient, client)
+        chunks = read_column_chunks(input_csv, chunk_size, on_reject=reject, workers=parse_workers)
+        for patient, result in screen_stream(chunks, progress=show_progress,
+                                             on_result=emit, batch=batch, delta=delta,
+                                             journal=journal, pack_size=pack_size,
+                                             cascade=cascade, metrics=metrics, deadline=deadline):
+            analysis = result['analysis']
+            source = describe_provenance(result)
+            
+            # Categorize by the validated risk level, never a substring match
+            parsed_level = parse_analysis(analysis)['risk_level']
+            tally.add(parsed_level, result['decided_by'])
+            roster_line = f"  • {patient.name} (ID: {patient.patient_id}) - Case Manager: {patient.case_manager}"
+            if parsed_level == "High":
+                risk_level = "HIGH RISK"
+                high_roster.append(roster_line)
+            elif parsed_level == "Medium":
+                risk_level = "MEDIUM RISK"
+                medium_roster.append(roster_line)
+            elif parsed_level == "Low":
+                risk_level = "LOW RISK"
+            else:
+                risk_level = "NEEDS MANUAL REVIEW"
+                review_roster.append(roster_line)
+            
+            # Add to report
+            report.write(
+                f"{risk_level} - {patient.name} (ID: {patient.patient_id})\n"
+                f"Case Manager: {patient.case_manager}\n"
+                f"Diagnosis: {patient.diagnosis}\n"
+                f"Last Appointment: {patient.last_appointment}\n"
+                f"Missed Appointments: {patient.appointments_missed}\n"
+                f"Med Adherence: {patient.medication_adherence*100:.0f}%\n"
+                f"Crisis Calls: {patient.crisis_calls_30days}\n"
+                "\n"
+                f"{analysis}\n"
+                f"Decided By: {source}\n"
+                + "-" * 70 + "\n"
+                "\n"
+            )
         
-        # Categorize by risk
-        if "High" in analysis:
-            risk_level = "HIGH RISK"
-            high_risk_patients.append({
-                'patient': patient,
-                'analysis': analysis
-            })
-        elif "Medium" in analysis:
-            risk_level = "MEDIUM RISK"
-            medium_risk_patients.append({
-                'patient': patient,
-                'analysis': analysis
-            })
-        else:
-            risk_level = "LOW RISK"
-            low_risk_patients.append({
-                'patient': patient,
-                'analysis': analysis
-            })
-        
-        # Add to report
-        report_lines.append(f"{risk_level} - {patient['name']} (ID: {patient['patient_id']})")
-        report_lines.append(f"Case Manager: {patient['case_manager']}")
-        report_lines.append(f"Diagnosis: {patient['diagnosis']}")
-        report_lines.append(f"Last Appointment: {patient['last_appointment']}")
-        report_lines.append(f"Missed Appointments: {patient['appointments_missed']}")
-        report_lines.append(f"Med Adherence: {float(patient['medication_adherence'])*100:.0f}%")
-        report_lines.append(f"Crisis Calls: {patient['crisis_calls_30days']}")
-        report_lines.append("")
-        report_lines.append(f"{analysis}")
-        report_lines.append("-" * 70)
+        # Add summary section
+        report_lines = []
         report_lines.append("")
-    
-    # Add summary section
-    report_lines.append("")
-    report_lines.append("=" * 70)
-    report_lines.append("EXECUTIVE SUMMARY")
-    report_lines.append("=" * 70)
-    report_lines.append("")
-    report_lines.append(f"Total Patients Screened: {len(patients)}")
-    report_lines.append(f"HIGH RISK: {len(high_risk_patients)} ({len(high_risk_patients)/len(patients)*100:.1f}%)")
-    report_lines.append(f"MEDIUM RISK: {len(medium_risk_patients)} ({len(medium_risk_patients)/len(patients)*100:.1f}%)")
-    report_lines.append(f"LOW RISK: {len(low_risk_patients)} ({len(low_risk_patients)/len(patients)*100:.1f}%)")
-    report_lines.append("")
-    
-    # High risk patient list
-    if high_risk_patients:
-        report_lines.append("IMMEDIATE ATTENTION REQUIRED:")
-        for item in high_risk_patients:
-            p = item['patient']
-            report_lines.append(f"  • {p['name']} (ID: {p['patient_id']}) - Case Manager: {p['case_manager']}")
+        report_lines.append("=" * 70)
+        report_lines.append("EXECUTIVE SUMMARY")
+        report_lines.append("=" * 70)
         report_lines.append("")
-    
-    # Medium risk patient list
-    if medium_risk_patients:
-        report_lines.append("FOLLOW-UP WITHIN 48-72 HOURS:")
-        for item in medium_risk_patients:
-            p = item['patient']
-            report_lines.append(f"  • {p['name']} (ID: {p['patient_id']}) - Case Manager: {p['case_manager']}")
+        report_lines.append(f"Total Patients Screened: {tally.total}")
+        report_lines.append(f"HIGH RISK: {tally.count('High')} ({tally.share('High'):.1f}%)")
+        report_lines.append(f"MEDIUM RISK: {tally.count('Medium')} ({tally.share('Medium'):.1f}%)")
+        report_lines.append(f"LOW RISK: {tally.count('Low')} ({tally.share('Low'):.1f}%)")
+        if tally.needs_review:
+            report_lines.append(f"NEEDS MANUAL REVIEW: {tally.needs_review} (analysis failed)")
+        if tally.rejected:
+            report_lines.append(f"SKIPPED (invalid rows): {tally.rejected}")
         report_lines.append("")
-    
-    report_lines.append("=" * 70)
-    report_lines.append("Report completed successfully")
-    report_lines.append("=" * 70)
-    
-    # Write report to file
-    with open(output_report, 'w', encoding='utf-8') as file:
-        file.write('\n'.join(report_lines))
+        report.write("\n".join(report_lines) + "\n")
+        
+        # Failed analyses are never filed under a risk level
+        for heading, roster in [("MANUAL CLINICAL REVIEW REQUIRED:", review_roster),
+                                ("IMMEDIATE ATTENTION REQUIRED:", high_roster),
+                                ("FOLLOW-UP WITHIN 48-72 HOURS:", medium_roster)]:
+            if roster:
+                report.write(heading + "\n")
+                for line in roster:
+                    report.write(line + "\n")
+                report.write("\n")
+        
+        report.write("=" * 70 + "\n")
+        report.write("Report completed successfully\n")
+        report.write("=" * 70)
+    finally:
+        report.close()
+        for roster in (high_roster, medium_roster, review_roster):
+            roster.close()
+        if journal:
+            journal.close()
+        if live_feed:
+            live_feed.close()
+    
+    metrics.finish()
+    summary_file = str(Path(output_report).with_suffix(".run_summary.json"))
+    run_summary = metrics.write(summary_file)
+    print(f"\n📈 Run summary saved: {summary_file} "
+          f"({run_summary['calls']} calls, est. ${run_summary['cost_usd']:.4f})")
     
     print(f"\n✓ ANALYSIS COMPLETE!")
     print(f"✓ Report saved: {output_report}")
     print(f"\n📊 SUMMARY:")
-    print(f"   Total: {len(patients)}")
-    print(f"   High Risk: {len(high_risk_patients)}")
-    print(f"   Medium Risk: {len(medium_risk_patients)}")
-    print(f"   Low Risk: {len(low_risk_patients)}")
+    print(f"   Total: {tally.total}")
+    print(f"   High Risk: {tally.count('High')}")
+    print(f"   Medium Risk: {tally.count('Medium')}")
+    print(f"   Low Risk: {tally.count('Low')}")
+    if tally.needs_review:
+        print(f"   Needs Manual Review: {tally.needs_review}")
+    if tally.rejected:
+        print(f"   Skipped (invalid rows): {tally.rejected}")
     
     return output_report
 
 # Run the analysis
 if __name__ == "__main__":
-    input_file = "patients.csv"
-    output_file = f"reports/daily_screening_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+    parser = argparse.ArgumentParser(description="Daily patient risk screening")
+    parser.add_argument("--input", default="patients.csv", metavar="CSV",
+                        help="Patient extract: .csv, or .csv.gz / .csv.zst read without "
+                             "unpacking to disk (default: patients.csv)")
+    parser.add_argument("--batch", action="store_true",
+                        help="Use the Message Batches API (nightly runs)")
+    parser.add_argument("--delta", action="store_true",
+                        help="Only analyze patients whose data changed since the last run")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Resume an interrupted run, skipping patients already analyzed")
+    parser.add_argument("--pack-size", type=int, default=DEFAULT_PACK_SIZE, metavar="K",
+                        help="Patients per Claude request (default: CLAUDE_PACK_SIZE or 1)")
+    parser.add_argument("--cascade", action="store_true", default=CASCADE_ENABLED,
+                        help="Screen on the fast model first, escalate uncertain or high-risk patients")
+    parser.add_argument("--deadline", type=float, default=DEFAULT_RUN_DEADLINE_S, metavar="SECONDS",
+                        help="Stop waiting for Claude after this long; the rest fall back to "
+                             "the rule score (default: CLAUDE_RUN_DEADLINE or no limit)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, metavar="ROWS",
+                        help="Rows read and screened at a time (default: SCREENING_CHUNK_SIZE or 1000)")
+    parser.add_argument("--parse-workers", type=int, default=DEFAULT_PARSE_WORKERS, metavar="N",
+                        help="Parse the CSV in N worker processes, for very large extracts "
+                             "(default: SCREENING_PARSE_WORKERS or 0 = in-process)")
+    args = parser.parse_args()
+    
+    input_file = args.input
+    run_id = args.resume or datetime.now().strftime('%Y%m%d_%H%M%S')
+    output_file = f"reports/daily_screening_{run_id}.txt"
     
     print("=" * 70)
     print("OAKWOOD BEHAVIORAL HEALTH - AUTOMATED PATIENT SCREENING")
     print("=" * 70)
     print("")
     
-    process_csv_patients(input_file, output_file)
+    process_csv_patients(input_file, output_file, batch=args.batch, delta=args.delta,
+                         run_id=run_id, pack_size=args.pack_size, cascade=args.cascade,
+                         deadline=args.deadline, chunk_size=args.chunk_size,
+                         parse_workers=args.parse_workers)
     
     print(f"\n📄 Open report: {output_file}")
\ No newline at end of file
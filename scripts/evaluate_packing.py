@@ -0,0 +1,123 @@
+"""
+Compare packed screening (K patients per request) against single-patient mode.
+
+Runs the same labelled sample once per request, then once for each
+pack size K. Reports agreement with the single-patient answers (and with
+the labels, if the CSV has them), requests, tokens per patient and
+throughput. Use this to pick CLAUDE_PACK_SIZE from data instead of guessing.
+
+Usage:
+    python scripts/evaluate_packing.py --input labelled_patients.csv --k 2,4,8
+
+The input is patients.csv plus an optional expected_risk_level column
+(Low/Medium/High) holding a clinician's label. The analysis cache is
+bypassed so every mode really calls the model.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Shared Claude client lives in the backend package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from app.ai.claude_client import DEFAULT_CONCURRENCY, ClaudeClient, analysis_failed, parse_analysis
+from app.screening.columns import open_extract
+from app.screening.records import PatientRecord
+
+async def run_mode(patients, pack_size, concurrency):
+    """Screen the sample once at the given pack size; returns levels and metrics."""
+    async with ClaudeClient(concurrency=concurrency) as claude:
+        started = time.perf_counter()
+        analyses = await claude.analyze_many(patients, pack_size=pack_size)
+        elapsed = time.perf_counter() - started
+        usage = dict(claude.usage)
+        requeued = claude.requeued
+
+    count = len(patients)
+    return {
+        'pack_size': pack_size,
+        'levels': [parse_analysis(a)['risk_level'] for a in analyses],
+        'failed': sum(analysis_failed(a) for a in analyses),
+        'requests': usage['requests'],
+        'requeued': requeued,
+        # Cached system-prefix reads count too; they're cheaper, not free
+        'input_tokens_per_patient': (usage['input_tokens'] + usage['cache_creation_input_tokens']
+                                     + usage['cache_read_input_tokens']) / count,
+        'cache_read_tokens_per_patient': usage['cache_read_input_tokens'] / count,
+        'output_tokens_per_patient': usage['output_tokens'] / count,
+        'seconds': elapsed,
+        'patients_per_second': count / elapsed if elapsed else 0.0
+    }
+
+def agreement(levels, reference):
+    """Share of patients whose risk level matches the reference (None if no reference)."""
+    pairs = [(a, b) for a, b in zip(levels, reference) if b]
+    if not pairs:
+        return None
+    return sum(a == b for a, b in pairs) / len(pairs)
+
+async def evaluate(rows, pack_sizes, label_column, concurrency):
+    labels = [row.get(label_column, "").strip() for row in rows]
+    patients = [PatientRecord.from_row(row) for row in rows]
+
+    modes = []
+    for pack_size in [1] + pack_sizes:
+        print(f"🧪 Screening {len(patients)} patients with K={pack_size}...")
+        modes.append(await run_mode(patients, pack_size, concurrency))
+
+    single = modes[0]['levels']
+    for mode in modes:
+        mode['agreement_with_single'] = agreement(mode['levels'], single)
+        mode['label_accuracy'] = agreement(mode['levels'], labels)
+    return modes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate multi-patient prompt packing")
+    parser.add_argument("--input", default="patients.csv",
+                        help="Labelled sample CSV (patients.csv columns + label column)")
+    parser.add_argument("--k", default="2,4,8",
+                        help="Comma-separated pack sizes to compare against K=1")
+    parser.add_argument("--label-column", default="expected_risk_level")
+    parser.add_argument("--sample", type=int, help="Only use the first N patients")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    args = parser.parse_args()
+
+    with open_extract(args.input) as file:
+        rows = list(csv.DictReader(file))
+    if args.sample:
+        rows = rows[:args.sample]
+    pack_sizes = [int(k) for k in args.k.split(",") if int(k) > 1]
+
+    print("=" * 70)
+    print("PROMPT PACKING EVALUATION")
+    print("=" * 70)
+    print(f"✓ Loaded {len(rows)} patients from {args.input}\n")
+
+    modes = asyncio.run(evaluate(rows, pack_sizes, args.label_column, args.concurrency))
+
+    def pct(value):
+        return "   n/a" if value is None else f"{value*100:5.1f}%"
+
+    print()
+    print(f"{'K':>3} {'vs K=1':>7} {'vs label':>8} {'failed':>6} {'requests':>8} "
+          f"{'requeued':>8} {'in tok/pt':>9} {'out tok/pt':>10} {'pts/s':>7}")
+    print("-" * 77)
+    for mode in modes:
+        print(f"{mode['pack_size']:>3} {pct(mode['agreement_with_single']):>7} "
+              f"{pct(mode['label_accuracy']):>8} {mode['failed']:>6} {mode['requests']:>8} "
+              f"{mode['requeued']:>8} {mode['input_tokens_per_patient']:>9.1f} "
+              f"{mode['output_tokens_per_patient']:>10.1f} {mode['patients_per_second']:>7.2f}")
+
+    output_file = f"reports/packing_eval_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output_file, 'w', encoding='utf-8') as file:
+        json.dump({
+            'input': args.input,
+            'patients': len(rows),
+            'modes': [{k: v for k, v in mode.items() if k != 'levels'} for mode in modes]
+        }, file, indent=2)
+
+    print(f"\n📄 Results saved: {output_file}")
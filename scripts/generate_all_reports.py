@@ -1,7 +1,7 @@
-import anthropic
-import os
-import csv
+import argparse
+import sys
 from datetime import datetime
+from pathlib import Path
 
 # Word document imports
 from docx import Document
@@ -10,6 +10,7 @@ from docx.enum.text import WD_ALIGN_PARAGRAPH
 
 # Excel imports
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 
@@ -21,48 +22,51 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 
-def analyze_patient_from_csv(patient_row, client):
-    """Analyze a patient from CSV data - USED BY ALL THREE FORMATS!"""
-    
-    patient_summary = f"""
-Patient ID: {patient_row['patient_id']}
-Name: {patient_row['name']}
-Last Appointment: {patient_row['last_appointment']}
-Appointments Missed (last 6 months): {patient_row['appointments_missed']}
-Medication Adherence: {float(patient_row['medication_adherence'])*100:.0f}%
-Crisis Calls (30 days): {patient_row['crisis_calls_30days']}
-Diagnosis: {patient_row['diagnosis']}
-Case Manager: {patient_row['case_manager']}
-"""
-    
-    prompt = f"""
-You are a clinical risk assessment assistant.
+# Shared screening and Claude modules live in the backend package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from app.ai.cascade import CASCADE_ENABLED
+from app.ai.claude_client import DEFAULT_PACK_SIZE, DEFAULT_RUN_DEADLINE_S
+from app.ai.run_metrics import RunMetrics, metrics_rows
+from app.screening.columns import DEFAULT_PARSE_WORKERS, read_column_chunks
+from app.screening.journal import RunJournal
+from app.screening.live_feed import LiveFeed
+from app.screening.pipeline import (
+    DEFAULT_CHUNK_SIZE,
+    RiskTally,
+    screen_stream,
+)
+from app.screening.records import PatientAnalysis
 
-Analyze this patient and provide:
-1. Risk Level (Low/Medium/High)
-2. Primary Risk Factor
-3. Recommended Action
-
-PATIENT DATA:
-{patient_summary}
-
-Return in this exact format:
-Risk Level: [level]
-Primary Factor: [factor]
-Action: [action]
-"""
-    
-    message = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=300,
-        messages=[{"role": "user", "content": prompt}]
-    )
-    
-    return message.content[0].text
-
-def generate_all_reports(csv_file, timestamp):
+def generate_all_reports(csv_file, timestamp, batch=False, delta=False,
+                         pack_size=DEFAULT_PACK_SIZE, cascade=CASCADE_ENABLED,
+                         deadline=DEFAULT_RUN_DEADLINE_S, chunk_size=DEFAULT_CHUNK_SIZE,
+                         parse_workers=DEFAULT_PARSE_WORKERS):
     """
     MASTER FUNCTION: Generate Word, Excel, and PDF reports from ONE analysis!
+    
+    batch=True sends the cohort through the Message Batches API instead
+    of interactive calls (cheaper, for nightly runs). delta=True only
+    analyzes patients whose inputs changed since the last run. pack_size
+    sends that many patients per Claude request. cascade=True screens on
+    the fast model first and escalates only uncertain or high-risk patients.
+    deadline bounds the Claude stage; whoever it didn't reach in time gets
+    a rule-score fallback.
+    
+    The timestamp doubles as the run id: every finished analysis is
+    journaled under it, so calling again with the same timestamp resumes
+    an interrupted run instead of starting over. Results are also
+    streamed most-urgent-first to reports/live_screening_<timestamp>.txt
+    as they are decided. Tokens, cost, latency and retries go to
+    reports/patient_screening_<timestamp>.run_summary.json and a
+    "Run Metrics" appendix in the Excel and PDF reports.
+    
+    The CSV is streamed chunk_size rows at a time and every result goes
+    straight into the documents, with the summary counts kept as a
+    running tally. The Excel file is written in openpyxl's write-only
+    mode, so its rows go to disk as they arrive. The Word document is
+    built in memory (python-docx has no streaming writer), so it is
+    what grows with the extract. With parse_workers, the CSV is parsed in
+    that many processes ahead of screening.
     """
     
     print("=" * 70)
@@ -71,82 +75,21 @@ def generate_all_reports(csv_file, timestamp):
     print("=" * 70)
     print()
     
-    # Initialize Claude client
-    client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
-    
     # Read patient data
-    print(f"📂 Reading patient data from: {csv_file}")
-    patients = []
-    
-    with open(csv_file, 'r', encoding='utf-8') as file:
-        csv_reader = csv.DictReader(file)
-        for row in csv_reader:
-            patients.append(row)
-    
-    print(f"✓ Loaded {len(patients)} patients\n")
+    print(f"📂 Reading patient data from: {csv_file} ({chunk_size} rows per chunk)\n")
+    tally = RiskTally()
     
-    # ANALYZE ALL PATIENTS ONCE (shared across all formats!)
-    print("🤖 Analyzing patients with Claude AI...\n")
-    
-    patient_analyses = []
-    high_risk_patients = []
-    medium_risk_patients = []
-    low_risk_patients = []
-    
-    for i, patient in enumerate(patients, 1):
-        print(f"   [{i}/{len(patients)}] Analyzing {patient['name']}...")
-        
-        # Get AI analysis
-        analysis = analyze_patient_from_csv(patient, client)
-        
-        # Parse analysis
-        risk_level = "Unknown"
-        primary_factor = "Not analyzed"
-        action = "No action specified"
-        
-        for line in analysis.split('\n'):
-            if line.startswith('Risk Level:'):
-                risk_level = line.replace('Risk Level:', '').strip()
-            elif line.startswith('Primary Factor:'):
-                primary_factor = line.replace('Primary Factor:', '').strip()
-            elif line.startswith('Action:'):
-                action = line.replace('Action:', '').strip()
-        
-        # Store analysis
-        patient_analysis = {
-            'patient': patient,
-            'risk_level': risk_level,
-            'primary_factor': primary_factor,
-            'action': action
-        }
-        patient_analyses.append(patient_analysis)
-        
-        # Categorize by risk
-        if "High" in risk_level:
-            high_risk_patients.append(patient_analysis)
-        elif "Medium" in risk_level:
-            medium_risk_patients.append(patient_analysis)
-        else:
-            low_risk_patients.append(patient_analysis)
-    
-    print(f"\n✓ Analysis complete!")
-    print(f"   High Risk: {len(high_risk_patients)}")
-    print(f"   Medium Risk: {len(medium_risk_patients)}")
-    print(f"   Low Risk: {len(low_risk_patients)}\n")
+    def reject(line_number, row, reason):
+        tally.rejected += 1
+        print(f"   ⚠️  Skipping row {line_number} (ID: {row.get('patient_id') or '?'}): {reason}")
     
     # Define output filenames (all with same timestamp!)
     word_file = f"reports/patient_screening_{timestamp}.docx"
     excel_file = f"reports/patient_screening_{timestamp}.xlsx"
     pdf_file = f"reports/patient_screening_{timestamp}.pdf"
+    generated = datetime.now().strftime('%A, %B %d, %Y at %I:%M %p')
     
-    print("=" * 70)
-    print("GENERATING DOCUMENTS...")
-    print("=" * 70)
-    print()
-    
-    # ==================== GENERATE WORD DOCUMENT ====================
-    print("📄 Creating Word document...")
-    
+    # ==================== START WORD DOCUMENT ====================
     doc = Document()
     
     # Add title
@@ -157,160 +100,197 @@ def generate_all_reports(csv_file, timestamp):
     subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
     
     date_para = doc.add_paragraph()
-    date_para.add_run(f'Generated: {datetime.now().strftime("%A, %B %d, %Y at %I:%M %p")}')
+    date_para.add_run(f'Generated: {generated}')
     date_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
     doc.add_paragraph()
     
-    # Add patients
-    for i, patient_analysis in enumerate(patient_analyses, 1):
-        patient = patient_analysis['patient']
-        risk_level = patient_analysis['risk_level']
-        
-        if "High" in risk_level:
-            risk_text = "HIGH RISK"
-            risk_color = RGBColor(255, 0, 0)
-        elif "Medium" in risk_level:
-            risk_text = "MEDIUM RISK"
-            risk_color = RGBColor(255, 165, 0)
-        else:
-            risk_text = "LOW RISK"
-            risk_color = RGBColor(0, 128, 0)
-        
-        patient_heading = doc.add_heading(f"{risk_text} - {patient['name']} (ID: {patient['patient_id']})", level=2)
-        patient_heading.runs[0].font.color.rgb = risk_color
-        
-        doc.add_paragraph(f"Case Manager: {patient['case_manager']}")
-        doc.add_paragraph(f"Diagnosis: {patient['diagnosis']}")
-        doc.add_paragraph(f"Last Appointment: {patient['last_appointment']}")
-        doc.add_paragraph(f"Missed Appointments: {patient['appointments_missed']}")
-        doc.add_paragraph(f"Medication Adherence: {float(patient['medication_adherence'])*100:.0f}%")
-        doc.add_paragraph(f"Crisis Calls (30 days): {patient['crisis_calls_30days']}")
-        doc.add_paragraph()
-        
-        analysis_para = doc.add_paragraph(f"{patient_analysis['risk_level']}\n{patient_analysis['primary_factor']}\n{patient_analysis['action']}")
-        analysis_para.runs[0].font.italic = True
-        
-        doc.add_paragraph('_' * 70)
-        doc.add_paragraph()
+    # ==================== START EXCEL SPREADSHEET ====================
+    # Write-only: rows are flushed to disk as they are appended
+    wb = Workbook(write_only=True)
+    
+    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    red_fill = PatternFill(start_color="FFE6E6", end_color="FFE6E6", fill_type="solid")
+    orange_fill = PatternFill(start_color="FFF4E6", end_color="FFF4E6", fill_type="solid")
+    green_fill = PatternFill(start_color="E6FFE6", end_color="E6FFE6", fill_type="solid")
+    grey_fill = PatternFill(start_color="E6E6E6", end_color="E6E6E6", fill_type="solid")
+    
+    def styled(sheet, value, fill=None, font=None):
+        cell = WriteOnlyCell(sheet, value=value)
+        if fill:
+            cell.fill = fill
+        if font:
+            cell.font = font
+        return cell
+    
+    # Summary sheet first in the workbook; its rows are added once the counts are in
+    ws_summary = wb.create_sheet("Summary")
+    
+    # All Patients sheet
+    ws_all = wb.create_sheet("All Patients")
+    ws_all.freeze_panes = 'A2'
+    headers = ["Patient ID", "Name", "Risk Level", "Diagnosis", "Case Manager", 
+               "Last Appt", "Missed Appts", "Med Adherence", "Crisis Calls",
+               "Primary Risk Factor", "Recommended Action", "Decided By"]
+    ws_all.append([styled(ws_all, header, header_fill, Font(bold=True, color="FFFFFF"))
+                   for header in headers])
+    
+    # ANALYZE ALL PATIENTS ONCE (shared across all formats!)
+    print("🤖 Analyzing patients with Claude AI...\n")
+    
+    def show_progress(done, patient):
+        print(f"   [{done}] Analyzed {patient.name}")
+    
+    # Rule triage first; only ambiguous patients go to Claude
+    journal = RunJournal(timestamp)
+    live_feed = LiveFeed(f"reports/live_screening_{timestamp}.txt")
+    print(f"💾 Checkpointing to {journal.path}")
+    print(f"   If interrupted, re-run with: --resume {timestamp}")
+    print(f"📡 Live results (most urgent first): tail -f {live_feed.path}\n")
+    metrics = RunMetrics(timestamp)
+    try:
+        chunks = read_column_chunks(csv_file, chunk_size, on_reject=reject, workers=parse_workers)
+        for patient, result in screen_stream(chunks, progress=show_progress,
+                                             on_result=live_feed.emit, batch=batch, delta=delta,
+                                             journal=journal, pack_size=pack_size, cascade=cascade,
+                                             metrics=metrics, deadline=deadline):
+            patient_analysis = PatientAnalysis.from_result(patient, result)
+            risk_level = patient_analysis.risk_level
+            tally.add(risk_level, result['decided_by'])
+            
+            # Categorize by risk; failed analyses are never filed as Low
+            if risk_level == "High":
+                risk_text = "HIGH RISK"
+                risk_color = RGBColor(255, 0, 0)
+                fill = red_fill
+            elif risk_level == "Medium":
+                risk_text = "MEDIUM RISK"
+                risk_color = RGBColor(255, 165, 0)
+                fill = orange_fill
+            elif risk_level == "Low":
+                risk_text = "LOW RISK"
+                risk_color = RGBColor(0, 128, 0)
+                fill = green_fill
+            else:
+                risk_text = "NEEDS MANUAL REVIEW"
+                risk_color = RGBColor(128, 128, 128)
+                fill = grey_fill
+            
+            # Word: one block per patient
+            patient_heading = doc.add_heading(f"{risk_text} - {patient.name} (ID: {patient.patient_id})", level=2)
+            patient_heading.runs[0].font.color.rgb = risk_color
+            
+            doc.add_paragraph(f"Case Manager: {patient.case_manager}")
+            doc.add_paragraph(f"Diagnosis: {patient.diagnosis}")
+            doc.add_paragraph(f"Last Appointment: {patient.last_appointment}")
+            doc.add_paragraph(f"Missed Appointments: {patient.appointments_missed}")
+            doc.add_paragraph(f"Medication Adherence: {patient.medication_adherence*100:.0f}%")
+            doc.add_paragraph(f"Crisis Calls (30 days): {patient.crisis_calls_30days}")
+            doc.add_paragraph()
+            
+            analysis_para = doc.add_paragraph(f"{patient_analysis.risk_level}\n{patient_analysis.primary_factor}\n{patient_analysis.action}")
+            analysis_para.runs[0].font.italic = True
+            doc.add_paragraph(f"Decided By: {patient_analysis.decided_by}")
+            
+            doc.add_paragraph('_' * 70)
+            doc.add_paragraph()
+            
+            # Excel: one row per patient
+            ws_all.append([styled(ws_all, value, fill) for value in [
+                patient.patient_id,
+                patient.name,
+                risk_level,
+                patient.diagnosis,
+                patient.case_manager,
+                patient.last_appointment,
+                patient.appointments_missed,
+                f"{patient.medication_adherence*100:.0f}%",
+                patient.crisis_calls_30days,
+                patient_analysis.primary_factor,
+                patient_analysis.action,
+                patient_analysis.decided_by
+            ]])
+    finally:
+        journal.close()
+        live_feed.close()
+    
+    metrics.finish()
+    # Next to the reports, named like the single-format generators' summaries
+    summary_file = str(Path(word_file).with_suffix(".run_summary.json"))
+    run_summary = metrics.write(summary_file)
+    print(f"\n📈 Run summary saved: {summary_file} "
+          f"({run_summary['calls']} calls, est. ${run_summary['cost_usd']:.4f})")
+    
+    print(f"\n✓ Analysis complete!")
+    print(f"   High Risk: {tally.count('High')}")
+    print(f"   Medium Risk: {tally.count('Medium')}")
+    print(f"   Low Risk: {tally.count('Low')}")
+    print(f"   Needs Manual Review: {tally.needs_review}")
+    if tally.rejected:
+        print(f"   Skipped (invalid rows): {tally.rejected}")
+    print()
+    
+    print("=" * 70)
+    print("GENERATING DOCUMENTS...")
+    print("=" * 70)
+    print()
+    
+    # ==================== FINISH WORD DOCUMENT ====================
+    print("📄 Creating Word document...")
     
     # Add summary
     doc.add_page_break()
     summary_heading = doc.add_heading('EXECUTIVE SUMMARY', level=1)
     summary_heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
     doc.add_paragraph()
-    doc.add_paragraph(f"Total Patients Screened: {len(patients)}")
+    doc.add_paragraph(f"Total Patients Screened: {tally.total}")
     
-    high_para = doc.add_paragraph(f"HIGH RISK: {len(high_risk_patients)} ({len(high_risk_patients)/len(patients)*100:.1f}%)")
+    high_para = doc.add_paragraph(f"HIGH RISK: {tally.count('High')} ({tally.share('High'):.1f}%)")
     high_para.runs[0].font.color.rgb = RGBColor(255, 0, 0)
     high_para.runs[0].font.bold = True
     
-    medium_para = doc.add_paragraph(f"MEDIUM RISK: {len(medium_risk_patients)} ({len(medium_risk_patients)/len(patients)*100:.1f}%)")
+    medium_para = doc.add_paragraph(f"MEDIUM RISK: {tally.count('Medium')} ({tally.share('Medium'):.1f}%)")
     medium_para.runs[0].font.color.rgb = RGBColor(255, 165, 0)
     medium_para.runs[0].font.bold = True
     
-    low_para = doc.add_paragraph(f"LOW RISK: {len(low_risk_patients)} ({len(low_risk_patients)/len(patients)*100:.1f}%)")
+    low_para = doc.add_paragraph(f"LOW RISK: {tally.count('Low')} ({tally.share('Low'):.1f}%)")
     low_para.runs[0].font.color.rgb = RGBColor(0, 128, 0)
     low_para.runs[0].font.bold = True
     
     doc.save(word_file)
     print(f"   ✓ Word document saved: {word_file}")
     
-    # ==================== GENERATE EXCEL SPREADSHEET ====================
+    # ==================== FINISH EXCEL SPREADSHEET ====================
     print("📊 Creating Excel spreadsheet...")
     
-    wb = Workbook()
-    
-    # Summary sheet
-    ws_summary = wb.active
-    ws_summary.title = "Summary"
-    
-    ws_summary['A1'] = "OAKWOOD BEHAVIORAL HEALTH"
-    ws_summary['A1'].font = Font(bold=True, size=16)
-    ws_summary.merge_cells('A1:D1')
-    
-    ws_summary['A2'] = "Daily Patient Risk Screening Report"
-    ws_summary['A2'].font = Font(bold=True, size=14)
-    ws_summary.merge_cells('A2:D2')
-    
-    ws_summary['A3'] = f"Generated: {datetime.now().strftime('%A, %B %d, %Y at %I:%M %p')}"
-    ws_summary.merge_cells('A3:D3')
+    ws_summary.append([styled(ws_summary, "OAKWOOD BEHAVIORAL HEALTH", font=Font(bold=True, size=16))])
+    ws_summary.append([styled(ws_summary, "Daily Patient Risk Screening Report", font=Font(bold=True, size=14))])
+    ws_summary.append([f"Generated: {generated}"])
+    for merged in ('A1:D1', 'A2:D2', 'A3:D3'):
+        ws_summary.merged_cells.add(merged)
+    ws_summary.append([])
     
     # Statistics
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    red_fill = PatternFill(start_color="FFE6E6", end_color="FFE6E6", fill_type="solid")
-    orange_fill = PatternFill(start_color="FFF4E6", end_color="FFF4E6", fill_type="solid")
-    green_fill = PatternFill(start_color="E6FFE6", end_color="E6FFE6", fill_type="solid")
-    
-    ws_summary['A5'] = "Risk Level"
-    ws_summary['B5'] = "Count"
-    ws_summary['C5'] = "Percentage"
-    ws_summary['D5'] = "Status"
-    
-    for col in ['A5', 'B5', 'C5', 'D5']:
-        ws_summary[col].fill = header_fill
-        ws_summary[col].font = Font(bold=True, color="FFFFFF")
-    
-    ws_summary['A6'] = "HIGH RISK"
-    ws_summary['B6'] = len(high_risk_patients)
-    ws_summary['C6'] = f"{len(high_risk_patients)/len(patients)*100:.1f}%"
-    ws_summary['D6'] = "IMMEDIATE ATTENTION"
-    for col in ['A6', 'B6', 'C6', 'D6']:
-        ws_summary[col].fill = red_fill
-    
-    ws_summary['A7'] = "MEDIUM RISK"
-    ws_summary['B7'] = len(medium_risk_patients)
-    ws_summary['C7'] = f"{len(medium_risk_patients)/len(patients)*100:.1f}%"
-    ws_summary['D7'] = "FOLLOW-UP 48-72 HRS"
-    for col in ['A7', 'B7', 'C7', 'D7']:
-        ws_summary[col].fill = orange_fill
-    
-    ws_summary['A8'] = "LOW RISK"
-    ws_summary['B8'] = len(low_risk_patients)
-    ws_summary['C8'] = f"{len(low_risk_patients)/len(patients)*100:.1f}%"
-    ws_summary['D8'] = "ROUTINE MONITORING"
-    for col in ['A8', 'B8', 'C8', 'D8']:
-        ws_summary[col].fill = green_fill
+    ws_summary.append([styled(ws_summary, header, header_fill, Font(bold=True, color="FFFFFF"))
+                       for header in ["Risk Level", "Count", "Percentage", "Status"]])
+    for label, level, status, fill in [("HIGH RISK", "High", "IMMEDIATE ATTENTION", red_fill),
+                                       ("MEDIUM RISK", "Medium", "FOLLOW-UP 48-72 HRS", orange_fill),
+                                       ("LOW RISK", "Low", "ROUTINE MONITORING", green_fill)]:
+        ws_summary.append([styled(ws_summary, value, fill) for value in
+                           [label, tally.count(level), f"{tally.share(level):.1f}%", status]])
     
     ws_summary.column_dimensions['A'].width = 20
     ws_summary.column_dimensions['B'].width = 12
     ws_summary.column_dimensions['C'].width = 15
     ws_summary.column_dimensions['D'].width = 25
     
-    # All Patients sheet
-    ws_all = wb.create_sheet("All Patients")
-    headers = ["Patient ID", "Name", "Risk Level", "Diagnosis", "Case Manager", 
-               "Last Appt", "Missed Appts", "Med Adherence", "Crisis Calls",
-               "Primary Risk Factor", "Recommended Action"]
-    
-    for col_num, header in enumerate(headers, 1):
-        cell = ws_all.cell(1, col_num, header)
-        cell.fill = header_fill
-        cell.font = Font(bold=True, color="FFFFFF")
-    
-    for i, patient_analysis in enumerate(patient_analyses, 2):
-        patient = patient_analysis['patient']
-        risk_level = patient_analysis['risk_level']
-        
-        if "High" in risk_level:
-            fill = red_fill
-        elif "Medium" in risk_level:
-            fill = orange_fill
-        else:
-            fill = green_fill
-        
-        ws_all.cell(i, 1, patient['patient_id']).fill = fill
-        ws_all.cell(i, 2, patient['name']).fill = fill
-        ws_all.cell(i, 3, risk_level).fill = fill
-        ws_all.cell(i, 4, patient['diagnosis']).fill = fill
-        ws_all.cell(i, 5, patient['case_manager']).fill = fill
-        ws_all.cell(i, 6, patient['last_appointment']).fill = fill
-        ws_all.cell(i, 7, int(patient['appointments_missed'])).fill = fill
-        ws_all.cell(i, 8, f"{float(patient['medication_adherence'])*100:.0f}%").fill = fill
-        ws_all.cell(i, 9, int(patient['crisis_calls_30days'])).fill = fill
-        ws_all.cell(i, 10, patient_analysis['primary_factor']).fill = fill
-        ws_all.cell(i, 11, patient_analysis['action']).fill = fill
-    
-    ws_all.freeze_panes = 'A2'
+    # Appendix: how the run went (tokens, cost, latency)
+    ws_metrics = wb.create_sheet("Run Metrics")
+    ws_metrics.append([styled(ws_metrics, header, header_fill, Font(bold=True, color="FFFFFF"))
+                       for header in ["Metric", "Value"]])
+    for label, value in metrics_rows(run_summary):
+        ws_metrics.append([styled(ws_metrics, label, font=Font(bold=True)), value])
+    ws_metrics.column_dimensions['A'].width = 20
+    ws_metrics.column_dimensions['B'].width = 90
     
     wb.save(excel_file)
     print(f"   ✓ Excel spreadsheet saved: {excel_file}")
@@ -339,20 +319,20 @@ def generate_all_reports(csv_file, timestamp):
     elements.append(Spacer(1, 0.3*inch))
     elements.append(Paragraph("Daily Patient Risk Screening Report", subtitle_style))
     elements.append(Spacer(1, 0.2*inch))
-    elements.append(Paragraph(f"Generated: {datetime.now().strftime('%A, %B %d, %Y at %I:%M %p')}", 
+    elements.append(Paragraph(f"Generated: {generated}", 
                              ParagraphStyle('DateStyle', parent=styles['Normal'], fontSize=12, alignment=TA_CENTER)))
     elements.append(Spacer(1, 0.5*inch))
     
     # Summary table
     summary_data = [
         ['Risk Level', 'Count', 'Percentage', 'Status'],
-        ['HIGH RISK', str(len(high_risk_patients)), 
-         f"{len(high_risk_patients)/len(patients)*100:.1f}%", 'IMMEDIATE ATTENTION'],
-        ['MEDIUM RISK', str(len(medium_risk_patients)), 
-         f"{len(medium_risk_patients)/len(patients)*100:.1f}%", 'FOLLOW-UP 48-72 HRS'],
-        ['LOW RISK', str(len(low_risk_patients)), 
-         f"{len(low_risk_patients)/len(patients)*100:.1f}%", 'ROUTINE MONITORING'],
-        ['TOTAL', str(len(patients)), '100%', '']
+        ['HIGH RISK', str(tally.count('High')), 
+         f"{tally.share('High'):.1f}%", 'IMMEDIATE ATTENTION'],
+        ['MEDIUM RISK', str(tally.count('Medium')), 
+         f"{tally.share('Medium'):.1f}%", 'FOLLOW-UP 48-72 HRS'],
+        ['LOW RISK', str(tally.count('Low')), 
+         f"{tally.share('Low'):.1f}%", 'ROUTINE MONITORING'],
+        ['TOTAL', str(tally.total), '100%', '']
     ]
     
     summary_table = Table(summary_data, colWidths=[1.5*inch, 1*inch, 1.2*inch, 2*inch])
@@ -368,6 +348,32 @@ def generate_all_reports(csv_file, timestamp):
     ]))
     
     elements.append(summary_table)
+    
+    elements.append(Spacer(1, 0.2*inch))
+    elements.append(Paragraph(
+        f"Decided by rule engine: {tally.rule_decided} | Decided by Claude: {tally.total - tally.rule_decided}",
+        ParagraphStyle('ProvenanceStyle', parent=styles['Normal'], fontSize=10, alignment=TA_CENTER)))
+    
+    # Appendix: how the run went (tokens, cost, latency)
+    elements.append(PageBreak())
+    elements.append(Paragraph("Appendix: Run Metrics", styles['Heading2']))
+    elements.append(Spacer(1, 0.1*inch))
+    metrics_table = Table(
+        [['Metric', 'Value']] + [[label, Paragraph(value, styles['Normal'])]
+                                 for label, value in metrics_rows(run_summary)],
+        colWidths=[1.6*inch, 5.2*inch]
+    )
+    metrics_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f4788')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 1), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ]))
+    elements.append(metrics_table)
+    
     doc_pdf.build(elements)
     
     print(f"   ✓ PDF document saved: {pdf_file}")
@@ -382,18 +388,38 @@ def generate_all_reports(csv_file, timestamp):
         'word': word_file,
         'excel': excel_file,
         'pdf': pdf_file,
-        'stats': {
-            'total': len(patients),
-            'high_risk': len(high_risk_patients),
-            'medium_risk': len(medium_risk_patients),
-            'low_risk': len(low_risk_patients)
-        }
+        'run_summary': summary_file,
+        'stats': tally.stats()
     }
 
 # Run the combined generator
 if __name__ == "__main__":
-    input_csv = "patients.csv"
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    parser = argparse.ArgumentParser(description="Generate Word, Excel and PDF screening reports")
+    parser.add_argument("--input", default="patients.csv", metavar="CSV",
+                        help="Patient extract: .csv, or .csv.gz / .csv.zst read without "
+                             "unpacking to disk (default: patients.csv)")
+    parser.add_argument("--batch", action="store_true",
+                        help="Use the Message Batches API (nightly runs)")
+    parser.add_argument("--delta", action="store_true",
+                        help="Only analyze patients whose data changed since the last run")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Resume an interrupted run, skipping patients already analyzed")
+    parser.add_argument("--pack-size", type=int, default=DEFAULT_PACK_SIZE, metavar="K",
+                        help="Patients per Claude request (default: CLAUDE_PACK_SIZE or 1)")
+    parser.add_argument("--cascade", action="store_true", default=CASCADE_ENABLED,
+                        help="Screen on the fast model first, escalate uncertain or high-risk patients")
+    parser.add_argument("--deadline", type=float, default=DEFAULT_RUN_DEADLINE_S, metavar="SECONDS",
+                        help="Stop waiting for Claude after this long; the rest fall back to "
+                             "the rule score (default: CLAUDE_RUN_DEADLINE or no limit)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, metavar="ROWS",
+                        help="Rows read and screened at a time (default: SCREENING_CHUNK_SIZE or 1000)")
+    parser.add_argument("--parse-workers", type=int, default=DEFAULT_PARSE_WORKERS, metavar="N",
+                        help="Parse the CSV in N worker processes, for very large extracts "
+                             "(default: SCREENING_PARSE_WORKERS or 0 = in-process)")
+    args = parser.parse_args()
+    
+    input_csv = args.input
+    timestamp = args.resume or datetime.now().strftime('%Y%m%d_%H%M%S')
     
     print()
     print("╔" + "═" * 68 + "╗")
@@ -402,7 +428,10 @@ if __name__ == "__main__":
     print("╚" + "═" * 68 + "╝")
     print()
     
-    results = generate_all_reports(input_csv, timestamp)
+    results = generate_all_reports(input_csv, timestamp, batch=args.batch, delta=args.delta,
+                                   pack_size=args.pack_size, cascade=args.cascade,
+                                   deadline=args.deadline, chunk_size=args.chunk_size,
+                                   parse_workers=args.parse_workers)
     
     print("📋 SUMMARY OF GENERATED FILES:")
     print()
@@ -415,6 +444,10 @@ if __name__ == "__main__":
     print(f"   🔴 High Risk:     {results['stats']['high_risk']}")
     print(f"   🟡 Medium Risk:   {results['stats']['medium_risk']}")
     print(f"   🟢 Low Risk:      {results['stats']['low_risk']}")
+    if results['stats']['needs_review']:
+        print(f"   ⚪ Needs Review:  {results['stats']['needs_review']}")
+    if results['stats']['rejected']:
+        print(f"   ⚠️  Skipped:       {results['stats']['rejected']} invalid rows")
     print()
     print("=" * 70)
     print("✓ COMPLETE! All files ready in reports/ folder")
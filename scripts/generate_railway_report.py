@@ -38,13 +38,7 @@ def generate_railway_report():
                 diagnosis,
                 created_at
             FROM patients
-            ORDER BY 
-                CASE risk_level
-                    WHEN 'HIGH' THEN 1
-                    WHEN 'MEDIUM' THEN 2
-                    WHEN 'LOW' THEN 3
-                END,
-                medication_adherence ASC
+            ORDER BY risk_priority ASC, medication_adherence ASC
         """)
         
         patients = cursor.fetchall()
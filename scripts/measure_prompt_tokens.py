@@ -0,0 +1,168 @@
+"""
+Measure per-patient input tokens and latency: legacy prompt vs cached compact prompt.
+
+Legacy is the risk-v2 request: the full instructions and the labelled
+patient block (name, case manager, exact dates) in every user message.
+Current is what ClaudeClient sends now: the instructions as a cached
+system prefix, plus the compact summary from patient_summary.py.
+
+Both modes send the same tool, so output is comparable. Each mode makes
+one warm-up call, then fans out, the same way analyze_many() does.
+
+Both are measured on the main model and on the cascade's fast model.
+The API's minimum cacheable prefix differs by model (2048 tokens for
+Haiku, 1024 for Sonnet/Opus), so a prefix can be cached on one and
+billed in full on the other.
+
+Usage:
+    python scripts/measure_prompt_tokens.py --input patients.csv --sample 50
+    python scripts/measure_prompt_tokens.py --models claude-sonnet-4-20250514
+"""
+import argparse
+import asyncio
+import csv
+import json
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Shared Claude client lives in the backend package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from app.ai.assessment import ASSESSMENT_MAX_TOKENS, RISK_TOOL, RISK_TOOL_CHOICE
+from app.ai.cascade import FAST_MODEL
+from app.ai.claude_client import DEFAULT_MODEL, ClaudeClient, build_risk_prompt, risk_system_blocks
+from app.ai.pricing import CACHE_READ_MULTIPLIER, CACHE_WRITE_MULTIPLIER
+from app.screening.columns import open_extract
+from app.screening.records import PatientRecord
+
+def legacy_risk_prompt(patient_row):
+    """The risk-v2 prompt, kept here only as the measurement baseline."""
+    return f"""
+You are a clinical risk assessment assistant.
+
+Analyze this patient and record:
+1. Risk Level (Low/Medium/High)
+2. Primary Risk Factor (max 80 characters)
+3. Recommended Action (max 120 characters)
+
+PATIENT DATA:
+
+Patient ID: {patient_row.patient_id}
+Name: {patient_row.name}
+Last Appointment: {patient_row.last_appointment}
+Appointments Missed (last 6 months): {patient_row.appointments_missed}
+Medication Adherence: {patient_row.medication_adherence*100:.0f}%
+Crisis Calls (30 days): {patient_row.crisis_calls_30days}
+Diagnosis: {patient_row.diagnosis}
+Case Manager: {patient_row.case_manager}
+
+
+Record your assessment with the {RISK_TOOL['name']} tool.
+"""
+
+def request_for(mode, patient_row):
+    """messages and extra params for one patient in the given mode."""
+    if mode == "legacy":
+        return [{"role": "user", "content": legacy_risk_prompt(patient_row)}], {}
+    return [{"role": "user", "content": build_risk_prompt(patient_row)}], {"system": risk_system_blocks()}
+
+async def measure_mode(mode, model, patients, concurrency):
+    calls = []
+
+    # Effectively unlimited RPM/TPM: measure the API, not our own throttling
+    async with ClaudeClient(model=model, concurrency=concurrency, rpm=10**6, tpm=10**9) as claude:
+        async def one(patient):
+            messages, params = request_for(mode, patient)
+            started = time.perf_counter()
+            message = await claude.create(
+                messages,
+                ASSESSMENT_MAX_TOKENS,
+                tools=[RISK_TOOL],
+                tool_choice=RISK_TOOL_CHOICE,
+                **params
+            )
+            usage = message.usage
+            calls.append({
+                'latency_s': time.perf_counter() - started,
+                'input_tokens': usage.input_tokens,
+                'cache_creation_input_tokens': usage.cache_creation_input_tokens or 0,
+                'cache_read_input_tokens': usage.cache_read_input_tokens or 0,
+                'output_tokens': usage.output_tokens
+            })
+
+        await one(patients[0])
+        await asyncio.gather(*(one(p) for p in patients[1:]))
+
+    count = len(calls)
+    latencies = sorted(c['latency_s'] for c in calls)
+    uncached = sum(c['input_tokens'] for c in calls)
+    written = sum(c['cache_creation_input_tokens'] for c in calls)
+    read = sum(c['cache_read_input_tokens'] for c in calls)
+    return {
+        'mode': mode,
+        'model': model,
+        'patients': count,
+        'prompt_tokens_per_patient': (uncached + written + read) / count,
+        'uncached_input_tokens_per_patient': uncached / count,
+        'cache_read_tokens_per_patient': read / count,
+        'billed_input_tokens_per_patient': (
+            uncached + written * CACHE_WRITE_MULTIPLIER + read * CACHE_READ_MULTIPLIER
+        ) / count,
+        'output_tokens_per_patient': sum(c['output_tokens'] for c in calls) / count,
+        'latency_p50_s': statistics.median(latencies),
+        'latency_p95_s': latencies[min(count - 1, int(count * 0.95))],
+        'latency_mean_s': statistics.fmean(latencies)
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare legacy and cached compact risk prompts")
+    parser.add_argument("--input", default="patients.csv")
+    parser.add_argument("--sample", type=int, help="Only use the first N patients")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--models", default=f"{DEFAULT_MODEL},{FAST_MODEL}",
+                        help="Comma-separated models to measure (default: main and fast model)")
+    args = parser.parse_args()
+
+    with open_extract(args.input) as file:
+        patients = [PatientRecord.from_row(row) for row in csv.DictReader(file)]
+    if args.sample:
+        patients = patients[:args.sample]
+
+    print("=" * 70)
+    print("PROMPT TOKEN & LATENCY MEASUREMENT")
+    print("=" * 70)
+    print(f"✓ Loaded {len(patients)} patients from {args.input}\n")
+
+    results = []
+    for model in args.models.split(","):
+        modes = []
+        for mode in ("legacy", "cached-compact"):
+            print(f"🧪 Measuring {mode} on {model}...")
+            modes.append(asyncio.run(measure_mode(mode, model, patients, args.concurrency)))
+        results.extend(modes)
+
+        legacy, current = modes
+        print()
+        print(f"{model}")
+        print(f"{'per patient':<28} {'legacy':>10} {'cached-compact':>15} {'change':>8}")
+        print("-" * 64)
+        for label, key in [
+            ("prompt tokens", 'prompt_tokens_per_patient'),
+            ("uncached input tokens", 'uncached_input_tokens_per_patient'),
+            ("cache read tokens", 'cache_read_tokens_per_patient'),
+            ("billed input tokens", 'billed_input_tokens_per_patient'),
+            ("output tokens", 'output_tokens_per_patient'),
+            ("latency p50 (s)", 'latency_p50_s'),
+            ("latency p95 (s)", 'latency_p95_s'),
+        ]:
+            change = (current[key] - legacy[key]) / legacy[key] * 100 if legacy[key] else 0.0
+            print(f"{label:<28} {legacy[key]:>10.2f} {current[key]:>15.2f} {change:>+7.1f}%")
+        print()
+
+    output_file = f"reports/prompt_tokens_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output_file, 'w', encoding='utf-8') as file:
+        json.dump({'input': args.input, 'results': results}, file, indent=2)
+
+    print(f"\n📄 Results saved: {output_file}")
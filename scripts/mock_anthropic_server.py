@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Anthropic Messages API.
+
+Answers /v1/messages and the Message Batches endpoints with canned,
+deterministic risk assessments derived from the patient fields in the
+prompt, so the screening pipeline can run without an API key. Requests
+that offer tools get a tool_use reply; plain prompts get text. System
+blocks marked with cache_control are "cached" like the real API, so
+usage reports cache writes and reads.
+
+For load tests it can add per-request latency drawn from a distribution,
+inject 429 (rate limited) and 529 (overloaded) errors at given rates or
+above an RPM limit, and report what it served at GET /v1/mock/stats.
+Faults and latencies come from a seeded RNG, so a run is repeatable.
+
+Usage:
+    python scripts/mock_anthropic_server.py --port 8080
+    python scripts/mock_anthropic_server.py --latency lognormal:0.8,0.4 --rate-429 0.05 --rate-529 0.02
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8080 python scripts/csv_patient_analyzer.py --batch
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import deque
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds a submitted batch stays "in_progress" before it ends
+BATCH_PROCESSING_SECONDS = 2.0
+
+# Shortest prefix the API will cache; shorter ones are ignored. Haiku
+# models need twice as long a prefix as Sonnet/Opus.
+MIN_CACHEABLE_TOKENS = 1024
+MIN_CACHEABLE_TOKENS_HAIKU = 2048
+
+ERROR_TYPES = {429: "rate_limit_error", 529: "overloaded_error"}
+
+
+def parse_latency(spec):
+    """
+    Latency sampler from a spec string; every value is in seconds.
+
+      fixed:S              always S
+      uniform:LO,HI        uniform between LO and HI
+      normal:MEAN,SD       normal, clipped at 0
+      lognormal:MEDIAN,SIGMA  long-tailed, like real model latency
+
+    Returns:
+        callable: rng -> seconds
+
+    Example:
+        >>> parse_latency("uniform:0.1,0.3")(random.Random(1))
+        0.1268...
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",")] if args else []
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(*values)
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(*values))
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Bad latency spec {spec!r}: use fixed:S, uniform:LO,HI, "
+                     "normal:MEAN,SD or lognormal:MEDIAN,SIGMA")
+
+
+class MockConfig:
+    """
+    Latency and fault injection for /v1/messages.
+
+    Args:
+        latency: Latency spec (see parse_latency)
+        rate_429: Share of requests rejected with 429 rate_limit_error
+        rate_529: Share of requests rejected with 529 overloaded_error
+        rpm: Requests per minute before every request gets a 429 (0 = no limit)
+        retry_after: retry-after header (seconds) sent with injected errors
+        seed: RNG seed for latencies and faults
+    """
+
+    def __init__(self, latency="fixed:0", rate_429=0.0, rate_529=0.0, rpm=0,
+                 retry_after=1.0, seed=0):
+        self.latency = latency
+        self.sample_latency = parse_latency(latency)
+        self.rate_429 = rate_429
+        self.rate_529 = rate_529
+        self.rpm = rpm
+        self.retry_after = retry_after
+        self.seed = seed
+
+
+def prompt_signals(prompt):
+    """(adherence %, missed appointments, crisis calls) parsed from a prompt."""
+    def field(pattern, default=0.0):
+        match = re.search(pattern, prompt)
+        return float(match.group(1)) if match else default
+
+    # Compact summaries (adherence: 60%) and the older labelled block
+    adherence = field(r"(?i:adherence): (\d+)%", 100)
+    missed = field(r"(?:Appointments Missed[^:]*|missed_appts_6mo): (\d+)")
+    crisis = field(r"(?:Crisis Calls[^:]*|crisis_calls_30d): (\d+)")
+    return adherence, missed, crisis
+
+
+def canned_fields(prompt):
+    """Deterministic (risk level, primary factor, action) for a prompt."""
+    adherence, missed, crisis = prompt_signals(prompt)
+
+    if crisis >= 3 or adherence < 50:
+        level, factor, action = "High", f"{crisis:.0f} crisis calls, {adherence:.0f}% adherence", "Same-day clinical outreach"
+    elif crisis >= 1 or adherence < 80 or missed >= 2:
+        level, factor, action = "Medium", f"{missed:.0f} missed appointments, {adherence:.0f}% adherence", "Follow up within 48-72 hours"
+    else:
+        level, factor, action = "Low", "Stable engagement", "Continue routine monitoring"
+
+    return level, factor, action
+
+
+def canned_confidence(prompt):
+    """Confidence for canned_fields(): lower when a single signal decides Medium."""
+    adherence, missed, crisis = prompt_signals(prompt)
+    level = canned_fields(prompt)[0]
+    if level == "Medium":
+        signals = (crisis >= 1) + (adherence < 80) + (missed >= 2)
+        return 0.85 if signals > 1 else 0.65
+    return 0.95 if level == "High" else 0.9
+
+
+def canned_assessment(prompt):
+    """Deterministic Risk Level / Primary Factor / Action text reply for a prompt."""
+    level, factor, action = canned_fields(prompt)
+    return f"Risk Level: {level}\nPrimary Factor: {factor}\nAction: {action}"
+
+
+def canned_tool_input(tool, prompt):
+    """Tool input for a prompt: one assessment, or one per patient if packed."""
+    if "assessments" in tool["input_schema"]["properties"]:
+        assessments = []
+        parts = re.split(r"PATIENT (p\d+):", prompt)
+        for ref, chunk in zip(parts[1::2], parts[2::2]):
+            level, factor, action = canned_fields(chunk)
+            assessments.append({
+                "patient_ref": ref,
+                "risk_level": level,
+                "primary_factor": factor,
+                "action": action,
+                "confidence": canned_confidence(chunk),
+            })
+        return {"assessments": assessments}
+    level, factor, action = canned_fields(prompt)
+    return {"risk_level": level, "primary_factor": factor, "action": action,
+            "confidence": canned_confidence(prompt)}
+
+
+def prompt_usage(params, prompt, prompt_cache=None):
+    """
+    input_tokens and cache token counts for a request.
+
+    The tools + system prefix counts as cached when a system block has
+    cache_control, it is long enough for the request's model, and an
+    earlier request to the same model wrote it.
+    """
+    system = params.get("system") or ""
+    blocks = [{"text": system}] if isinstance(system, str) else system
+    prefix = json.dumps(params.get("tools", [])) + "".join(b.get("text", "") for b in blocks)
+    prefix_tokens = len(prefix) // 4
+    usage = {"input_tokens": len(prompt) // 4 + 1,
+             "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+
+    model = params.get("model", "")
+    minimum = MIN_CACHEABLE_TOKENS_HAIKU if "haiku" in model else MIN_CACHEABLE_TOKENS
+    cacheable = any(b.get("cache_control") for b in blocks) and prefix_tokens >= minimum
+    # Each model keeps its own cache
+    key = (model, prefix)
+    if not cacheable or prompt_cache is None:
+        usage["input_tokens"] += prefix_tokens
+    elif key in prompt_cache:
+        usage["cache_read_input_tokens"] = prefix_tokens
+    else:
+        prompt_cache.add(key)
+        usage["cache_creation_input_tokens"] = prefix_tokens
+    return usage
+
+
+def message_response(params, prompt_cache=None):
+    """Build a Messages API response body for one request's params."""
+    prompt = "\n".join(
+        m["content"] if isinstance(m["content"], str)
+        else "\n".join(block.get("text", "") for block in m["content"])
+        for m in params.get("messages", [])
+    )
+    if params.get("tools"):
+        tool_input = canned_tool_input(params["tools"][0], prompt)
+        content = [{
+            "type": "tool_use",
+            "id": f"toolu_{uuid.uuid4().hex[:24]}",
+            "name": params["tools"][0]["name"],
+            "input": tool_input,
+        }]
+        output = json.dumps(tool_input)
+        stop_reason = "tool_use"
+    else:
+        output = canned_assessment(prompt)
+        content = [{"type": "text", "text": output}]
+        stop_reason = "end_turn"
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": params.get("model", "mock"),
+        "content": content,
+        "stop_reason": stop_reason,
+        "stop_sequence": None,
+        "usage": {**prompt_usage(params, prompt, prompt_cache), "output_tokens": len(output) // 4 + 1},
+    }
+
+
+class MockState:
+    def __init__(self, config=None):
+        self.lock = threading.Lock()
+        self.batches = {}
+        self.prompt_cache = set()
+        self.config = config or MockConfig()
+        self.rng = random.Random(self.config.seed)
+        self.recent = deque()
+        self.stats = {
+            'requests': 0,
+            'succeeded': 0,
+            'rate_limited_429': 0,
+            'overloaded_529': 0,
+            'input_tokens': 0,
+            'output_tokens': 0,
+            'cache_creation_input_tokens': 0,
+            'cache_read_input_tokens': 0,
+            'latency_seconds': 0.0,
+        }
+
+    def admit(self):
+        """
+        Decide one /v1/messages request's fate.
+
+        Returns:
+            tuple: (error status or None, retry-after seconds, latency seconds)
+        """
+        config = self.config
+        with self.lock:
+            self.stats['requests'] += 1
+            now = time.monotonic()
+            while self.recent and now - self.recent[0] >= 60:
+                self.recent.popleft()
+            if config.rpm and len(self.recent) >= config.rpm:
+                self.stats['rate_limited_429'] += 1
+                return 429, 60 - (now - self.recent[0]), 0.0
+            self.recent.append(now)
+
+            roll = self.rng.random()
+            if roll < config.rate_429:
+                self.stats['rate_limited_429'] += 1
+                return 429, config.retry_after, 0.0
+            if roll < config.rate_429 + config.rate_529:
+                self.stats['overloaded_529'] += 1
+                return 529, config.retry_after, 0.0
+            return None, 0.0, config.sample_latency(self.rng)
+
+    def record(self, response, latency):
+        with self.lock:
+            self.stats['succeeded'] += 1
+            self.stats['latency_seconds'] += latency
+            for field, value in response["usage"].items():
+                self.stats[field] += value or 0
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats['mean_latency_seconds'] = (
+            stats['latency_seconds'] / stats['succeeded'] if stats['succeeded'] else 0.0
+        )
+        stats['config'] = {k: v for k, v in vars(self.config).items() if k != 'sample_latency'}
+        return stats
+
+
+class MockAnthropicHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, body, content_type="application/json", headers=None):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        try:
+            self.send_response(status)
+            self.send_header("content-type", content_type)
+            self.send_header("content-length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (e.g. the losing half of a hedged call)
+            self.close_connection = True
+
+    def _read_json(self):
+        length = int(self.headers.get("content-length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _batch_view(self, batch):
+        ended = time.time() >= batch["ends_at"]
+        count = len(batch["results"])
+        host = self.headers.get("host")
+        return {
+            "id": batch["id"],
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else count,
+                "succeeded": count if ended else 0,
+                "errored": 0,
+                "canceled": 0,
+                "expired": 0,
+            },
+            "created_at": batch["created_at"],
+            "expires_at": batch["created_at"],
+            "ended_at": batch["created_at"] if ended else None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": f"http://{host}/v1/messages/batches/{batch['id']}/results" if ended else None,
+        }
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        body = self._read_json()
+
+        if path == "/v1/messages":
+            status, retry_after, latency = self.state.admit()
+            if status:
+                self._send_json(
+                    status,
+                    {"type": "error", "error": {"type": ERROR_TYPES[status], "message": "Injected by mock"}},
+                    headers={"retry-after": f"{retry_after:.2f}"}
+                )
+                return
+            time.sleep(latency)
+            with self.state.lock:
+                response = message_response(body, self.state.prompt_cache)
+            self.state.record(response, latency)
+            self._send_json(200, response)
+        elif path == "/v1/messages/batches":
+            batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+            batch = {
+                "id": batch_id,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "ends_at": time.time() + BATCH_PROCESSING_SECONDS,
+                "results": [
+                    {
+                        "custom_id": req["custom_id"],
+                        "result": {"type": "succeeded", "message": message_response(req["params"], self.state.prompt_cache)},
+                    }
+                    for req in body.get("requests", [])
+                ],
+            }
+            with self.state.lock:
+                self.state.batches[batch_id] = batch
+            self._send_json(200, self._batch_view(batch))
+        else:
+            self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": path}})
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/v1/mock/stats":
+            self._send_json(200, self.state.snapshot())
+            return
+        match = re.fullmatch(r"/v1/messages/batches/([\w-]+)(/results)?", path)
+        batch = self.state.batches.get(match.group(1)) if match else None
+
+        if not batch:
+            self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": path}})
+        elif match.group(2):
+            lines = "\n".join(json.dumps(entry) for entry in batch["results"]) + "\n"
+            self._send_json(200, lines.encode(), content_type="application/binary")
+        else:
+            self._send_json(200, self._batch_view(batch))
+
+
+def start_server(host="127.0.0.1", port=0, config=None):
+    """
+    Start the mock server on a background thread.
+
+    Args:
+        config: Optional MockConfig for latency and fault injection
+
+    Returns:
+        ThreadingHTTPServer: Call .shutdown() when done; .server_port has
+        the port and .state the MockState (for .snapshot())
+    """
+    state = MockState(config)
+    handler = type("Handler", (MockAnthropicHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local mock of the Anthropic Messages API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", default="fixed:0",
+                        help="fixed:S, uniform:LO,HI, normal:MEAN,SD or lognormal:MEDIAN,SIGMA (seconds)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Share of requests answered 429")
+    parser.add_argument("--rate-529", type=float, default=0.0, help="Share of requests answered 529")
+    parser.add_argument("--rpm", type=int, default=0, help="Answer 429 above this many requests/minute")
+    parser.add_argument("--retry-after", type=float, default=1.0,
+                        help="retry-after seconds on injected errors")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockConfig(latency=args.latency, rate_429=args.rate_429, rate_529=args.rate_529,
+                        rpm=args.rpm, retry_after=args.retry_after, seed=args.seed)
+    server = start_server(args.host, args.port, config)
+    print(f"🧪 Mock Anthropic API listening on http://{args.host}:{server.server_port}")
+    print(f"   export ANTHROPIC_BASE_URL=http://{args.host}:{server.server_port}")
+    print(f"   Stats: http://{args.host}:{server.server_port}/v1/mock/stats")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(json.dumps(server.state.snapshot(), indent=2))
@@ -1,43 +1,28 @@
-import anthropic
-import os
+import sys
+from datetime import date, timedelta
+from pathlib import Path
 
-def analyze_patient(patient_data):
-    """Analyze a single patient using Claude"""
-    
-    client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
-    
-    # Use your Prompt #1 from yesterday!
-    prompt = f"""
-You are a clinical documentation assistant for training purposes.
+# Shared Claude client lives in the backend package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from app.ai.claude_client import analyze_patients
+from app.screening.records import PatientRecord
 
-Task: Extract risk indicators from patient data.
-
-PATIENT DATA:
-{patient_data}
-
-Return:
-1. Risk Level (Low/Medium/High)
-2. Key Risk Factors
-3. Immediate Actions Needed
-"""
-    
-    message = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=1000,
-        messages=[{"role": "user", "content": prompt}]
-    )
-    
-    return message.content[0].text
+def analyze_patient(patient):
+    """Analyze a single PatientRecord using Claude"""
+    return analyze_patients([patient])[0]
 
 # Test it!
-test_patient = """
-Patient ID: 12345
-Last appointment: Missed (2 weeks ago)
-Medication adherence: 45%
-Crisis calls: 3 in past month
-Diagnosis: Major Depressive Disorder
-"""
+test_patient = PatientRecord(
+    patient_id="12345",
+    name="Test Patient",
+    last_appointment=(date.today() - timedelta(weeks=2)).isoformat(),
+    appointments_missed=1,
+    medication_adherence=0.45,
+    crisis_calls_30days=3,
+    diagnosis="Major Depressive Disorder",
+    case_manager="Unassigned"
+)
 
 result = analyze_patient(test_patient)
 print("=== PATIENT RISK ANALYSIS ===")
-print(result)
\ No newline at end of file
+print(result)
@@ -1,7 +1,7 @@
-import anthropic
-import os
 import csv
+import sys
 from datetime import datetime
+from pathlib import Path
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
 from reportlab.lib.units import inch
@@ -9,59 +9,24 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 
-def analyze_patient_from_csv(patient_row, client):
-    """Analyze a patient from CSV data"""
-    
-    patient_summary = f"""
-Patient ID: {patient_row['patient_id']}
-Name: {patient_row['name']}
-Last Appointment: {patient_row['last_appointment']}
-Appointments Missed (last 6 months): {patient_row['appointments_missed']}
-Medication Adherence: {float(patient_row['medication_adherence'])*100:.0f}%
-Crisis Calls (30 days): {patient_row['crisis_calls_30days']}
-Diagnosis: {patient_row['diagnosis']}
-Case Manager: {patient_row['case_manager']}
-"""
-    
-    prompt = f"""
-You are a clinical risk assessment assistant.
-
-Analyze this patient and provide:
-1. Risk Level (Low/Medium/High)
-2. Primary Risk Factor (max 80 characters)
-3. Recommended Action (max 120 characters)
-
-PATIENT DATA:
-{patient_summary}
-
-Return in this exact format:
-Risk Level: [level]
-Primary Factor: [factor]
-Action: [action]
-"""
-    
-    message = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=300,
-        messages=[{"role": "user", "content": prompt}]
-    )
-    
-    return message.content[0].text
+# Shared screening and Claude modules live in the backend package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from app.ai.run_metrics import RunMetrics, metrics_rows
+from app.screening.columns import open_extract
+from app.screening.records import PatientAnalysis, PatientRecord
+from app.screening.screener import screen_patients
 
 def create_pdf_report(csv_file, output_file):
     """Create a professional PDF report"""
     
-    # Initialize Claude client
-    client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
-    
     # Read patient data
     print(f"Reading patient data from: {csv_file}")
     patients = []
     
-    with open(csv_file, 'r', encoding='utf-8') as file:
+    with open_extract(csv_file) as file:
         csv_reader = csv.DictReader(file)
         for row in csv_reader:
-            patients.append(row)
+            patients.append(PatientRecord.from_row(row))
     
     print(f"✓ Loaded {len(patients)} patients\n")
     
@@ -70,49 +35,42 @@ def create_pdf_report(csv_file, output_file):
     high_risk_patients = []
     medium_risk_patients = []
     low_risk_patients = []
+    review_patients = []
     
     print("Analyzing patients...\n")
     
-    for i, patient in enumerate(patients, 1):
-        print(f"[{i}/{len(patients)}] Analyzing {patient['name']}...")
-        
-        # Get AI analysis
-        analysis = analyze_patient_from_csv(patient, client)
-        
-        # Parse analysis
-        risk_level = "Unknown"
-        primary_factor = "Not analyzed"
-        action = "No action specified"
-        
-        for line in analysis.split('\n'):
-            if line.startswith('Risk Level:'):
-                risk_level = line.replace('Risk Level:', '').strip()
-            elif line.startswith('Primary Factor:'):
-                primary_factor = line.replace('Primary Factor:', '').strip()
-            elif line.startswith('Action:'):
-                action = line.replace('Action:', '').strip()
-        
-        # Store analysis
-        patient_analysis = {
-            'patient': patient,
-            'risk_level': risk_level,
-            'primary_factor': primary_factor,
-            'action': action
-        }
+    def show_progress(done, total, index):
+        print(f"[{done}/{total}] Analyzed {patients[index].name}")
+    
+    # Rule triage first; only ambiguous patients go to Claude
+    metrics = RunMetrics(Path(output_file).stem)
+    results = screen_patients(patients, progress=show_progress, metrics=metrics)
+    metrics.finish()
+    summary_file = str(Path(output_file).with_suffix(".run_summary.json"))
+    run_summary = metrics.write(summary_file)
+    print(f"📈 Run summary saved: {summary_file}")
+    
+    for patient, result in zip(patients, results):
+        # Store parsed analysis
+        patient_analysis = PatientAnalysis.from_result(patient, result)
+        risk_level = patient_analysis.risk_level
         patient_analyses.append(patient_analysis)
         
-        # Categorize by risk
-        if "High" in risk_level:
+        # Categorize by risk; failed analyses are never filed as Low
+        if risk_level == "High":
             high_risk_patients.append(patient_analysis)
-        elif "Medium" in risk_level:
+        elif risk_level == "Medium":
             medium_risk_patients.append(patient_analysis)
-        else:
+        elif risk_level == "Low":
             low_risk_patients.append(patient_analysis)
+        else:
+            review_patients.append(patient_analysis)
     
     print(f"\n✓ Analysis complete!")
     print(f"  High Risk: {len(high_risk_patients)}")
     print(f"  Medium Risk: {len(medium_risk_patients)}")
-    print(f"  Low Risk: {len(low_risk_patients)}\n")
+    print(f"  Low Risk: {len(low_risk_patients)}")
+    print(f"  Needs Manual Review: {len(review_patients)}\n")
     
     print("Creating PDF document...\n")
     
@@ -212,20 +170,22 @@ def create_pdf_report(csv_file, output_file):
     elements.append(Paragraph("Patient Details", section_style))
     elements.append(Spacer(1, 0.2*inch))
     
-    # Sort patients by risk (High, Medium, Low)
-    sorted_patients = high_risk_patients + medium_risk_patients + low_risk_patients
+    # Sort patients by risk (failed analyses first, then High, Medium, Low)
+    sorted_patients = review_patients + high_risk_patients + medium_risk_patients + low_risk_patients
     
     for i, patient_analysis in enumerate(sorted_patients):
-        patient = patient_analysis['patient']
-        risk_level = patient_analysis['risk_level']
+        patient = patient_analysis.patient
+        risk_level = patient_analysis.risk_level
         
         # Determine background color
-        if "High" in risk_level:
+        if risk_level == "High":
             bg_color = colors.HexColor('#ffcccc')
-        elif "Medium" in risk_level:
+        elif risk_level == "Medium":
             bg_color = colors.HexColor('#ffe6cc')
-        else:
+        elif risk_level == "Low":
             bg_color = colors.HexColor('#ccffcc')
+        else:
+            bg_color = colors.HexColor('#e6e6e6')
         
         # Patient header
         patient_header_style = ParagraphStyle(
@@ -239,18 +199,18 @@ def create_pdf_report(csv_file, output_file):
         )
         
         elements.append(Paragraph(
-            f"{risk_level.upper()} - {patient['name']} (ID: {patient['patient_id']})", 
+            f"{risk_level.upper()} - {patient.name} (ID: {patient.patient_id})", 
             patient_header_style
         ))
         
         # Patient data table
         patient_data = [
-            ['Case Manager:', patient['case_manager'], 
-             'Diagnosis:', patient['diagnosis']],
-            ['Last Appointment:', patient['last_appointment'], 
-             'Missed Appointments:', patient['appointments_missed']],
-            ['Med Adherence:', f"{float(patient['medication_adherence'])*100:.0f}%", 
-             'Crisis Calls (30d):', patient['crisis_calls_30days']],
+            ['Case Manager:', patient.case_manager, 
+             'Diagnosis:', patient.diagnosis],
+            ['Last Appointment:', patient.last_appointment, 
+             'Missed Appointments:', patient.appointments_missed],
+            ['Med Adherence:', f"{patient.medication_adherence*100:.0f}%", 
+             'Crisis Calls (30d):', patient.crisis_calls_30days],
         ]
         
         patient_table = Table(patient_data, colWidths=[1.3*inch, 1.8*inch, 1.3*inch, 1.8*inch])
@@ -267,8 +227,9 @@ def create_pdf_report(csv_file, output_file):
         elements.append(Spacer(1, 0.1*inch))
         
         # Analysis
-        analysis_text = f"<b>Primary Factor:</b> {patient_analysis['primary_factor']}<br/>"
-        analysis_text += f"<b>Recommended Action:</b> {patient_analysis['action']}"
+        analysis_text = f"<b>Primary Factor:</b> {patient_analysis.primary_factor}<br/>"
+        analysis_text += f"<b>Recommended Action:</b> {patient_analysis.action}<br/>"
+        analysis_text += f"<b>Decided By:</b> {patient_analysis.decided_by}"
         
         elements.append(Paragraph(analysis_text, styles['Normal']))
         elements.append(Spacer(1, 0.15*inch))
@@ -287,6 +248,26 @@ def create_pdf_report(csv_file, output_file):
         if (i + 1) % 3 == 0 and i < len(sorted_patients) - 1:
             elements.append(PageBreak())
     
+    # Appendix: how the run went (tokens, cost, latency)
+    elements.append(PageBreak())
+    elements.append(Paragraph("Appendix: Run Metrics", styles['Heading2']))
+    elements.append(Spacer(1, 0.1*inch))
+    metrics_table = Table(
+        [['Metric', 'Value']] + [[label, Paragraph(value, styles['Normal'])]
+                                 for label, value in metrics_rows(run_summary)],
+        colWidths=[1.6*inch, 5.2*inch]
+    )
+    metrics_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f4788')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 1), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ]))
+    elements.append(metrics_table)
+    
     # Build PDF
     doc.build(elements)
     
@@ -1,11 +1,17 @@
-import anthropic
-import os
+import sys
 from datetime import datetime
+from pathlib import Path
 
-def analyze_patient(patient_data, client):
-    """Analyze a single patient"""
+# Shared Claude client lives in the backend package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from app.ai.assessment import RISK_LEVELS
+from app.ai.claude_client import complete_prompts, parse_analysis
+from app.screening.pipeline import RiskTally
+
+def build_prompt(patient_data):
+    """Build the risk prompt for a single patient"""
     
-    prompt = f"""
+    return f"""
 You are a clinical documentation assistant.
 
 Analyze this patient and provide:
@@ -21,20 +27,10 @@ Risk Level: [level]
 Primary Factor: [factor]
 Action: [action]
 """
-    
-    message = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=300,
-        messages=[{"role": "user", "content": prompt}]
-    )
-    
-    return message.content[0].text
 
 def generate_report(patient_list, output_file):
     """Analyze patients and generate text report"""
     
-    client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
-    
     # Start building report
     report_lines = []
     report_lines.append("=" * 60)
@@ -43,31 +39,30 @@ def generate_report(patient_list, output_file):
     report_lines.append("=" * 60)
     report_lines.append("")
     
-    # Track statistics
-    high_risk_count = 0
-    medium_risk_count = 0
-    low_risk_count = 0
+    # Track statistics; a failed call or a reply without a clean
+    # "Risk Level:" line is counted as needs review, never as Low
+    tally = RiskTally()
     
     print(f"Analyzing {len(patient_list)} patients...")
     print(f"Generating report: {output_file}\n")
     
-    # Analyze each patient
-    for i, patient in enumerate(patient_list, 1):
-        print(f"Processing patient {i}/{len(patient_list)}...")
-        
-        # Get analysis
-        analysis = analyze_patient(patient, client)
+    def show_progress(done, total, index):
+        print(f"Processed patient {done}/{total}")
+    
+    # Concurrent calls through the shared client
+    prompts = [build_prompt(patient) for patient in patient_list]
+    analyses = complete_prompts(prompts, progress=show_progress)
+    
+    # Add each analysis to the report
+    for i, (patient, analysis) in enumerate(zip(patient_list, analyses), 1):
         
-        # Count risk levels
-        if "High" in analysis:
-            high_risk_count += 1
-            risk_emoji = "HIGH RISK"
-        elif "Medium" in analysis:
-            medium_risk_count += 1
-            risk_emoji = "MEDIUM RISK"
+        # Count risk levels from the labelled line, not a substring anywhere
+        risk_level = parse_analysis(analysis)['risk_level']
+        tally.add(risk_level, "Claude")
+        if risk_level in RISK_LEVELS:
+            risk_emoji = f"{risk_level.upper()} RISK"
         else:
-            low_risk_count += 1
-            risk_emoji = "LOW RISK"
+            risk_emoji = "NEEDS REVIEW"
         
         # Add to report
         report_lines.append(f"{risk_emoji} - PATIENT #{i}")
@@ -81,11 +76,12 @@ def generate_report(patient_list, output_file):
     report_lines.append("SUMMARY")
     report_lines.append("=" * 60)
     report_lines.append(f"Total Patients Analyzed: {len(patient_list)}")
-    report_lines.append(f"HIGH RISK: {high_risk_count}")
-    report_lines.append(f"MEDIUM RISK: {medium_risk_count}")
-    report_lines.append(f"LOW RISK: {low_risk_count}")
+    report_lines.append(f"HIGH RISK: {tally.count('High')}")
+    report_lines.append(f"MEDIUM RISK: {tally.count('Medium')}")
+    report_lines.append(f"LOW RISK: {tally.count('Low')}")
+    report_lines.append(f"NEEDS REVIEW: {tally.needs_review}")
     report_lines.append("")
-    report_lines.append(f"High Risk Percentage: {(high_risk_count/len(patient_list)*100):.1f}%")
+    report_lines.append(f"High Risk Percentage: {tally.share('High'):.1f}%")
     report_lines.append("=" * 60)
     
     # Write to file with UTF-8 encoding
@@ -94,7 +90,9 @@ def generate_report(patient_list, output_file):
     
     print(f"\n✓ Report generated: {output_file}")
     print(f"✓ Total patients: {len(patient_list)}")
-    print(f"✓ High risk: {high_risk_count}")
+    print(f"✓ High risk: {tally.count('High')}")
+    if tally.needs_review:
+        print(f"⚠️  Needs review: {tally.needs_review}")
     
     return output_file
 
@@ -3,9 +3,17 @@
 Set up MindBridge schema on Railway PostgreSQL.
 Creates patients table and inserts sample behavioral health data.
 """
+import sys
+from pathlib import Path
+
 import psycopg2
 from datetime import datetime
 
+# Shared schema definitions live in the backend package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from app.audit import AUDIT_SCHEMA_SQL
+from app.schema import PATIENT_SEARCH_SCHEMA_SQL, PATIENT_TRIAGE_SCHEMA_SQL
+
 # Your Railway DATABASE_PUBLIC_URL
 # (Same one you used in test_railway_simple.py)
 import os
@@ -42,6 +50,10 @@ def setup_mindbridge_database():
             );
         """)
         
+        # risk_level CHECK, risk_priority and the triage index; the API
+        # re-applies the same statements on startup (app/schema.py)
+        cursor.execute(PATIENT_TRIAGE_SCHEMA_SQL)
+        
         # Create index for performance
         print("⚡ Creating performance indexes...")
         cursor.execute("""
@@ -54,6 +66,13 @@ def setup_mindbridge_database():
             ON patients(created_at DESC);
         """)
         
+        # Trigram indexes for /api/patients/search typeahead
+        cursor.execute(PATIENT_SEARCH_SCHEMA_SQL)
+        
+        # HIPAA audit log written by the API
+        print("🔒 Creating audit_logs table...")
+        cursor.execute(AUDIT_SCHEMA_SQL)
+        
         # Insert sample behavioral health patients
         print("👥 Inserting sample behavioral health patients...")
         sample_patients = [
@@ -1,20 +1,13 @@
-import anthropic
-import os
+import sys
+from pathlib import Path
 
-# Get API key from environment variable
-api_key = os.environ.get("ANTHROPIC_API_KEY")
+# Shared Claude client lives in the backend package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from app.ai.claude_client import complete_prompts
 
-# Create the client
-client = anthropic.Anthropic(api_key=api_key)
-
-# Call Claude!
-message = client.messages.create(
-    model="claude-sonnet-4-20250514",
-    max_tokens=1000,
-    messages=[
-        {"role": "user", "content": "Hello! Please respond with: 'MindBridge Health CLI is working!'"}
-    ]
-)
+# Call Claude! (API key from ANTHROPIC_API_KEY)
+reply = complete_prompts(["Hello! Please respond with: 'MindBridge Health CLI is working!'"],
+                         max_tokens=1000)[0]
 
 # Print the response
-print(message.content[0].text)
\ No newline at end of file
+print(reply)
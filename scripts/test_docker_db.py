@@ -6,7 +6,13 @@ This proves MindBridge can work with containerized databases.
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 import os
+import sys
 from datetime import datetime
+from pathlib import Path
+
+# Shared schema definitions live in the backend package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from app.schema import PATIENT_TRIAGE_SCHEMA_SQL
 
 # Docker PostgreSQL connection
 DB_CONFIG = {
@@ -68,6 +74,9 @@ def create_sample_table():
             );
         """)
         
+        # Same risk_priority column, CHECK and triage index as production
+        cursor.execute(PATIENT_TRIAGE_SCHEMA_SQL)
+        
         # Insert sample data
         sample_patients = [
             ('John Doe', 'HIGH', 0.3, 4),
@@ -112,12 +121,7 @@ def generate_report():
         cursor.execute("""
             SELECT patient_name, risk_level, medication_adherence, appointments_missed
             FROM patients
-            ORDER BY 
-                CASE risk_level
-                    WHEN 'HIGH' THEN 1
-                    WHEN 'MEDIUM' THEN 2
-                    WHEN 'LOW' THEN 3
-                END
+            ORDER BY risk_priority ASC, medication_adherence ASC
         """)
         
         patients = cursor.fetchall()
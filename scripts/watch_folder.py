@@ -0,0 +1,79 @@
+"""
+Screen new admissions as their extracts land in a drop folder.
+
+Runs until interrupted. New .csv / .csv.gz / .csv.zst files, and rows
+appended to files already there, are screened within a poll interval
+(seconds with inotify) instead of waiting for the nightly run. Only rows
+not seen before are sent; results stream to
+reports/live_screening_watch_<ts>.txt and go into the delta state, so
+the nightly run carries them forward.
+
+Usage:
+    python scripts/watch_folder.py --folder incoming
+    python scripts/watch_folder.py --folder incoming --once   # one pass, e.g. from cron
+"""
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Shared screening and Claude modules live in the backend package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from app.ai.cascade import CASCADE_ENABLED
+from app.ai.claude_client import DEFAULT_PACK_SIZE
+from app.screening.live_feed import LiveFeed
+from app.screening.pipeline import DEFAULT_CHUNK_SIZE
+from app.screening.watcher import (
+    DEFAULT_POLL_INTERVAL_S,
+    DEFAULT_SETTLE_S,
+    IngestState,
+    watch_folder,
+)
+
+def reject(path, row_number, row, reason):
+    print(f"⚠️  Skipping {path.name} row {row_number}: {reason}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Screen extracts as they arrive in a drop folder")
+    parser.add_argument("--folder", default="incoming",
+                        help="Drop folder to watch (default: incoming)")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL_INTERVAL_S, metavar="SECONDS",
+                        help="Rescan interval, and the only trigger where inotify is unavailable "
+                             "(default: INGEST_POLL_INTERVAL or 30)")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE_S, metavar="SECONDS",
+                        help="Wait this long after the last write before reading "
+                             "(default: INGEST_SETTLE_SECONDS or 2)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, metavar="ROWS",
+                        help="Rows read and screened at a time (default: SCREENING_CHUNK_SIZE or 1000)")
+    parser.add_argument("--pack-size", type=int, default=DEFAULT_PACK_SIZE, metavar="K",
+                        help="Patients per Claude request (default: CLAUDE_PACK_SIZE or 1)")
+    parser.add_argument("--cascade", action="store_true", default=CASCADE_ENABLED,
+                        help="Screen on the fast model first, escalate uncertain or high-risk patients")
+    parser.add_argument("--once", action="store_true",
+                        help="Screen whatever is new, then exit")
+    args = parser.parse_args()
+
+    folder = Path(args.folder)
+    folder.mkdir(parents=True, exist_ok=True)
+
+    print("=" * 70)
+    print("OAKWOOD BEHAVIORAL HEALTH - CONTINUOUS INTAKE SCREENING")
+    print("=" * 70)
+    print("")
+
+    live_feed = LiveFeed(f"reports/live_screening_watch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+    state = IngestState()
+    print(f"💾 Ingest state: {state.path}")
+    print(f"📡 Live results (most urgent first): tail -f {live_feed.path}\n")
+
+    try:
+        watch_folder(folder, state, on_result=live_feed.emit, chunk_size=args.chunk_size,
+                     on_reject=reject, poll_interval=args.poll, settle=args.settle,
+                     once=args.once, pack_size=args.pack_size, cascade=args.cascade)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopped; unscreened rows are picked up on the next start")
+    finally:
+        state.close()
+        live_feed.close()
+
+    print(f"\n✅ {live_feed.emitted} results written to {live_feed.path}")
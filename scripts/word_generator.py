@@ -1,56 +1,21 @@
-import anthropic
-import os
 import csv
+import sys
 from datetime import datetime
+from pathlib import Path
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 
-def analyze_patient_from_csv(patient_row, client):
-    """Analyze a patient from CSV data"""
-    
-    patient_summary = f"""
-Patient ID: {patient_row['patient_id']}
-Name: {patient_row['name']}
-Last Appointment: {patient_row['last_appointment']}
-Appointments Missed (last 6 months): {patient_row['appointments_missed']}
-Medication Adherence: {float(patient_row['medication_adherence'])*100:.0f}%
-Crisis Calls (30 days): {patient_row['crisis_calls_30days']}
-Diagnosis: {patient_row['diagnosis']}
-Case Manager: {patient_row['case_manager']}
-"""
-    
-    prompt = f"""
-You are a clinical risk assessment assistant.
-
-Analyze this patient and provide:
-1. Risk Level (Low/Medium/High)
-2. Primary Risk Factor
-3. Recommended Action
-
-PATIENT DATA:
-{patient_summary}
-
-Return in this exact format:
-Risk Level: [level]
-Primary Factor: [factor]
-Action: [action]
-"""
-    
-    message = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=300,
-        messages=[{"role": "user", "content": prompt}]
-    )
-    
-    return message.content[0].text
+# Shared screening and Claude modules live in the backend package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from app.ai.claude_client import parse_analysis
+from app.screening.columns import open_extract
+from app.screening.records import PatientRecord
+from app.screening.screener import describe_provenance, screen_patients
 
 def create_word_report(csv_file, output_file):
     """Create a professional Word document report"""
     
-    # Initialize Claude client
-    client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
-    
     # Create Word document
     doc = Document()
     
@@ -73,10 +38,10 @@ def create_word_report(csv_file, output_file):
     print(f"Reading patient data from: {csv_file}")
     patients = []
     
-    with open(csv_file, 'r', encoding='utf-8') as file:
+    with open_extract(csv_file) as file:
         csv_reader = csv.DictReader(file)
         for row in csv_reader:
-            patients.append(row)
+            patients.append(PatientRecord.from_row(row))
     
     print(f"✓ Loaded {len(patients)} patients\n")
     
@@ -84,47 +49,58 @@ def create_word_report(csv_file, output_file):
     high_risk_patients = []
     medium_risk_patients = []
     low_risk_patients = []
+    review_patients = []
     
     # Analyze each patient
     print("Analyzing patients and building Word document...\n")
     
-    for i, patient in enumerate(patients, 1):
-        print(f"[{i}/{len(patients)}] Processing {patient['name']}...")
-        
-        # Get AI analysis
-        analysis = analyze_patient_from_csv(patient, client)
+    def show_progress(done, total, index):
+        print(f"[{done}/{total}] Analyzed {patients[index].name}")
+    
+    # Rule triage first; only ambiguous patients go to Claude
+    results = screen_patients(patients, progress=show_progress)
+    
+    for patient, result in zip(patients, results):
+        analysis = result['analysis']
+        source = describe_provenance(result)
         
-        # Determine risk level
-        if "High" in analysis:
+        # Determine risk level from the validated field, never a substring match
+        parsed_level = parse_analysis(analysis)['risk_level']
+        if parsed_level == "High":
             risk_level = "HIGH RISK"
             risk_color = RGBColor(255, 0, 0)  # Red
             high_risk_patients.append(patient)
-        elif "Medium" in analysis:
+        elif parsed_level == "Medium":
             risk_level = "MEDIUM RISK"
             risk_color = RGBColor(255, 165, 0)  # Orange
             medium_risk_patients.append(patient)
-        else:
+        elif parsed_level == "Low":
             risk_level = "LOW RISK"
             risk_color = RGBColor(0, 128, 0)  # Green
             low_risk_patients.append(patient)
+        else:
+            risk_level = "NEEDS MANUAL REVIEW"
+            risk_color = RGBColor(128, 128, 128)  # Grey
+            review_patients.append(patient)
         
         # Add patient section
-        patient_heading = doc.add_heading(f"{risk_level} - {patient['name']} (ID: {patient['patient_id']})", level=2)
+        patient_heading = doc.add_heading(f"{risk_level} - {patient.name} (ID: {patient.patient_id})", level=2)
         patient_heading_run = patient_heading.runs[0]
         patient_heading_run.font.color.rgb = risk_color
         
         # Add patient details
-        doc.add_paragraph(f"Case Manager: {patient['case_manager']}")
-        doc.add_paragraph(f"Diagnosis: {patient['diagnosis']}")
-        doc.add_paragraph(f"Last Appointment: {patient['last_appointment']}")
-        doc.add_paragraph(f"Missed Appointments: {patient['appointments_missed']}")
-        doc.add_paragraph(f"Medication Adherence: {float(patient['medication_adherence'])*100:.0f}%")
-        doc.add_paragraph(f"Crisis Calls (30 days): {patient['crisis_calls_30days']}")
+        doc.add_paragraph(f"Case Manager: {patient.case_manager}")
+        doc.add_paragraph(f"Diagnosis: {patient.diagnosis}")
+        doc.add_paragraph(f"Last Appointment: {patient.last_appointment}")
+        doc.add_paragraph(f"Missed Appointments: {patient.appointments_missed}")
+        doc.add_paragraph(f"Medication Adherence: {patient.medication_adherence*100:.0f}%")
+        doc.add_paragraph(f"Crisis Calls (30 days): {patient.crisis_calls_30days}")
         
         # Add AI analysis
         doc.add_paragraph()
         analysis_para = doc.add_paragraph(analysis)
         analysis_para.runs[0].font.italic = True
+        doc.add_paragraph(f"Decided By: {source}")
         
         # Add separator
         doc.add_paragraph('_' * 70)
@@ -152,14 +128,28 @@ def create_word_report(csv_file, output_file):
     low_para.runs[0].font.color.rgb = RGBColor(0, 128, 0)
     low_para.runs[0].font.bold = True
     
+    if review_patients:
+        review_para = doc.add_paragraph(f"NEEDS MANUAL REVIEW: {len(review_patients)} (analysis failed)")
+        review_para.runs[0].font.bold = True
+    
     doc.add_paragraph()
     
+    # Failed analyses are never filed under a risk level
+    if review_patients:
+        doc.add_heading('MANUAL CLINICAL REVIEW REQUIRED:', level=2)
+        for patient in review_patients:
+            doc.add_paragraph(
+                f"• {patient.name} (ID: {patient.patient_id}) - Case Manager: {patient.case_manager}",
+                style='List Bullet'
+            )
+        doc.add_paragraph()
+    
     # High risk patient list
     if high_risk_patients:
         doc.add_heading('IMMEDIATE ATTENTION REQUIRED:', level=2)
         for patient in high_risk_patients:
             doc.add_paragraph(
-                f"• {patient['name']} (ID: {patient['patient_id']}) - Case Manager: {patient['case_manager']}",
+                f"• {patient.name} (ID: {patient.patient_id}) - Case Manager: {patient.case_manager}",
                 style='List Bullet'
             )
         doc.add_paragraph()
@@ -169,7 +159,7 @@ def create_word_report(csv_file, output_file):
         doc.add_heading('FOLLOW-UP WITHIN 48-72 HOURS:', level=2)
         for patient in medium_risk_patients:
             doc.add_paragraph(
-                f"• {patient['name']} (ID: {patient['patient_id']}) - Case Manager: {patient['case_manager']}",
+                f"• {patient.name} (ID: {patient.patient_id}) - Case Manager: {patient.case_manager}",
                 style='List Bullet'
             )
     
@@ -183,6 +173,8 @@ def create_word_report(csv_file, output_file):
     print(f"   High Risk: {len(high_risk_patients)}")
     print(f"   Medium Risk: {len(medium_risk_patients)}")
     print(f"   Low Risk: {len(low_risk_patients)}")
+    if review_patients:
+        print(f"   Needs Manual Review: {len(review_patients)}")
     
     return output_file
 